@@ -2,8 +2,9 @@ from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import config
+from app.utils.routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 def create_app(config_name='default'):
@@ -11,10 +12,36 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
 
     db.init_app(app)
+
+    from app.utils.database import configure_engine
+    configure_engine(app, db)
+
+    from app.utils.routing import init_read_replicas
+    init_read_replicas(app)
+
+    from app.utils.sql_stats import init_sql_stats
+    init_sql_stats(app)
+
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+
+    from app.utils.profiler import init_profiler
+    init_profiler(app)
+
+    from app.utils.password_pool import init_password_pool
+    init_password_pool(app)
+
+    from app.utils.vocab_import import init_vocab_import
+    init_vocab_import(app)
+
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = '请先登录'
 
+    # 预编译内容包（可选）
+    from app.utils.content_bundle import init_content_bundle
+    init_content_bundle(app)
+
     # 注册蓝图
     from app.routes.auth import auth_bp
     app.register_blueprint(auth_bp)
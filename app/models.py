@@ -1,7 +1,8 @@
+import json
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import db, login_manager
+from app.utils.password_pool import hash_password, verify_password, needs_rehash
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -14,23 +15,30 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    ability = db.Column(db.Float)  # IRT 校准的能力值（calibrate_items.py），NULL 表示尚未校准
 
     # 关系
     vocabularies = db.relationship('UserVocabulary', backref='user', lazy='dynamic')
     quiz_attempts = db.relationship('QuizAttempt', backref='user', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """哈希参数是否已过时（登录成功后据此重新哈希）"""
+        return needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # 返回缓存的只读快照，避免每个请求都查询 users 表
+    from app.utils.identity_cache import get_identity_cache
+    return get_identity_cache().get(int(user_id), lambda uid: db.session.get(User, uid))
 
 
 class Vocabulary(db.Model):
@@ -44,6 +52,8 @@ class Vocabulary(db.Model):
     category = db.Column(db.String(50), index=True)
     difficulty_level = db.Column(db.Integer, default=1, index=True)
     frequency_rank = db.Column(db.Integer, index=True)
+    irt_difficulty = db.Column(db.Float)       # IRT 校准难度（logit），NULL 表示尚未校准
+    irt_discrimination = db.Column(db.Float)   # IRT 区分度
     example_sentence_thai = db.Column(db.Text)
     example_sentence_chinese = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -87,6 +97,7 @@ class QuizAttempt(db.Model):
     quiz_type = db.Column(db.String(20), nullable=False)  # flashcard, multiple_choice, typing, listening
     is_correct = db.Column(db.Boolean, nullable=False)
     time_taken = db.Column(db.Integer)  # 秒
+    selected_vocabulary_id = db.Column(db.Integer)  # 选择题答错时所选干扰项对应的词汇（不加外键，词汇删除后记录保留）
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     __table_args__ = (
@@ -146,6 +157,95 @@ class UserAlphabet(db.Model):
         return f'<UserAlphabet user={self.user_id} alphabet={self.alphabet_id}>'
 
 
+class UserBitmap(db.Model):
+    """用户已学/已掌握条目的压缩位图（见 app/utils/learned_sets.py）"""
+    __tablename__ = 'user_bitmaps'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)  # vocab_seen/vocab_mastered/alphabet_seen/alphabet_mastered
+    data = db.Column(db.LargeBinary)                   # NULL 表示尚未从进度表构建
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserBitmap user={self.user_id} kind={self.kind}>'
+
+
+class ActivitySketch(db.Model):
+    """每日活跃用户的 HyperLogLog 草图（见 app/utils/activity.py）"""
+    __tablename__ = 'activity_sketches'
+
+    day = db.Column(db.Date, primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)  # learning/conversation
+    registers = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ActivitySketch {self.day} {self.kind}>'
+
+
+class AlphabetConfusion(db.Model):
+    """字母选择题的误选计数（字母没有答题记录表，答错时直接累加）"""
+    __tablename__ = 'alphabet_confusions'
+
+    alphabet_id = db.Column(db.Integer, db.ForeignKey('thai_alphabets.id'), primary_key=True)
+    selected_alphabet_id = db.Column(db.Integer, db.ForeignKey('thai_alphabets.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AlphabetConfusion {self.alphabet_id}->{self.selected_alphabet_id} x{self.count}>'
+
+
+class ConfusableNeighbor(db.Model):
+    """易混淆条目的 top-K 近邻表（见 app/utils/confusability.py）"""
+    __tablename__ = 'confusable_neighbors'
+
+    domain = db.Column(db.String(10), primary_key=True)     # vocab/alphabet
+    item_id = db.Column(db.Integer, primary_key=True)
+    neighbor_id = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Float, nullable=False)             # 越大越容易混淆
+
+    def __repr__(self):
+        return f'<ConfusableNeighbor {self.domain} {self.item_id}->{self.neighbor_id}>'
+
+
+class ImportJob(db.Model):
+    """后台词汇导入任务（见 app/utils/vocab_import.py）"""
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)      # 上传时的原始文件名
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/failed
+    processed = db.Column(db.Integer, default=0)              # 已处理行数
+    created = db.Column(db.Integer, default=0)                # 新增词汇数
+    skipped = db.Column(db.Integer, default=0)                # 重复而跳过的行数
+    errors = db.Column(db.Integer, default=0)                 # 格式错误的行数
+    messages = db.Column(db.Text)                             # 前若干条跳过/错误明细（JSON）
+    error = db.Column(db.Text)                                # 任务失败原因
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'processed': self.processed or 0,
+            'created': self.created or 0,
+            'skipped': self.skipped or 0,
+            'errors': self.errors or 0,
+            'messages': json.loads(self.messages) if self.messages else [],
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
+
+
 class ConversationScene(db.Model):
     """生活场景分类"""
     __tablename__ = 'conversation_scenes'
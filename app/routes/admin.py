@@ -1,44 +1,55 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, Response, jsonify, \
+    stream_with_context, current_app
 from flask_login import current_user
-from app.utils.decorators import admin_required
+from app.utils.decorators import admin_required, read_replica
+from app.utils.content_bundle import refresh_content_bundle
+from app.utils.metrics import get_metrics
+from app.utils.profiler import get_profiles, get_profile
+from app.utils.identity_cache import invalidate_user
+from app.utils.forecast import global_forecast
+from app.utils.activity import activity_summary
+from app.utils.analytics_store import get_analytics_snapshot
+from app.utils.analytics_reports import (accuracy_by_quiz_type, time_taken_percentiles, cohort_retention,
+                                         category_difficulty, vocabulary_rankings, conversation_engagement)
+from app.utils.vocab_bulk import BulkError, bulk_update_vocabulary, target_conditions, vocabulary_conditions
+from app.utils.vocab_import import queue_import
+from app.utils.export import ExportError, ExportFilters, export_query, EXPORT_FORMATS, EXPORT_WRITERS
 from app import db
-from app.models import User, Vocabulary, UserVocabulary, QuizAttempt, ConversationScene, Conversation, ConversationLine, UserConversation
+from app.models import User, Vocabulary, UserVocabulary, QuizAttempt, ConversationScene, Conversation, ConversationLine, UserConversation, ImportJob
+import re
 from datetime import datetime, timedelta
+from urllib.parse import quote
 from sqlalchemy import func
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 @admin_bp.route('/')
 @admin_required
+@read_replica
 def dashboard():
     """管理仪表板"""
     today = datetime.utcnow().date()
     today_start = datetime.combine(today, datetime.min.time())
 
+    # 活跃用户数来自每日 HyperLogLog 草图（约 1.6% 误差）
+    learning_activity = activity_summary('learning', today)
+    conversation_activity = activity_summary('conversation', today, trend_days=1)
+
     # 统计数据
     stats = {
         'total_users': User.query.count(),
         'new_users_today': User.query.filter(User.created_at >= today_start).count(),
         'total_vocab': Vocabulary.query.count(),
         'active_vocab': Vocabulary.query.filter_by(is_active=True).count(),
-        'active_users_today': db.session.query(func.count(func.distinct(QuizAttempt.user_id))).filter(
-            QuizAttempt.created_at >= today_start
-        ).scalar() or 0,
+        'active_users_today': learning_activity['dau'],
+        'active_users_week': learning_activity['wau'],
+        'active_users_month': learning_activity['mau'],
         'total_attempts': QuizAttempt.query.count(),
         'attempts_today': QuizAttempt.query.filter(QuizAttempt.created_at >= today_start).count(),
     }
 
     # 最近7天活跃趋势
-    daily_active = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        day_start = datetime.combine(day, datetime.min.time())
-        day_end = datetime.combine(day, datetime.max.time())
-        count = db.session.query(func.count(func.distinct(QuizAttempt.user_id))).filter(
-            QuizAttempt.created_at >= day_start,
-            QuizAttempt.created_at <= day_end
-        ).scalar() or 0
-        daily_active.append({'date': day.strftime('%m-%d'), 'count': count})
+    daily_active = learning_activity['daily']
 
     # 熟悉度分布
     familiarity_dist = []
@@ -46,27 +57,30 @@ def dashboard():
         count = UserVocabulary.query.filter_by(familiarity_level=level).count()
         familiarity_dist.append({'level': level, 'count': count})
 
-    # 困难词汇 TOP 5
-    difficult_vocab = db.session.query(
-        Vocabulary.thai_word,
-        Vocabulary.chinese_meaning,
-        func.count(QuizAttempt.id).label('total'),
-        func.sum(db.case((QuizAttempt.is_correct == False, 1), else_=0)).label('wrong')
-    ).join(QuizAttempt, QuizAttempt.vocabulary_id == Vocabulary.id)\
-    .group_by(Vocabulary.id)\
-    .having(func.count(QuizAttempt.id) >= 5)\
-    .order_by((func.sum(db.case((QuizAttempt.is_correct == False, 1), else_=0)) * 100 / func.count(QuizAttempt.id)).desc())\
-    .limit(5).all()
-
-    # 热门词汇 TOP 5
-    popular_vocab = db.session.query(
-        Vocabulary.thai_word,
-        Vocabulary.chinese_meaning,
-        func.count(QuizAttempt.id).label('count')
-    ).join(QuizAttempt, QuizAttempt.vocabulary_id == Vocabulary.id)\
-    .group_by(Vocabulary.id)\
-    .order_by(func.count(QuizAttempt.id).desc())\
-    .limit(5).all()
+    # 困难词汇和热门词汇 TOP 5：有分析快照时从快照计算，否则直接聚合答题记录
+    snapshot = get_analytics_snapshot()
+    if snapshot is not None:
+        difficult_vocab, popular_vocab = _snapshot_rankings(snapshot)
+    else:
+        difficult_vocab = db.session.query(
+            Vocabulary.thai_word,
+            Vocabulary.chinese_meaning,
+            func.count(QuizAttempt.id).label('total'),
+            func.sum(db.case((QuizAttempt.is_correct == False, 1), else_=0)).label('wrong')
+        ).join(QuizAttempt, QuizAttempt.vocabulary_id == Vocabulary.id)\
+        .group_by(Vocabulary.id)\
+        .having(func.count(QuizAttempt.id) >= 5)\
+        .order_by((func.sum(db.case((QuizAttempt.is_correct == False, 1), else_=0)) * 100 / func.count(QuizAttempt.id)).desc())\
+        .limit(5).all()
+
+        popular_vocab = db.session.query(
+            Vocabulary.thai_word,
+            Vocabulary.chinese_meaning,
+            func.count(QuizAttempt.id).label('count')
+        ).join(QuizAttempt, QuizAttempt.vocabulary_id == Vocabulary.id)\
+        .group_by(Vocabulary.id)\
+        .order_by(func.count(QuizAttempt.id).desc())\
+        .limit(5).all()
 
     # ========== 对话学习统计 ==========
 
@@ -86,9 +100,7 @@ def dashboard():
     users_learned_conversation = db.session.query(
         func.count(func.distinct(UserConversation.user_id))
     ).scalar() or 0
-    users_conversation_today = db.session.query(
-        func.count(func.distinct(UserConversation.user_id))
-    ).filter(UserConversation.last_practiced >= today_start).scalar() or 0
+    users_conversation_today = conversation_activity['dau']
 
     conversation_stats = {
         'total_scenes': total_scenes,
@@ -128,7 +140,85 @@ def dashboard():
                           popular_vocab=popular_vocab,
                           conversation_stats=conversation_stats,
                           conversation_familiarity_dist=conversation_familiarity_dist,
-                          popular_conversations=popular_conversations)
+                          popular_conversations=popular_conversations,
+                          review_forecast=global_forecast())
+
+
+def _snapshot_rankings(snapshot):
+    """快照中的困难/热门词汇，补上词汇文本"""
+    difficult, popular = vocabulary_rankings(snapshot)
+    ids = {row[0] for row in difficult + popular}
+    words = {v.id: v for v in Vocabulary.query.filter(Vocabulary.id.in_(ids))} if ids else {}
+
+    def rows(ranking):
+        return [{'thai_word': words[i].thai_word, 'chinese_meaning': words[i].chinese_meaning,
+                 'total': total, 'count': total, 'wrong': wrong}
+                for i, total, wrong in ranking if i in words]
+    return rows(difficult), rows(popular)
+
+
+@admin_bp.route('/analytics')
+@admin_required
+def analytics():
+    """学习分析报表（只读取分析快照，不查询答题记录）"""
+    snapshot = get_analytics_snapshot()
+    if snapshot is None:
+        return render_template('admin/analytics.html', snapshot=None)
+    return render_template('admin/analytics.html',
+                           snapshot=snapshot,
+                           total_attempts=len(snapshot.attempts['id']),
+                           accuracy=accuracy_by_quiz_type(snapshot),
+                           timing=time_taken_percentiles(snapshot),
+                           cohorts=cohort_retention(snapshot),
+                           categories=category_difficulty(snapshot),
+                           conversations=conversation_engagement(snapshot))
+
+
+@admin_bp.route('/forecast')
+@admin_required
+@read_replica
+def forecast():
+    """全体用户未来 30 天每天到期的复习量"""
+    return jsonify(global_forecast())
+
+
+@admin_bp.route('/metrics')
+@admin_required
+def metrics():
+    """Prometheus 指标"""
+    registry = get_metrics()
+    if registry is None:
+        abort(404)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@admin_bp.route('/profiles')
+@admin_required
+def profiles():
+    """请求性能分析记录"""
+    return render_template('admin/profiles.html', profiles=get_profiles())
+
+
+@admin_bp.route('/profiles/<int:id>')
+@admin_required
+def profile_detail(id):
+    """单次请求的性能分析详情"""
+    record = get_profile(id)
+    if record is None:
+        abort(404)
+    return render_template('admin/profile_detail.html', profile=record)
+
+
+@admin_bp.route('/profiles/<int:id>/download')
+@admin_required
+def profile_download(id):
+    """下载 pstats 文件"""
+    record = get_profile(id)
+    if record is None:
+        abort(404)
+    return Response(record.pstats_data, mimetype='application/octet-stream', headers={
+        'Content-Disposition': f'attachment; filename=profile-{record.id}.pstats'
+    })
 
 
 @admin_bp.route('/vocabulary')
@@ -141,27 +231,7 @@ def vocabulary_list():
     difficulty = request.args.get('difficulty', '', type=str)
     status = request.args.get('status', '')
 
-    query = Vocabulary.query
-
-    if search:
-        query = query.filter(
-            db.or_(
-                Vocabulary.thai_word.contains(search),
-                Vocabulary.chinese_meaning.contains(search)
-            )
-        )
-
-    if category:
-        query = query.filter_by(category=category)
-
-    if difficulty:
-        query = query.filter_by(difficulty_level=int(difficulty))
-
-    if status == 'active':
-        query = query.filter_by(is_active=True)
-    elif status == 'inactive':
-        query = query.filter_by(is_active=False)
-
+    query = Vocabulary.query.filter(*vocabulary_conditions(search, category, difficulty, status))
     pagination = query.order_by(Vocabulary.id.desc()).paginate(page=page, per_page=20)
 
     # 获取所有分类用于筛选
@@ -195,6 +265,7 @@ def vocabulary_add():
         )
         db.session.add(vocab)
         db.session.commit()
+        refresh_content_bundle()
         flash('词汇添加成功', 'success')
         return redirect(url_for('admin.vocabulary_list'))
 
@@ -220,6 +291,7 @@ def vocabulary_edit(id):
         vocab.is_active = request.form.get('is_active') == 'on'
 
         db.session.commit()
+        refresh_content_bundle()
         flash('词汇更新成功', 'success')
         return redirect(url_for('admin.vocabulary_list'))
 
@@ -235,10 +307,97 @@ def vocabulary_toggle(id):
     vocab = Vocabulary.query.get_or_404(id)
     vocab.is_active = not vocab.is_active
     db.session.commit()
+    refresh_content_bundle()
     flash(f"词汇已{'启用' if vocab.is_active else '禁用'}", 'success')
     return redirect(url_for('admin.vocabulary_list'))
 
 
+IMPORT_JOB_STATUS = {'queued': '排队中', 'running': '导入中', 'done': '已完成', 'failed': '失败'}
+
+
+@admin_bp.route('/vocabulary/import', methods=['GET', 'POST'])
+@admin_required
+def vocabulary_import():
+    """上传词汇 CSV，在后台导入"""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            flash('请选择 CSV 文件', 'error')
+            return redirect(url_for('admin.vocabulary_import'))
+        if not upload.filename.lower().endswith('.csv'):
+            flash('只支持 .csv 文件', 'error')
+            return redirect(url_for('admin.vocabulary_import'))
+        job = queue_import(upload, current_user.id)
+        return redirect(url_for('admin.vocabulary_import_job', id=job.id))
+
+    current_app.extensions['vocab_import'].ensure_started()
+    jobs = ImportJob.query.order_by(ImportJob.id.desc()).limit(20).all()
+    return render_template('admin/vocabulary_import.html', jobs=jobs, job_status=IMPORT_JOB_STATUS)
+
+
+@admin_bp.route('/vocabulary/import/<int:id>')
+@admin_required
+def vocabulary_import_job(id):
+    """导入任务进度页（轮询 vocabulary_import_status）"""
+    current_app.extensions['vocab_import'].ensure_started()
+    job = db.get_or_404(ImportJob, id)
+    return render_template('admin/import_job.html', job=job, job_status=IMPORT_JOB_STATUS)
+
+
+@admin_bp.route('/vocabulary/import/<int:id>/status')
+@admin_required
+def vocabulary_import_status(id):
+    """导入任务状态（JSON）"""
+    current_app.extensions['vocab_import'].ensure_started()
+    return jsonify(db.get_or_404(ImportJob, id).to_dict())
+
+
+VOCABULARY_FILTERS = ('search', 'category', 'difficulty', 'status')
+
+
+@admin_bp.route('/vocabulary/bulk', methods=['POST'])
+@admin_required
+def vocabulary_bulk():
+    """
+    词汇批量操作
+
+    JSON：{"action": ..., "value": ..., "ids": [...]} 或 {"action": ..., "filter": {...}}
+    表单（列表页）：scope=selected 时作用于勾选的 ids，scope=filtered 时作用于当前筛选结果
+    """
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        ids, filters = data.get('ids'), data.get('filter')
+    else:
+        data = request.form
+        filters = {name: data.get(name, '') for name in VOCABULARY_FILTERS}
+        ids = data.getlist('ids') if data.get('scope', 'selected') == 'selected' else None
+        if ids is not None and not ids:
+            flash('请先勾选词汇', 'error')
+            return redirect(url_for('admin.vocabulary_list', **filters))
+
+    try:
+        result = bulk_update_vocabulary(data.get('action'), target_conditions(ids, filters), data.get('value'))
+    except BulkError as e:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        flash(str(e), 'error')
+        return redirect(url_for('admin.vocabulary_list', **filters))
+
+    db.session.commit()
+    if result['affected']:
+        refresh_content_bundle()
+
+    if request.is_json:
+        return jsonify({'success': True, **result})
+    if data.get('action') == 'delete_unused':
+        flash(f"已删除 {result['affected']} 个词汇，"
+              f"{result['matched'] - result['affected']} 个有学习记录的词汇未删除", 'success')
+    else:
+        flash(f"已更新 {result['affected']} 个词汇（符合条件 {result['matched']} 个）", 'success')
+    return redirect(url_for('admin.vocabulary_list', **filters))
+
+
 @admin_bp.route('/users')
 @admin_required
 def user_list():
@@ -332,6 +491,59 @@ def user_detail(id):
                           recent_vocab=recent_vocab)
 
 
+def _content_disposition(filename, fallback):
+    """
+    attachment 响应头：文件名不是纯 ASCII 安全字符时，filename 使用 ASCII 回退名，
+    原始文件名按 RFC 5987 写入 filename*（响应头必须能按 latin-1 编码）
+    """
+    if re.fullmatch(r'[A-Za-z0-9._-]+', filename):
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _export_response(dataset, args, name, fallback_name=None):
+    """
+    按查询参数生成流式导出响应（分块传输，不设置 Content-Length）
+
+    Args:
+        name: 文件名前缀（可以包含用户名等非 ASCII 字符）
+        fallback_name: name 不是 ASCII 安全字符时使用的 ASCII 前缀（缺省为 dataset）
+    """
+    fmt = args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f'不支持的格式: {fmt}'}), 400
+    try:
+        query = export_query(dataset, ExportFilters.from_args(args))
+    except ExportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    suffix = f"-{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    return Response(stream_with_context(EXPORT_WRITERS[fmt](query)), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': _content_disposition(name + suffix, (fallback_name or dataset) + suffix),
+        'X-Accel-Buffering': 'no',  # 反向代理不缓冲整个响应
+    })
+
+
+@admin_bp.route('/export/<dataset>')
+@admin_required
+@read_replica
+def export(dataset):
+    """导出答题记录（attempts）或词汇进度（progress），过滤参数见 ExportFilters.from_args"""
+    return _export_response(dataset, request.args, dataset)
+
+
+@admin_bp.route('/users/<int:id>/export/<dataset>')
+@admin_required
+@read_replica
+def user_export(id, dataset):
+    """导出单个用户的答题记录或词汇进度"""
+    user = db.get_or_404(User, id)
+    args = request.args.copy()
+    args['users'] = str(user.id)
+    args.pop('prefix', None)
+    return _export_response(dataset, args, f'{user.username}-{dataset}', f'user-{user.id}-{dataset}')
+
+
 @admin_bp.route('/users/<int:id>/toggle-active', methods=['POST'])
 @admin_required
 def user_toggle_active(id):
@@ -345,6 +557,7 @@ def user_toggle_active(id):
 
     user.is_active = not user.is_active
     db.session.commit()
+    invalidate_user(user.id)
     flash(f"用户已{'启用' if user.is_active else '禁用'}", 'success')
     return redirect(url_for('admin.user_detail', id=id))
 
@@ -362,6 +575,7 @@ def user_toggle_admin(id):
 
     user.is_admin = not user.is_admin
     db.session.commit()
+    invalidate_user(user.id)
     flash(f"用户{'已设为管理员' if user.is_admin else '已取消管理员权限'}", 'success')
     return redirect(url_for('admin.user_detail', id=id))
 
@@ -396,6 +610,7 @@ def conversation_scene_add():
         )
         db.session.add(scene)
         db.session.commit()
+        refresh_content_bundle()
         flash('场景添加成功', 'success')
         return redirect(url_for('admin.conversation_scenes'))
     
@@ -418,6 +633,7 @@ def conversation_scene_edit(id):
         scene.is_active = request.form.get('is_active') == 'on'
         
         db.session.commit()
+        refresh_content_bundle()
         flash('场景更新成功', 'success')
         return redirect(url_for('admin.conversation_scenes'))
     
@@ -431,6 +647,7 @@ def conversation_scene_toggle(id):
     scene = ConversationScene.query.get_or_404(id)
     scene.is_active = not scene.is_active
     db.session.commit()
+    refresh_content_bundle()
     flash(f"场景已{'启用' if scene.is_active else '禁用'}", 'success')
     return redirect(url_for('admin.conversation_scenes'))
 
@@ -467,6 +684,7 @@ def conversation_add(scene_id):
         )
         db.session.add(conversation)
         db.session.commit()
+        refresh_content_bundle()
         flash('对话添加成功', 'success')
         return redirect(url_for('admin.conversation_edit', id=conversation.id))
     
@@ -489,6 +707,7 @@ def conversation_edit(id):
         conversation.is_active = request.form.get('is_active') == 'on'
         
         db.session.commit()
+        refresh_content_bundle()
         flash('对话更新成功', 'success')
         return redirect(url_for('admin.conversation_list', scene_id=scene.id))
     
@@ -503,6 +722,7 @@ def conversation_toggle(id):
     conversation = Conversation.query.get_or_404(id)
     conversation.is_active = not conversation.is_active
     db.session.commit()
+    refresh_content_bundle()
     flash(f"对话已{'启用' if conversation.is_active else '禁用'}", 'success')
     return redirect(url_for('admin.conversation_list', scene_id=conversation.scene_id))
 
@@ -529,6 +749,7 @@ def conversation_line_add(conversation_id):
     
     db.session.add(line)
     db.session.commit()
+    refresh_content_bundle()
     flash('对话句子添加成功', 'success')
     return redirect(url_for('admin.conversation_edit', id=conversation_id))
 
@@ -549,6 +770,7 @@ def conversation_line_edit(id):
     line.notes = request.form.get('notes', '').strip()
     
     db.session.commit()
+    refresh_content_bundle()
     flash('对话句子更新成功', 'success')
     return redirect(url_for('admin.conversation_edit', id=line.conversation_id))
 
@@ -562,5 +784,6 @@ def conversation_line_delete(id):
     
     db.session.delete(line)
     db.session.commit()
+    refresh_content_bundle()
     flash('对话句子已删除', 'success')
     return redirect(url_for('admin.conversation_edit', id=conversation_id))
@@ -1,14 +1,34 @@
 from flask import Blueprint, render_template, redirect, url_for, request, session, jsonify
 from flask_login import login_required, current_user
 from app import db
+from app.utils.decorators import read_replica
 from app.models import ThaiAlphabet, UserAlphabet
-from app.utils.srs import calculate_next_review_date
-from datetime import datetime
+from app.utils.progress import record_alphabet_answer, record_alphabet_rating, record_alphabet_confusion
+from app.utils.confusability import neighbor_ids, pick_confusable
+from app.utils.question_bank import sample_question
+from app.utils.content_bundle import get_content_bundle
+from app.utils.learned_sets import get_learned_sets
 import random
 
 alphabet_bp = Blueprint('alphabet', __name__, url_prefix='/alphabet')
 
 
+def get_active_alphabets(**filters):
+    """获取启用的字母（按 sort_order 排序），优先读取预编译内容包
+
+    过滤值为列表/元组时表示 IN 条件
+    """
+    bundle = get_content_bundle()
+    if bundle is not None:
+        return bundle.alphabets(**filters)
+
+    query = ThaiAlphabet.query.filter_by(is_active=True)
+    for name, value in filters.items():
+        column = getattr(ThaiAlphabet, name)
+        query = query.filter(column.in_(value) if isinstance(value, (list, tuple)) else column == value)
+    return query.order_by(ThaiAlphabet.sort_order).all()
+
+
 @alphabet_bp.route('/')
 @login_required
 def index():
@@ -37,64 +57,45 @@ def index():
 
 @alphabet_bp.route('/consonants')
 @login_required
+@read_replica
 def consonants():
     """辅音列表"""
     # 按辅音类别分组
-    mid_consonants = ThaiAlphabet.query.filter_by(
-        alphabet_type='consonant', consonant_class='mid', is_active=True
-    ).order_by(ThaiAlphabet.sort_order).all()
-
-    high_consonants = ThaiAlphabet.query.filter_by(
-        alphabet_type='consonant', consonant_class='high', is_active=True
-    ).order_by(ThaiAlphabet.sort_order).all()
-
-    low_consonants = ThaiAlphabet.query.filter_by(
-        alphabet_type='consonant', consonant_class='low', is_active=True
-    ).order_by(ThaiAlphabet.sort_order).all()
+    mid_consonants = get_active_alphabets(alphabet_type='consonant', consonant_class='mid')
+    high_consonants = get_active_alphabets(alphabet_type='consonant', consonant_class='high')
+    low_consonants = get_active_alphabets(alphabet_type='consonant', consonant_class='low')
 
     # 获取用户学习进度
-    user_progress = {ua.alphabet_id: ua for ua in UserAlphabet.query.filter_by(user_id=current_user.id).all()}
+    learned = get_learned_sets(current_user.id, 'alphabet').seen
 
     return render_template('alphabet/consonants.html',
         mid_consonants=mid_consonants,
         high_consonants=high_consonants,
         low_consonants=low_consonants,
-        user_progress=user_progress
+        learned=learned
     )
 
 
 @alphabet_bp.route('/vowels')
 @login_required
+@read_replica
 def vowels():
     """元音列表"""
     # 按元音类型分组
-    short_vowels = ThaiAlphabet.query.filter_by(
-        alphabet_type='vowel', vowel_type='short', is_active=True
-    ).order_by(ThaiAlphabet.sort_order).all()
-
-    long_vowels = ThaiAlphabet.query.filter_by(
-        alphabet_type='vowel', vowel_type='long', is_active=True
-    ).order_by(ThaiAlphabet.sort_order).all()
-
-    compound_vowels = ThaiAlphabet.query.filter_by(
-        alphabet_type='vowel', vowel_type='compound', is_active=True
-    ).order_by(ThaiAlphabet.sort_order).all()
-
-    special_vowels = ThaiAlphabet.query.filter(
-        ThaiAlphabet.alphabet_type == 'vowel',
-        ThaiAlphabet.vowel_type.in_(['special', 'short_compound']),
-        ThaiAlphabet.is_active == True
-    ).order_by(ThaiAlphabet.sort_order).all()
+    short_vowels = get_active_alphabets(alphabet_type='vowel', vowel_type='short')
+    long_vowels = get_active_alphabets(alphabet_type='vowel', vowel_type='long')
+    compound_vowels = get_active_alphabets(alphabet_type='vowel', vowel_type='compound')
+    special_vowels = get_active_alphabets(alphabet_type='vowel', vowel_type=['special', 'short_compound'])
 
     # 获取用户学习进度
-    user_progress = {ua.alphabet_id: ua for ua in UserAlphabet.query.filter_by(user_id=current_user.id).all()}
+    learned = get_learned_sets(current_user.id, 'alphabet').seen
 
     return render_template('alphabet/vowels.html',
         short_vowels=short_vowels,
         long_vowels=long_vowels,
         compound_vowels=compound_vowels,
         special_vowels=special_vowels,
-        user_progress=user_progress
+        learned=learned
     )
 
 
@@ -106,13 +107,10 @@ def practice(alphabet_type='all'):
     mode = request.args.get('mode', 'flashcard')
 
     # 获取要练习的字母
-    query = ThaiAlphabet.query.filter_by(is_active=True)
-    if alphabet_type == 'consonant':
-        query = query.filter_by(alphabet_type='consonant')
-    elif alphabet_type == 'vowel':
-        query = query.filter_by(alphabet_type='vowel')
-
-    alphabets = query.order_by(ThaiAlphabet.sort_order).all()
+    if alphabet_type in ('consonant', 'vowel'):
+        alphabets = get_active_alphabets(alphabet_type=alphabet_type)
+    else:
+        alphabets = get_active_alphabets()
 
     if not alphabets:
         return redirect(url_for('alphabet.index'))
@@ -165,25 +163,46 @@ def practice(alphabet_type='all'):
 
 
 def generate_alphabet_options(correct, all_alphabets):
-    """生成字母选择题选项"""
-    correct_answer = correct['name_chinese']
-    options = [{'text': correct_answer, 'is_correct': True}]
+    """
+    生成字母选择题选项
 
-    # 从同类型字母中选择干扰项
+    配置了内容包时从预生成题库（见 question_bank.py）中随机取一组干扰项；否则现场生成，
+    最多 CONFUSABLE_OPTIONS 个干扰项取自形近/易混淆字母。
+    """
+    correct_answer = correct['name_chinese']
+    options = [{'id': correct['id'], 'text': correct_answer, 'is_correct': True}]
+
+    bundle = get_content_bundle()
+    values = sample_question(bundle['alphabet_questions'], correct['id']) if bundle is not None else None
+    if values is not None and None not in values:
+        for alphabet_id in values:
+            options.append({'id': alphabet_id, 'text': bundle['thai_alphabets'].get(alphabet_id).name_chinese,
+                            'is_correct': False})
+        random.shuffle(options)
+        return options
+
+    # 易混淆近邻（限于本次候选字母内）
+    by_id = {a.id: a for a in all_alphabets}
+    confusable = pick_confusable([by_id[i] for i in neighbor_ids('alphabet', correct['id'])
+                                  if i in by_id and by_id[i].name_chinese != correct_answer])
+    needed = 3 - len(confusable)
+
+    # 从同类型字母中选择其余干扰项
     same_type = [a for a in all_alphabets
                  if a.alphabet_type == correct['alphabet_type']
-                 and a.name_chinese != correct_answer]
+                 and a.name_chinese != correct_answer and a not in confusable]
 
-    if len(same_type) >= 3:
-        distractors = random.sample(same_type, 3)
+    if len(same_type) >= needed:
+        distractors = random.sample(same_type, needed)
     else:
         distractors = same_type
-        other = [a for a in all_alphabets if a.name_chinese != correct_answer and a not in distractors]
+        other = [a for a in all_alphabets
+                 if a.name_chinese != correct_answer and a not in distractors and a not in confusable]
         if other:
-            distractors += random.sample(other, min(3 - len(distractors), len(other)))
+            distractors += random.sample(other, min(needed - len(distractors), len(other)))
 
-    for d in distractors:
-        options.append({'text': d.name_chinese, 'is_correct': False})
+    for d in confusable + distractors:
+        options.append({'id': d.id, 'text': d.name_chinese, 'is_correct': False})
 
     random.shuffle(options)
     return options
@@ -197,39 +216,24 @@ def check_alphabet_answer():
     alphabet_id = data.get('alphabet_id')
     selected_answer = data.get('selected_answer')
 
-    alphabet = ThaiAlphabet.query.get(alphabet_id)
+    bundle = get_content_bundle()
+    alphabet = bundle['thai_alphabets'].get(alphabet_id) if bundle and isinstance(alphabet_id, int) else None
+    if alphabet is None:
+        alphabet = ThaiAlphabet.query.get(alphabet_id)
     if not alphabet:
         return jsonify({'success': False, 'error': '字母不存在'}), 404
 
     is_correct = (selected_answer == alphabet.name_chinese)
 
     # 更新用户进度
-    ua = UserAlphabet.query.filter_by(
-        user_id=current_user.id,
-        alphabet_id=alphabet_id
-    ).first()
-
-    if not ua:
-        ua = UserAlphabet(
-            user_id=current_user.id,
-            alphabet_id=alphabet_id,
-            familiarity_level=1 if is_correct else 0,
-            review_count=1,
-            correct_count=1 if is_correct else 0,
-            next_review_date=calculate_next_review_date(1 if is_correct else 0, 1),
-            last_reviewed=datetime.utcnow()
-        )
-        db.session.add(ua)
-    else:
-        if is_correct:
-            ua.familiarity_level = min(ua.familiarity_level + 1, 5)
-            ua.correct_count += 1
-        else:
-            ua.familiarity_level = max(ua.familiarity_level - 1, 0)
-        ua.review_count += 1
-        ua.next_review_date = calculate_next_review_date(ua.familiarity_level, ua.review_count)
-        ua.last_reviewed = datetime.utcnow()
-
+    record_alphabet_answer(current_user.id, alphabet.id, is_correct)
+
+    # 答错时记录误选的字母（用于构建易混淆近邻表）
+    selected_id = data.get('selected_id')
+    if not is_correct and isinstance(selected_id, int) and selected_id != alphabet.id:
+        known = bundle['thai_alphabets'].get(selected_id) if bundle else db.session.get(ThaiAlphabet, selected_id)
+        if known is not None:
+            record_alphabet_confusion(alphabet.id, selected_id)
     db.session.commit()
 
     # 更新会话统计
@@ -255,30 +259,7 @@ def submit_alphabet():
     familiarity = data.get('familiarity', 0)
 
     # 更新用户进度
-    ua = UserAlphabet.query.filter_by(
-        user_id=current_user.id,
-        alphabet_id=alphabet_id
-    ).first()
-
-    if not ua:
-        ua = UserAlphabet(
-            user_id=current_user.id,
-            alphabet_id=alphabet_id,
-            familiarity_level=familiarity,
-            review_count=1,
-            correct_count=1 if familiarity >= 3 else 0,
-            next_review_date=calculate_next_review_date(familiarity, 1),
-            last_reviewed=datetime.utcnow()
-        )
-        db.session.add(ua)
-    else:
-        ua.familiarity_level = familiarity
-        ua.review_count += 1
-        if familiarity >= 3:
-            ua.correct_count += 1
-        ua.next_review_date = calculate_next_review_date(familiarity, ua.review_count)
-        ua.last_reviewed = datetime.utcnow()
-
+    record_alphabet_rating(current_user.id, alphabet_id, familiarity)
     db.session.commit()
 
     # 更新会话统计
@@ -321,10 +302,7 @@ def next_alphabet():
 
     if mode == 'multiple_choice':
         # 重新获取所有字母用于生成选项
-        all_alphabets = ThaiAlphabet.query.filter_by(
-            alphabet_type=next_item['alphabet_type'],
-            is_active=True
-        ).all()
+        all_alphabets = get_active_alphabets(alphabet_type=next_item['alphabet_type'])
         result['options'] = generate_alphabet_options(next_item, all_alphabets)
 
     return jsonify(result)
@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash
 from app import db
 from app.models import User
+from app.utils.password_pool import PasswordPoolBusy
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -42,7 +42,11 @@ def register():
 
         # 创建用户
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordPoolBusy:
+            flash('服务器繁忙，请稍后再试', 'error')
+            return render_template('auth/register.html'), 503
         db.session.add(user)
         db.session.commit()
 
@@ -64,7 +68,13 @@ def login():
 
         user = User.query.filter_by(username=username).first()
 
-        if user is None or not user.check_password(password):
+        try:
+            password_ok = user is not None and user.check_password(password)
+        except PasswordPoolBusy:
+            flash('服务器繁忙，请稍后再试', 'error')
+            return render_template('auth/login.html'), 503
+
+        if not password_ok:
             flash('用户名或密码错误', 'error')
             return render_template('auth/login.html')
 
@@ -72,6 +82,13 @@ def login():
             flash('账户已被禁用', 'error')
             return render_template('auth/login.html')
 
+        # 哈希参数调整后，借登录时的明文密码透明地重新哈希
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+            except PasswordPoolBusy:
+                pass
+
         user.last_login = datetime.utcnow()
         db.session.commit()
 
@@ -1,16 +1,31 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify
 from flask_login import login_required, current_user
 from app import db
+from app.utils.decorators import read_replica
 from app.models import ConversationScene, Conversation, ConversationLine, UserConversation
-from datetime import datetime
+from app.utils.content_bundle import get_content_bundle
+from app.utils.progress import record_conversation_practice
 import random
 import json
 
 conversation_bp = Blueprint('conversation', __name__, url_prefix='/conversation')
 
 
+def get_conversation_lines(conversation_id):
+    """获取对话的全部句子（按 line_order），优先读取预编译内容包"""
+    bundle = get_content_bundle()
+    if bundle is not None and isinstance(conversation_id, int):
+        lines = bundle.conversation_lines(conversation_id)
+        if lines is not None:
+            return lines
+    return ConversationLine.query.filter_by(
+        conversation_id=conversation_id
+    ).order_by(ConversationLine.line_order).all()
+
+
 @conversation_bp.route('/')
 @login_required
+@read_replica
 def index():
     """场景列表页面"""
     scenes = ConversationScene.query.filter_by(is_active=True).order_by(
@@ -55,7 +70,7 @@ def scene(scene_id):
 def view(conversation_id):
     """查看完整对话"""
     conversation = Conversation.query.get_or_404(conversation_id)
-    lines = conversation.lines.order_by(ConversationLine.line_order).all()
+    lines = get_conversation_lines(conversation_id)
 
     return render_template('conversation/view.html', conversation=conversation, lines=lines)
 
@@ -65,7 +80,7 @@ def view(conversation_id):
 def practice(conversation_id, mode):
     """开始练习"""
     conversation = Conversation.query.get_or_404(conversation_id)
-    lines = conversation.lines.order_by(ConversationLine.line_order).all()
+    lines = get_conversation_lines(conversation_id)
 
     if mode == 'fill_blank':
         # 生成填空练习
@@ -156,12 +171,13 @@ def check_fill_blank():
     # 验证答案
     results = []
     total_correct = 0
+    lines_by_id = {line.id: line for line in get_conversation_lines(conversation_id)}
 
     for answer in answers:
         line_id = answer.get('line_id')
         user_answers = answer.get('user_answers', [])
 
-        line = ConversationLine.query.get(line_id)
+        line = lines_by_id.get(line_id)
         if not line:
             continue
 
@@ -239,50 +255,15 @@ def submit_practice():
 
 
 def update_user_progress(conversation_id, mode, correct_count, total_count):
-    """更新用户学习进度"""
-    user_conv = UserConversation.query.filter_by(
-        user_id=current_user.id,
-        conversation_id=conversation_id
-    ).first()
-
-    if not user_conv:
-        user_conv = UserConversation(
-            user_id=current_user.id,
-            conversation_id=conversation_id,
-            familiarity_level=0,
-            completed_modes='[]',
-            practice_count=0
-        )
-        db.session.add(user_conv)
-
-    # 更新练习次数
-    user_conv.practice_count += 1
-    user_conv.last_practiced = datetime.utcnow()
-
-    # 更新已完成的模式
-    try:
-        completed_modes = json.loads(user_conv.completed_modes) if user_conv.completed_modes else []
-    except:
-        completed_modes = []
-
-    if mode not in completed_modes:
-        completed_modes.append(mode)
-        user_conv.completed_modes = json.dumps(completed_modes)
-
-    # 根据正确率更新熟练度
+    """更新用户学习进度（单条 upsert）"""
     accuracy = correct_count / total_count if total_count > 0 else 0
-    if accuracy >= 0.9:
-        user_conv.familiarity_level = min(user_conv.familiarity_level + 1, 5)
-    elif accuracy >= 0.7:
-        user_conv.familiarity_level = max(user_conv.familiarity_level, 3)
-    elif accuracy < 0.5:
-        user_conv.familiarity_level = max(user_conv.familiarity_level - 1, 0)
-
+    record_conversation_practice(current_user.id, conversation_id, mode, accuracy)
     db.session.commit()
 
 
 @conversation_bp.route('/progress')
 @login_required
+@read_replica
 def progress():
     """用户学习进度总览"""
     # 获取所有场景及进度
@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Vocabulary, UserVocabulary, QuizAttempt, ThaiAlphabet, UserAlphabet
-from app.utils.srs import calculate_next_review_date
+from app.utils.decorators import read_replica
+from app.models import Vocabulary, UserVocabulary, QuizAttempt, ThaiAlphabet
+from app.utils.vocab_catalog import get_vocab_catalog
+from app.utils.progress import ensure_vocab_progress, record_vocab_rating, record_vocab_answer
+from app.utils.forecast import user_forecast
+from app.utils.learned_sets import get_learned_sets
+from app.utils.irt import target_difficulty, effective_difficulty_column
+from app.utils.confusability import neighbor_ids, pick_confusable
 from datetime import datetime
 import random
 
@@ -13,15 +19,13 @@ MAX_SESSION_WORDS = 20
 
 @learning_bp.route('/select')
 @login_required
+@read_replica
 def select():
     """学习类型选择页面（字母学习 vs 词汇学习）"""
     # 字母统计
     consonant_count = ThaiAlphabet.query.filter_by(alphabet_type='consonant', is_active=True).count()
     vowel_count = ThaiAlphabet.query.filter_by(alphabet_type='vowel', is_active=True).count()
-    alphabet_mastered = UserAlphabet.query.filter(
-        UserAlphabet.user_id == current_user.id,
-        UserAlphabet.familiarity_level >= 4
-    ).count()
+    alphabet_mastered = len(get_learned_sets(current_user.id, 'alphabet').mastered)
 
     # 词汇统计
     total_vocab = Vocabulary.query.filter_by(is_active=True).count()
@@ -29,10 +33,7 @@ def select():
         UserVocabulary.user_id == current_user.id,
         UserVocabulary.next_review_date <= datetime.utcnow()
     ).count()
-    vocab_mastered = UserVocabulary.query.filter(
-        UserVocabulary.user_id == current_user.id,
-        UserVocabulary.familiarity_level >= 4
-    ).count()
+    vocab_mastered = len(get_learned_sets(current_user.id, 'vocab').mastered)
 
     return render_template('learning/select.html',
         alphabet_stats={
@@ -55,11 +56,21 @@ def generate_true_false(correct_vocab, all_vocab):
     if is_correct_pairing:
         shown_meaning = correct_vocab['chinese_meaning']
     else:
+        # 配置了内容包时直接取预生成题库中的错误配对
+        catalog = get_vocab_catalog()
+        row = catalog.pairing_row(correct_vocab['id']) if catalog is not None else None
         # 选择一个错误的意思
-        other_meanings = [v['chinese_meaning'] for v in all_vocab
-                         if v['chinese_meaning'] != correct_vocab['chinese_meaning']]
-        if other_meanings:
+        other_meanings = [] if row is not None else [v['chinese_meaning'] for v in all_vocab
+                                                     if v['chinese_meaning'] != correct_vocab['chinese_meaning']]
+        if row is not None:
+            shown_meaning = catalog.meaning(row)
+        elif other_meanings:
             shown_meaning = random.choice(other_meanings)
+        elif catalog is not None:
+            # 从共享词汇目录中抽取
+            sampled = catalog.sample_distractors(correct_vocab['chinese_meaning'], k=1)
+            shown_meaning = sampled[0] if sampled else correct_vocab['chinese_meaning']
+            is_correct_pairing = not sampled
         else:
             # 如果没有其他词汇，从数据库获取
             wrong_vocab = Vocabulary.query.filter(
@@ -73,46 +84,122 @@ def generate_true_false(correct_vocab, all_vocab):
 
 
 def generate_options(correct_vocab, all_vocab):
-    """生成选择题选项（1个正确 + 3个干扰项）"""
+    """
+    生成选择题选项（1个正确 + 3个干扰项）
+
+    配置了内容包时从预生成题库（见 question_bank.py）中随机取一组干扰项；否则现场生成，
+    干扰项中最多 CONFUSABLE_OPTIONS 个取自易混淆近邻表（见 confusability.py），其余随机抽取。
+    每个选项带上对应的词汇 id，答错时记录所选的干扰项。
+    """
     correct_answer = correct_vocab['chinese_meaning']
-    options = [{'text': correct_answer, 'is_correct': True}]
+    options = [{'id': correct_vocab['id'], 'text': correct_answer, 'is_correct': True}]
+
+    catalog = get_vocab_catalog()
+    if catalog is not None:
+        rows = catalog.question_rows(correct_vocab['id']) or []
+        # 词汇很少时题库中的一组可能凑不满，从目录中随机补充
+        if len(rows) < 3:
+            rows += catalog.sample_distractor_rows(correct_answer, correct_vocab.get('category'),
+                                                   k=3 - len(rows), exclude=[catalog.meaning(r) for r in rows])
+        for row in rows:
+            options.append({'id': catalog.ids[row], 'text': catalog.meaning(row), 'is_correct': False})
+        random.shuffle(options)
+        return options
+
+    # 易混淆近邻（一次按主键查询）
+    neighbors = neighbor_ids('vocab', correct_vocab['id'])
+    confusable = []
+    if neighbors:
+        meanings = dict(db.session.execute(
+            db.select(Vocabulary.id, Vocabulary.chinese_meaning)
+            .where(Vocabulary.id.in_(neighbors), Vocabulary.is_active == True)
+        ).all())
+        candidates = {}
+        for vocab_id in neighbors:
+            if vocab_id in meanings and meanings[vocab_id] != correct_answer:
+                candidates.setdefault(meanings[vocab_id], vocab_id)
+        confusable = [{'id': vocab_id, 'chinese_meaning': meaning} for vocab_id, meaning in
+                      pick_confusable([(vocab_id, meaning) for meaning, vocab_id in candidates.items()])]
+    used = {correct_answer, *(d['chinese_meaning'] for d in confusable)}
+    needed = 3 - len(confusable)
 
     # 收集干扰项候选
     same_category = [v for v in all_vocab
                      if v.get('category') == correct_vocab.get('category')
-                     and v['chinese_meaning'] != correct_answer]
+                     and v['chinese_meaning'] not in used]
 
     other_category = [v for v in all_vocab
                       if v.get('category') != correct_vocab.get('category')
-                      and v['chinese_meaning'] != correct_answer]
+                      and v['chinese_meaning'] not in used]
 
     # 优先从同分类中选择干扰项
     distractors = []
-    if len(same_category) >= 3:
-        distractors = random.sample(same_category, 3)
+    if len(same_category) >= needed:
+        distractors = random.sample(same_category, needed)
     else:
         distractors = same_category.copy()
-        needed = 3 - len(distractors)
-        if other_category and needed > 0:
-            distractors += random.sample(other_category, min(needed, len(other_category)))
+        remaining = needed - len(distractors)
+        if other_category and remaining > 0:
+            distractors += random.sample(other_category, min(remaining, len(other_category)))
+    distractors = confusable + distractors
 
     # 如果还不够，从数据库补充
     if len(distractors) < 3:
-        needed = 3 - len(distractors)
+        remaining = 3 - len(distractors)
         existing_meanings = [correct_answer] + [d['chinese_meaning'] for d in distractors]
         extra = Vocabulary.query.filter(
             Vocabulary.is_active == True,
             ~Vocabulary.chinese_meaning.in_(existing_meanings)
-        ).limit(needed).all()
+        ).limit(remaining).all()
         for v in extra:
-            distractors.append({'chinese_meaning': v.chinese_meaning})
+            distractors.append({'id': v.id, 'chinese_meaning': v.chinese_meaning})
 
     for d in distractors:
-        options.append({'text': d['chinese_meaning'], 'is_correct': False})
+        options.append({'id': d.get('id'), 'text': d['chinese_meaning'], 'is_correct': False})
 
     random.shuffle(options)
     return options
 
+
+def select_new_words(user_id, limit, ability=None):
+    """
+    选出用户未学过的新词汇（返回词汇字典列表）
+
+    有校准能力值时优先选择难度最接近 target_difficulty(ability) 的词，否则按难度从低到高
+    """
+    target = target_difficulty(ability) if ability is not None else None
+    catalog = get_vocab_catalog()
+    if catalog is not None:
+        # 共享词汇目录：用已学位图在内存中过滤
+        learned = get_learned_sets(user_id, 'vocab').seen
+        return [catalog.to_dict(row) for row in catalog.new_words(learned, limit, target)]
+
+    # 获取用户已学过的词汇 ID
+    learned_ids = db.select(UserVocabulary.vocabulary_id).where(
+        UserVocabulary.user_id == user_id
+    )
+
+    # 获取新词汇（用户未学过的）
+    difficulty = effective_difficulty_column()
+    if target is not None:
+        difficulty = db.func.abs(difficulty - target)
+    new_vocab = Vocabulary.query.filter(
+        Vocabulary.is_active == True,
+        ~Vocabulary.id.in_(learned_ids)
+    ).order_by(
+        difficulty.asc(),
+        Vocabulary.id.asc()
+    ).limit(limit).all()
+
+    return [{
+        'id': vocab.id,
+        'thai_word': vocab.thai_word,
+        'chinese_meaning': vocab.chinese_meaning,
+        'pronunciation': vocab.pronunciation,
+        'category': vocab.category,
+    } for vocab in new_vocab]
+
+
 @learning_bp.route('/')
 @login_required
 def index():
@@ -124,20 +211,32 @@ def index():
     ).count()
 
     # 获取新词汇数
-    learned_ids = db.session.query(UserVocabulary.vocabulary_id).filter(
-        UserVocabulary.user_id == current_user.id
-    ).subquery()
-    new_count = Vocabulary.query.filter(
-        Vocabulary.is_active == True,
-        ~Vocabulary.id.in_(learned_ids)
-    ).count()
+    catalog = get_vocab_catalog()
+    if catalog is not None:
+        new_count = len(catalog.id_bitmap - get_learned_sets(current_user.id, 'vocab').seen)
+    else:
+        learned_ids = db.session.query(UserVocabulary.vocabulary_id).filter(
+            UserVocabulary.user_id == current_user.id
+        ).subquery()
+        new_count = Vocabulary.query.filter(
+            Vocabulary.is_active == True,
+            ~Vocabulary.id.in_(learned_ids)
+        ).count()
 
     return render_template('learning/index.html',
         due_count=due_count,
-        new_count=new_count
+        new_count=new_count,
+        forecast=user_forecast(current_user.id)
     )
 
 
+@learning_bp.route('/forecast')
+@login_required
+def forecast():
+    """未来 30 天每天到期的复习量"""
+    return jsonify(user_forecast(current_user.id))
+
+
 @learning_bp.route('/start')
 @learning_bp.route('/start/<mode>')
 @login_required
@@ -168,41 +267,15 @@ def start(mode='flashcard'):
 
     # 如果不足 MAX_SESSION_WORDS，添加新词汇
     if len(session_vocab) < MAX_SESSION_WORDS:
-        # 获取用户已学过的词汇 ID
-        learned_ids = db.session.query(UserVocabulary.vocabulary_id).filter(
-            UserVocabulary.user_id == current_user.id
-        ).subquery()
+        new_vocab = select_new_words(current_user.id, MAX_SESSION_WORDS - len(session_vocab),
+                                     ability=current_user.ability)
 
-        # 获取新词汇（用户未学过的）
-        new_vocab = Vocabulary.query.filter(
-            Vocabulary.is_active == True,
-            ~Vocabulary.id.in_(learned_ids)
-        ).order_by(
-            Vocabulary.difficulty_level.asc(),
-            Vocabulary.id.asc()
-        ).limit(MAX_SESSION_WORDS - len(session_vocab)).all()
+        # 为新词汇创建 UserVocabulary 记录（重复请求时已存在的记录保持不变）
+        ensure_vocab_progress(current_user.id, [vocab['id'] for vocab in new_vocab])
 
         for vocab in new_vocab:
-            # 为新词汇创建 UserVocabulary 记录
-            uv = UserVocabulary(
-                user_id=current_user.id,
-                vocabulary_id=vocab.id,
-                familiarity_level=0,
-                next_review_date=datetime.utcnow(),
-                review_count=0,
-                correct_count=0
-            )
-            db.session.add(uv)
-
-            session_vocab.append({
-                'id': vocab.id,
-                'thai_word': vocab.thai_word,
-                'chinese_meaning': vocab.chinese_meaning,
-                'pronunciation': vocab.pronunciation,
-                'category': vocab.category,
-                'is_new': True,
-                'familiarity_level': 0
-            })
+            vocab.update(is_new=True, familiarity_level=0)
+            session_vocab.append(vocab)
 
         db.session.commit()
 
@@ -268,32 +341,8 @@ def submit():
     if not vocab_id:
         return jsonify({'success': False, 'error': '缺少词汇 ID'}), 400
 
-    # 获取或创建 UserVocabulary 记录
-    uv = UserVocabulary.query.filter_by(
-        user_id=current_user.id,
-        vocabulary_id=vocab_id
-    ).first()
-
-    if not uv:
-        # 创建新记录
-        uv = UserVocabulary(
-            user_id=current_user.id,
-            vocabulary_id=vocab_id,
-            familiarity_level=familiarity,
-            next_review_date=calculate_next_review_date(familiarity, 0),
-            review_count=1,
-            correct_count=1 if familiarity >= 3 else 0,
-            last_reviewed=datetime.utcnow()
-        )
-        db.session.add(uv)
-    else:
-        # 更新现有记录
-        uv.familiarity_level = familiarity
-        uv.review_count += 1
-        if familiarity >= 3:
-            uv.correct_count += 1
-        uv.next_review_date = calculate_next_review_date(familiarity, uv.review_count)
-        uv.last_reviewed = datetime.utcnow()
+    # 创建或更新 UserVocabulary 记录（单条 upsert）
+    record_vocab_rating(current_user.id, vocab_id, familiarity)
 
     # 创建测验尝试记录
     attempt = QuizAttempt(
@@ -352,27 +401,32 @@ def check_answer():
         return jsonify({'success': False, 'error': '缺少参数'}), 400
 
     # 获取正确答案
-    vocab = Vocabulary.query.get(vocab_id)
+    vocab = db.session.get(Vocabulary, vocab_id)
     if not vocab:
         return jsonify({'success': False, 'error': '词汇不存在'}), 404
 
     is_correct = (selected_answer == vocab.chinese_meaning)
 
-    # 更新 UserVocabulary
-    uv = UserVocabulary.query.filter_by(
-        user_id=current_user.id,
-        vocabulary_id=vocab_id
-    ).first()
-
-    if uv:
-        if is_correct:
-            uv.familiarity_level = min(uv.familiarity_level + 1, 5)
-            uv.correct_count += 1
+    # 答错时所选干扰项对应的词汇（用于构建易混淆近邻表）
+    # 只接受释义与所选答案一致的启用词汇，客户端传入的其他 id 一律记为 NULL，避免污染近邻表
+    selected_id = data.get('selected_id')
+    if is_correct or type(selected_id) is not int or selected_id == vocab.id:
+        selected_id = None
+    else:
+        catalog = get_vocab_catalog()
+        if catalog is not None:
+            row = catalog.row_of(selected_id)
+            selected_meaning = catalog.meaning(row) if row is not None else None
         else:
-            uv.familiarity_level = 1  # 答错重置
-        uv.review_count += 1
-        uv.next_review_date = calculate_next_review_date(uv.familiarity_level, uv.review_count)
-        uv.last_reviewed = datetime.utcnow()
+            selected_meaning = db.session.scalar(
+                db.select(Vocabulary.chinese_meaning)
+                .where(Vocabulary.id == selected_id, Vocabulary.is_active == True)
+            )
+        if selected_meaning != selected_answer:
+            selected_id = None
+
+    # 更新 UserVocabulary（答错重置熟悉度）
+    record_vocab_answer(current_user.id, vocab_id, is_correct)
 
     # 记录答题
     attempt = QuizAttempt(
@@ -380,7 +434,8 @@ def check_answer():
         vocabulary_id=vocab_id,
         quiz_type='multiple_choice',
         is_correct=is_correct,
-        time_taken=time_taken
+        time_taken=time_taken,
+        selected_vocabulary_id=selected_id
     )
     db.session.add(attempt)
     db.session.commit()
@@ -416,21 +471,8 @@ def check_judgment():
     # 判断用户是否答对
     is_user_correct = (user_answer == is_correct_pairing)
 
-    # 更新 UserVocabulary
-    uv = UserVocabulary.query.filter_by(
-        user_id=current_user.id,
-        vocabulary_id=vocab_id
-    ).first()
-
-    if uv:
-        if is_user_correct:
-            uv.familiarity_level = min(uv.familiarity_level + 1, 5)
-            uv.correct_count += 1
-        else:
-            uv.familiarity_level = 1  # 答错重置
-        uv.review_count += 1
-        uv.next_review_date = calculate_next_review_date(uv.familiarity_level, uv.review_count)
-        uv.last_reviewed = datetime.utcnow()
+    # 更新 UserVocabulary（答错重置熟悉度）
+    record_vocab_answer(current_user.id, vocab_id, is_user_correct)
 
     # 记录答题
     attempt = QuizAttempt(
@@ -508,11 +550,9 @@ def summary():
     mastery_percent = round(familiar / completed * 100) if completed > 0 else 0
 
     # 获取用户总体统计
-    total_learned = UserVocabulary.query.filter_by(user_id=current_user.id).count()
-    total_mastered = UserVocabulary.query.filter(
-        UserVocabulary.user_id == current_user.id,
-        UserVocabulary.familiarity_level >= 4
-    ).count()
+    learned = get_learned_sets(current_user.id, 'vocab')
+    total_learned = len(learned.seen)
+    total_mastered = len(learned.mastered)
 
     return render_template('learning/summary.html',
         session_total=total,
@@ -0,0 +1,272 @@
+"""
+活跃用户统计（HyperLogLog）
+
+每天每类活动（learning：词汇答题；conversation：对话练习）一个 HyperLogLog 草图。
+答题时只更新进程内的草图（一次哈希和一次字节比较），寄存器有变化时标记为待写入；
+progress.py 每隔 ACTIVITY_FLUSH_INTERVAL 秒把待写入的草图合并进 activity_sketches 表
+（逐寄存器取最大值，重复合并不影响结果）。之后没有新的答题时（进程空闲或即将被回收），
+后台线程按同样的间隔写入，进程退出时再写入一次（ACTIVITY_BACKGROUND_FLUSH）。
+
+日活/周活/月活都是若干天草图的合并，误差约 1.6%（2^12 个寄存器）。
+rebuild_sketches 从答题记录精确重建学习草图，供离线任务校准；对话进度只保留最后练习时间，
+只能补充对话草图，不能重建。
+"""
+import atexit
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import ActivitySketch, QuizAttempt, UserConversation
+
+logger = logging.getLogger(__name__)
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+ACTIVITY_KINDS = ('learning', 'conversation')
+EXACT_KINDS = ('learning',)   # 有完整原始记录、可以精确重建的类型
+
+
+class HyperLogLog:
+    """基数估计草图"""
+    __slots__ = ('registers',)
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    def add(self, value):
+        """加入一个元素，返回寄存器是否发生变化"""
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        index = h >> (64 - PRECISION)
+        rest = h & ((1 << (64 - PRECISION)) - 1)
+        rank = 64 - PRECISION - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """并入另一个草图，返回是否发生变化"""
+        merged = bytearray(map(max, self.registers, other.registers))
+        changed = merged != self.registers
+        self.registers = merged
+        return changed
+
+    def copy(self):
+        return HyperLogLog(self.registers)
+
+    def count(self):
+        zeros = self.registers.count(0)
+        if zeros == REGISTERS:
+            return 0
+        estimate = _ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -r for r in self.registers)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # 小基数时用线性计数修正
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return round(estimate)
+
+    def to_bytes(self):
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        return cls(zlib.decompress(blob))
+
+    @classmethod
+    def union(cls, sketches):
+        result = cls()
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+
+class ActivityTracker:
+    """进程内按 (日期, 类型) 累积的草图"""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._sketches = {}   # (date, kind) -> HyperLogLog
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher_pid = None
+        self._atexit_registered = False
+
+    def add(self, kind, user_id, day):
+        with self._lock:
+            key = (day, kind)
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = HyperLogLog()
+            if sketch.add(user_id):
+                self._dirty.add(key)
+
+    def flush_due(self):
+        return bool(self._dirty) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def take_dirty(self, today):
+        """
+        取出待写入的草图副本（调用方负责写入数据库）
+
+        当天的草图继续保留在进程内，之后每次写入的都是全天累积值，
+        因此某次写入所在的事务回滚也会在下次写入时补上；已写入的往日草图被丢弃。
+        """
+        with self._lock:
+            items = [(key, self._sketches[key].copy()) for key in sorted(self._dirty)]
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+            for key in [key for key in self._sketches if key[0] < today]:
+                del self._sketches[key]
+            return items
+
+    def snapshot(self):
+        with self._lock:
+            return [(key, sketch.copy()) for key, sketch in self._sketches.items()]
+
+    def start_background_flush(self, app):
+        """
+        启动本进程的后台写入线程（fork 出的子进程中会重新启动），并在进程退出时写入一次
+
+        答题请求中的写入只在之后还有答题时发生，空闲进程最后一段时间的草图靠这里写入。
+        """
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            if not self._atexit_registered:
+                atexit.register(self.flush_pending, app)
+                self._atexit_registered = True
+        threading.Thread(target=self._flush_loop, args=(app,), name='activity-flush', daemon=True).start()
+
+    def _flush_loop(self, app):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush_pending(app)
+
+    def flush_pending(self, app):
+        """在独立的应用上下文和事务中写入待写入的草图"""
+        if not self._dirty:
+            return
+        from app.utils.progress import flush_activity
+        with app.app_context():
+            try:
+                flush_activity()
+                db.session.commit()
+            except Exception:
+                logger.exception('写入活跃用户草图失败')
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def get_activity_tracker():
+    tracker = current_app.extensions.get('activity_tracker')
+    if tracker is None:
+        tracker = current_app.extensions['activity_tracker'] = ActivityTracker(
+            current_app.config.get('ACTIVITY_FLUSH_INTERVAL', 60))
+    if current_app.config.get('ACTIVITY_BACKGROUND_FLUSH'):
+        tracker.start_background_flush(current_app._get_current_object())
+    return tracker
+
+
+def load_sketches(kind, start, end):
+    """读取 [start, end] 日期范围内的草图（含本进程尚未写入的部分）"""
+    sketches = {day: HyperLogLog.from_bytes(registers) for day, registers in db.session.execute(
+        db.select(ActivitySketch.day, ActivitySketch.registers)
+        .where(ActivitySketch.kind == kind, ActivitySketch.day >= start, ActivitySketch.day <= end)
+    )}
+    for (day, sketch_kind), sketch in get_activity_tracker().snapshot():
+        if sketch_kind == kind and start <= day <= end:
+            if day in sketches:
+                sketches[day].merge(sketch)
+            else:
+                sketches[day] = sketch
+    return sketches
+
+
+def activity_summary(kind, today=None, trend_days=7):
+    """
+    活跃用户统计
+
+    Returns:
+        dict: dau、wau（最近 7 天）、mau（最近 30 天），
+              daily（最近 trend_days 天每天的活跃数，[{date, count}]）
+    """
+    today = today or datetime.utcnow().date()
+    sketches = load_sketches(kind, today - timedelta(days=29), today)
+
+    def window(days):
+        return HyperLogLog.union(sketch for day, sketch in sketches.items()
+                                 if day > today - timedelta(days=days)).count()
+
+    daily = []
+    for i in range(trend_days - 1, -1, -1):
+        day = today - timedelta(days=i)
+        sketch = sketches.get(day)
+        daily.append({'date': day.strftime('%m-%d'), 'count': sketch.count() if sketch else 0})
+
+    return {'dau': daily[-1]['count'], 'wau': window(7), 'mau': window(30), 'daily': daily}
+
+
+def _daily_users(kind, start):
+    """
+    从原始记录查询每天的活跃用户 {date: {user_id}}
+
+    learning 来自答题记录，是精确值；conversation 只有每个对话的最后练习时间，
+    得到的只是每天活跃用户的子集（之后又练习过的用户不会出现在之前的日期）。
+    """
+    column = QuizAttempt.created_at if kind == 'learning' else UserConversation.last_practiced
+    user_id = QuizAttempt.user_id if kind == 'learning' else UserConversation.user_id
+    day = db.func.date(column)
+    users = {}
+    for key, uid in db.session.execute(db.select(day, user_id).where(column >= start).distinct()):
+        users.setdefault(datetime.strptime(str(key)[:10], '%Y-%m-%d').date(), set()).add(uid)
+    return users
+
+
+def rebuild_sketches(days=30, now=None):
+    """
+    从原始记录重建最近 days 天的草图
+
+    EXACT_KINDS（learning）从答题记录精确重建，覆盖已有草图；conversation 的原始记录只是
+    子集，只并入已有草图（逐寄存器取最大值，只增不减），不会让已记录的用户消失。
+
+    Returns:
+        dict: 类型 -> [(日期, 原始记录中的活跃数, 草图估计值)]
+    """
+    now = now or datetime.utcnow()
+    start = now.date() - timedelta(days=days - 1)
+    start_time = datetime.combine(start, datetime.min.time())
+    report = {}
+    for kind in ACTIVITY_KINDS:
+        daily_users = _daily_users(kind, start_time)
+        existing = {}
+        if kind in EXACT_KINDS:
+            db.session.execute(db.delete(ActivitySketch).where(
+                ActivitySketch.kind == kind, ActivitySketch.day >= start))
+        else:
+            existing = {day: HyperLogLog.from_bytes(registers) for day, registers in db.session.execute(
+                db.select(ActivitySketch.day, ActivitySketch.registers)
+                .where(ActivitySketch.kind == kind, ActivitySketch.day.in_(list(daily_users))))}
+            db.session.execute(db.delete(ActivitySketch).where(
+                ActivitySketch.kind == kind, ActivitySketch.day.in_(list(existing))))
+        rows, report[kind] = [], []
+        for day in sorted(daily_users):
+            sketch = existing.get(day) or HyperLogLog()
+            for uid in daily_users[day]:
+                sketch.add(uid)
+            rows.append({'day': day, 'kind': kind, 'registers': sketch.to_bytes(), 'updated_at': now})
+            report[kind].append((day, len(daily_users[day]), sketch.count()))
+        if rows:
+            db.session.execute(db.insert(ActivitySketch), rows)
+    db.session.commit()
+    return report
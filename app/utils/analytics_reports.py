@@ -0,0 +1,203 @@
+"""
+学习分析报表
+
+所有报表只读取 AnalyticsSnapshot（analytics_store.py）中的数组，用 bincount、
+排序和分组归约完成聚合，不访问数据库。
+"""
+import numpy as np
+
+from app.utils.analytics_store import day_date
+
+TIME_PERCENTILES = (50, 90, 99)
+
+
+def _rate(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(denominator)), where=denominator > 0)
+
+
+def _lookup(keys, values, default=-1):
+    """按 id 直接索引的查找表"""
+    size = int(keys.max()) + 1 if len(keys) else 0
+    table = np.full(size, default, dtype=np.int64)
+    table[keys] = values
+    return table
+
+
+def accuracy_by_quiz_type(snapshot):
+    """
+    各题型的答题数和正确率
+
+    Returns:
+        list[dict]: quiz_type、attempts、correct、accuracy（按答题数降序）
+    """
+    attempts = snapshot.attempts
+    size = len(snapshot.quiz_types)
+    total = np.bincount(attempts['quiz_type'], minlength=size)
+    correct = np.bincount(attempts['quiz_type'], weights=attempts['is_correct'], minlength=size)
+    accuracy = _rate(correct, total)
+    return [
+        {'quiz_type': snapshot.quiz_types[i], 'attempts': int(total[i]), 'correct': int(correct[i]),
+         'accuracy': round(float(accuracy[i]), 4)}
+        for i in np.argsort(-total, kind='stable') if total[i]
+    ]
+
+
+def time_taken_percentiles(snapshot, percentiles=TIME_PERCENTILES):
+    """
+    各题型答题用时（秒）的分位数，未记录用时的答题不计入
+
+    Returns:
+        list[dict]: quiz_type、count、p50/p90/...（第一项 quiz_type 为 'all'，表示全部题型）
+    """
+    attempts = snapshot.attempts
+    valid = attempts['time_taken'] >= 0
+    taken = attempts['time_taken'][valid]
+    types = attempts['quiz_type'][valid]
+
+    # 按 (题型, 用时) 排序后每个题型是连续的一段，分位数位置直接按段内下标计算
+    order = np.lexsort((taken, types))
+    taken, types = taken[order], types[order]
+    starts = np.searchsorted(types, np.arange(len(snapshot.quiz_types)))
+    ends = np.searchsorted(types, np.arange(len(snapshot.quiz_types)), side='right')
+
+    rows = []
+    if len(taken):
+        values = np.percentile(taken, percentiles)
+        rows.append({'quiz_type': 'all', 'count': len(taken),
+                     **{f'p{p}': float(v) for p, v in zip(percentiles, values)}})
+    for code, (start, end) in enumerate(zip(starts, ends)):
+        if end > start:
+            values = np.percentile(taken[start:end], percentiles)
+            rows.append({'quiz_type': snapshot.quiz_types[code], 'count': int(end - start),
+                         **{f'p{p}': float(v) for p, v in zip(percentiles, values)}})
+    return rows
+
+
+def cohort_retention(snapshot, weeks=8, cohorts=12):
+    """
+    按首次答题所在周分组的留存曲线
+
+    第 k 周留存 = 首次答题后第 k 周仍有答题的用户数 / 该周新用户数（周一为一周开始）。
+
+    Args:
+        weeks: 曲线长度（第 0 周到第 weeks 周）
+        cohorts: 只返回最近多少个队列
+
+    Returns:
+        list[dict]: cohort（周一日期）、users、retention（长度 weeks + 1，最新的队列尾部为 None）
+    """
+    attempts = snapshot.attempts
+    if not len(attempts['user_id']):
+        return []
+    # 1970-01-01 是周四，+3 后按 7 整除得到以周一开始的周序号
+    week = (attempts['day'].astype(np.int64) + 3) // 7
+    pairs = np.unique(attempts['user_id'].astype(np.int64) << 32 | week)
+    users, active_week = pairs >> 32, pairs & 0xFFFFFFFF
+
+    # pairs 按 (用户, 周) 排序，每个用户的第一项就是首次答题周
+    first = np.ones(len(users), dtype=bool)
+    first[1:] = users[1:] != users[:-1]
+    cohort_week = np.repeat(active_week[first], np.diff(np.append(np.flatnonzero(first), len(users))))
+    offset = active_week - cohort_week
+
+    cohort_ids, cohort_index = np.unique(cohort_week, return_inverse=True)
+    keep = offset <= weeks
+    counts = np.bincount(cohort_index[keep] * (weeks + 1) + offset[keep],
+                         minlength=len(cohort_ids) * (weeks + 1)).reshape(len(cohort_ids), weeks + 1)
+    sizes = counts[:, 0]
+    latest = int(week.max())
+
+    rows = []
+    for i in range(max(0, len(cohort_ids) - cohorts), len(cohort_ids)):
+        observed = latest - int(cohort_ids[i])
+        rows.append({
+            'cohort': day_date(cohort_ids[i] * 7 - 3),
+            'users': int(sizes[i]),
+            'retention': [round(float(counts[i, k] / sizes[i]), 4) if k <= observed else None
+                          for k in range(weeks + 1)],
+        })
+    return rows
+
+
+def category_difficulty(snapshot):
+    """
+    各分类的难度：答题正确率、平均用时、平均熟悉度和掌握比例（familiarity_level >= 4）
+
+    Returns:
+        list[dict]: 按正确率升序（最难的在前），没有答题记录的分类排在最后
+    """
+    vocabulary = snapshot.tables['vocabulary']
+    category_of = _lookup(vocabulary['id'], vocabulary['category'])
+    size = len(snapshot.categories)
+
+    attempts = snapshot.attempts
+    known = attempts['vocabulary_id'] < len(category_of)
+    categories = category_of[attempts['vocabulary_id'][known]]
+    valid = categories >= 0
+    categories = categories[valid]
+    total = np.bincount(categories, minlength=size)
+    correct = np.bincount(categories, weights=attempts['is_correct'][known][valid], minlength=size)
+    taken = attempts['time_taken'][known][valid]
+    timed = taken >= 0
+    time_count = np.bincount(categories[timed], minlength=size)
+    time_sum = np.bincount(categories[timed], weights=taken[timed], minlength=size)
+
+    progress = snapshot.tables['user_vocabulary']
+    known = progress['vocabulary_id'] < len(category_of)
+    progress_categories = category_of[progress['vocabulary_id'][known]]
+    familiarity = progress['familiarity_level'][known].astype(np.float64)
+    valid = progress_categories >= 0
+    learners = np.bincount(progress_categories[valid], minlength=size)
+    familiarity_sum = np.bincount(progress_categories[valid], weights=familiarity[valid], minlength=size)
+    mastered = np.bincount(progress_categories[valid], weights=familiarity[valid] >= 4, minlength=size)
+
+    words = np.bincount(vocabulary['category'], minlength=size)
+    accuracy = _rate(correct, total)
+    mean_time = _rate(time_sum, time_count)
+    mean_familiarity = _rate(familiarity_sum, learners)
+    mastered_rate = _rate(mastered, learners)
+
+    order = np.lexsort((accuracy, total == 0))
+    return [
+        {'category': snapshot.categories[i] or '未分类', 'words': int(words[i]), 'attempts': int(total[i]),
+         'accuracy': round(float(accuracy[i]), 4), 'mean_time': round(float(mean_time[i]), 1),
+         'progress_rows': int(learners[i]), 'mean_familiarity': round(float(mean_familiarity[i]), 2),
+         'mastered_rate': round(float(mastered_rate[i]), 4)}
+        for i in order if words[i]
+    ]
+
+
+def vocabulary_rankings(snapshot, limit=5, min_attempts=5):
+    """
+    错误率最高和答题最多的词汇
+
+    Returns:
+        (difficult, popular)：[(vocabulary_id, 答题数, 答错数)]，分别按错误率和答题数降序
+    """
+    attempts = snapshot.attempts
+    total = np.bincount(attempts['vocabulary_id'])
+    wrong = np.bincount(attempts['vocabulary_id'], weights=~attempts['is_correct'], minlength=len(total))
+
+    candidates = np.flatnonzero(total >= min_attempts)
+    error_rate = wrong[candidates] / total[candidates]
+    difficult = candidates[np.lexsort((-wrong[candidates], -error_rate))[:limit]]
+    popular = np.flatnonzero(total)
+    popular = popular[np.argsort(-total[popular], kind='stable')[:limit]]
+    return ([(int(i), int(total[i]), int(wrong[i])) for i in difficult],
+            [(int(i), int(total[i]), int(wrong[i])) for i in popular])
+
+
+def conversation_engagement(snapshot):
+    """
+    对话练习概况
+
+    Returns:
+        dict: learners、practices、conversations（有人练习过的对话数）、familiarity（0-5 各级的行数）
+    """
+    progress = snapshot.tables['user_conversation']
+    return {
+        'learners': int(len(np.unique(progress['user_id']))),
+        'practices': int(progress['practice_count'].sum()),
+        'conversations': int(len(np.unique(progress['conversation_id']))),
+        'familiarity': np.bincount(np.clip(progress['familiarity_level'], 0, 5), minlength=6).tolist(),
+    }
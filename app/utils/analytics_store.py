@@ -0,0 +1,319 @@
+"""
+列式分析快照
+
+把 QuizAttempt、UserVocabulary、UserConversation 导出为每列一个定长类型 NumPy 数组的
+.npy 文件，报表（analytics_reports.py）只读取快照，不再对在线表做聚合查询。
+
+目录结构：
+    manifest.json           当前版本：答题分段列表、进度表目录、高水位 id、编码表
+    seg-000001/<列>.npy     答题记录分段（每次刷新只追加 id 大于高水位的新行）
+    tables-000002/<表>.<列>.npy  词汇、用户和进度表的完整快照（原地更新的表每次整体重建）
+
+新文件全部写完后才原子替换 manifest.json，读取方总是看到完整的一版；
+分段数超过 MAX_SEGMENTS 时合并为一个。首次构建可以同时读入答题归档（attempt_archive.py），
+之后归档删除的在线行已经在快照中。
+
+高水位按 id 推进：刷新时尚未提交、id 小于高水位的答题记录不会被补读，
+需要精确结果时用 rebuild=True 重建。
+"""
+import json
+import os
+import shutil
+from datetime import datetime, date
+
+import numpy as np
+from flask import current_app
+
+from app import db
+from app.models import User, Vocabulary, UserVocabulary, QuizAttempt, UserConversation
+from app.utils.attempt_archive import QUIZ_TYPES, remap_codes, read_archived
+
+MAX_SEGMENTS = 16
+READ_BATCH_SIZE = 100000
+
+ATTEMPT_COLUMNS = {
+    'id': np.int64,
+    'user_id': np.int32,
+    'vocabulary_id': np.int32,
+    'quiz_type': np.uint8,
+    'is_correct': np.bool_,
+    'time_taken': np.int32,   # NULL 记为 -1
+    'day': np.int32,          # 距 1970-01-01 的天数
+}
+
+_MANIFEST = 'manifest.json'
+_EPOCH = date(1970, 1, 1)
+
+
+def analytics_path(app, create=True):
+    """快照目录（ANALYTICS_PATH，默认 instance/analytics）"""
+    path = app.config.get('ANALYTICS_PATH') or os.path.join(app.instance_path, 'analytics')
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def day_number(value):
+    """日期 -> 距 1970-01-01 的天数"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def day_date(number):
+    """距 1970-01-01 的天数 -> 日期"""
+    return date.fromordinal(_EPOCH.toordinal() + int(number))
+
+
+def _days(values):
+    """datetime 序列 -> 天数数组（None 记为 -1）"""
+    return np.array([-1 if v is None else day_number(v) for v in values], dtype=np.int32)
+
+
+# ==================== 读写文件 ====================
+
+def _read_manifest(root):
+    path = os.path.join(root, _MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_manifest(root, manifest):
+    tmp = os.path.join(root, f'{_MANIFEST}.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(root, _MANIFEST))
+
+
+def _new_dir(root, manifest, prefix):
+    manifest['next_seq'] = manifest.get('next_seq', 0) + 1
+    name = f"{prefix}-{manifest['next_seq']:06d}"
+    os.makedirs(os.path.join(root, name))
+    return name
+
+
+def _save_columns(directory, columns, prefix=''):
+    for name, values in columns.items():
+        np.save(os.path.join(directory, f'{prefix}{name}.npy'), values)
+
+
+def _load_columns(directory, names, prefix='', mmap_mode='r'):
+    return {name: np.load(os.path.join(directory, f'{prefix}{name}.npy'), mmap_mode=mmap_mode) for name in names}
+
+
+# ==================== 构建 ====================
+
+def _read_attempts(after_id, quiz_types):
+    """读取 id > after_id 的答题记录（按批次，只选取列）"""
+    codes = {name: i for i, name in enumerate(quiz_types)}
+    query = db.select(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.vocabulary_id, QuizAttempt.quiz_type,
+                      QuizAttempt.is_correct, QuizAttempt.time_taken, QuizAttempt.created_at) \
+        .where(QuizAttempt.id > after_id).order_by(QuizAttempt.id)
+    chunks = []
+    result = db.session.execute(query.execution_options(yield_per=READ_BATCH_SIZE))
+    for partition in result.partitions():
+        ids, users, vocabs, types, correct, taken, created = zip(*partition)
+        for name in types:
+            if name not in codes:
+                codes[name] = len(quiz_types)
+                quiz_types.append(name)
+        chunks.append({
+            'id': np.array(ids, dtype=np.int64),
+            'user_id': np.array(users, dtype=np.int32),
+            'vocabulary_id': np.array(vocabs, dtype=np.int32),
+            'quiz_type': np.array([codes[t] for t in types], dtype=np.uint8),
+            'is_correct': np.array(correct, dtype=np.bool_),
+            'time_taken': np.array([-1 if t is None else t for t in taken], dtype=np.int32),
+            'day': _days(created),
+        })
+    return _concat(chunks)
+
+
+def _concat(chunks):
+    if not chunks:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in ATTEMPT_COLUMNS.items()}
+    return {name: np.concatenate([c[name] for c in chunks]).astype(dtype, copy=False)
+            for name, dtype in ATTEMPT_COLUMNS.items()}
+
+
+def _archived_attempts(archive, quiz_types, exclude_ids):
+    """归档中的答题记录（排除在线表中仍存在的 id）"""
+    columns, archive_types = read_archived(archive, columns=(
+        'id', 'user_id', 'vocabulary_id', 'quiz_type', 'is_correct', 'time_taken', 'created_at'))
+    keep = ~np.isin(columns['id'], exclude_ids)
+    epoch = np.datetime64(_EPOCH, 'D')
+    return {
+        'id': columns['id'][keep],
+        'user_id': columns['user_id'][keep],
+        'vocabulary_id': columns['vocabulary_id'][keep],
+        'quiz_type': remap_codes(quiz_types, archive_types)[columns['quiz_type'][keep]],
+        'is_correct': columns['is_correct'][keep],
+        'time_taken': columns['time_taken'][keep],
+        'day': (columns['created_at'][keep].astype('datetime64[D]') - epoch).astype(np.int32),
+    }
+
+
+def _table_columns():
+    """词汇、用户和进度表的完整快照"""
+    vocab = db.session.execute(db.select(Vocabulary.id, Vocabulary.category, Vocabulary.difficulty_level)).all()
+    categories = sorted({row.category or '' for row in vocab})
+    category_codes = {name: i for i, name in enumerate(categories)}
+    users = db.session.execute(db.select(User.id, User.created_at)).all()
+    progress = db.session.execute(db.select(
+        UserVocabulary.user_id, UserVocabulary.vocabulary_id, UserVocabulary.familiarity_level,
+        UserVocabulary.review_count, UserVocabulary.correct_count)).all()
+    conversations = db.session.execute(db.select(
+        UserConversation.user_id, UserConversation.conversation_id, UserConversation.familiarity_level,
+        UserConversation.practice_count, UserConversation.last_practiced)).all()
+
+    def column(rows, index, dtype, default=0):
+        return np.array([default if row[index] is None else row[index] for row in rows], dtype=dtype)
+
+    tables = {
+        'vocabulary': {
+            'id': column(vocab, 0, np.int32),
+            'category': np.array([category_codes[row.category or ''] for row in vocab], dtype=np.int32),
+            'difficulty_level': column(vocab, 2, np.int8, 1),
+        },
+        'users': {
+            'id': column(users, 0, np.int32),
+            'created_day': _days(row.created_at for row in users),
+        },
+        'user_vocabulary': {
+            'user_id': column(progress, 0, np.int32),
+            'vocabulary_id': column(progress, 1, np.int32),
+            'familiarity_level': column(progress, 2, np.int8),
+            'review_count': column(progress, 3, np.int32),
+            'correct_count': column(progress, 4, np.int32),
+        },
+        'user_conversation': {
+            'user_id': column(conversations, 0, np.int32),
+            'conversation_id': column(conversations, 1, np.int32),
+            'familiarity_level': column(conversations, 2, np.int8),
+            'practice_count': column(conversations, 3, np.int32),
+            'last_practiced_day': _days(row.last_practiced for row in conversations),
+        },
+    }
+    return tables, categories
+
+
+def refresh_snapshot(root, archive=None, rebuild=False, now=None):
+    """
+    刷新分析快照
+
+    Args:
+        root: 快照目录
+        archive: 答题归档目录，首次构建（或重建）时一并读入
+        rebuild: 丢弃已有答题分段，从头构建
+        now: 刷新时间
+
+    Returns:
+        dict: new_attempts（本次追加的答题记录数）、attempts（快照中的总数）、segments、high_water
+    """
+    now = now or datetime.utcnow()
+    old = _read_manifest(root)
+    manifest = dict(old) if old and not rebuild else {
+        'high_water': 0, 'segments': [], 'quiz_types': list(QUIZ_TYPES), 'next_seq': (old or {}).get('next_seq', 0),
+    }
+    manifest['segments'] = list(manifest['segments'])
+    quiz_types = list(manifest['quiz_types'])
+
+    attempts = _read_attempts(manifest['high_water'], quiz_types)
+    if not manifest['segments'] and archive is not None:
+        archived = _archived_attempts(archive, quiz_types, attempts['id'])
+        attempts = _concat([archived, attempts])
+        order = np.argsort(attempts['id'], kind='stable')
+        attempts = {name: values[order] for name, values in attempts.items()}
+
+    if len(attempts['id']):
+        name = _new_dir(root, manifest, 'seg')
+        _save_columns(os.path.join(root, name), attempts)
+        manifest['segments'].append(name)
+        manifest['high_water'] = max(manifest['high_water'], int(attempts['id'].max()))
+
+    if len(manifest['segments']) > MAX_SEGMENTS:
+        merged = _concat([_load_columns(os.path.join(root, s), ATTEMPT_COLUMNS, mmap_mode=None)
+                          for s in manifest['segments']])
+        name = _new_dir(root, manifest, 'seg')
+        _save_columns(os.path.join(root, name), merged)
+        manifest['segments'] = [name]
+
+    tables, categories = _table_columns()
+    manifest['tables'] = _new_dir(root, manifest, 'tables')
+    directory = os.path.join(root, manifest['tables'])
+    for table, columns in tables.items():
+        _save_columns(directory, columns, prefix=f'{table}.')
+    manifest.update(quiz_types=quiz_types, categories=categories,
+                    table_columns={table: list(columns) for table, columns in tables.items()},
+                    refreshed_at=now.isoformat())
+    _write_manifest(root, manifest)
+
+    # 新版本生效后删除不再引用的目录
+    live = set(manifest['segments']) | {manifest['tables']}
+    for name in os.listdir(root):
+        if name.startswith(('seg-', 'tables-')) and name not in live:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    snapshot = load_snapshot(root)
+    return {'new_attempts': len(attempts['id']), 'attempts': len(snapshot.attempts['id']),
+            'segments': len(manifest['segments']), 'high_water': manifest['high_water']}
+
+
+# ==================== 读取 ====================
+
+class AnalyticsSnapshot:
+    """
+    一版分析快照
+
+    Attributes:
+        attempts: 列名 -> 数组（见 ATTEMPT_COLUMNS，按 id 升序）
+        tables: 表名 -> 列名 -> 数组（vocabulary、users、user_vocabulary、user_conversation）
+        quiz_types: quiz_type 编码表
+        categories: vocabulary.category 编码表（'' 表示未分类）
+        refreshed_at: 刷新时间
+    """
+
+    def __init__(self, attempts, tables, quiz_types, categories, refreshed_at):
+        self.attempts = attempts
+        self.tables = tables
+        self.quiz_types = quiz_types
+        self.categories = categories
+        self.refreshed_at = refreshed_at
+
+
+def load_snapshot(root):
+    """读取快照（不存在时返回 None）；单个分段直接 mmap，多个分段拼接"""
+    manifest = _read_manifest(root)
+    if manifest is None:
+        return None
+    segments = [_load_columns(os.path.join(root, s), ATTEMPT_COLUMNS) for s in manifest['segments']]
+    if len(segments) == 1:
+        attempts = segments[0]
+    else:
+        attempts = _concat(segments)
+    directory = os.path.join(root, manifest['tables'])
+    tables = {table: _load_columns(directory, columns, prefix=f'{table}.')
+              for table, columns in manifest['table_columns'].items()}
+    return AnalyticsSnapshot(attempts, tables, manifest['quiz_types'], manifest['categories'],
+                             datetime.fromisoformat(manifest['refreshed_at']))
+
+
+def get_analytics_snapshot():
+    """
+    当前进程缓存的快照（manifest.json 更新后重新读取）
+
+    Returns:
+        AnalyticsSnapshot，尚未构建时返回 None
+    """
+    root = analytics_path(current_app, create=False)
+    path = os.path.join(root, _MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = current_app.extensions.get('analytics_snapshot')
+    if cached is None or cached[0] != mtime:
+        cached = current_app.extensions['analytics_snapshot'] = (mtime, load_snapshot(root))
+    return cached[1]
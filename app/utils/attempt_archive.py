@@ -0,0 +1,232 @@
+"""
+答题记录归档
+
+把超过保留期的 QuizAttempt 按天写入列式归档文件（每天一个 np.savez_compressed 文件，
+每列一个定长类型的 NumPy 数组），然后分批从在线表删除，控制 quiz_attempts 及其索引的大小。
+
+读取时把压缩分区解压为每列一个 .npy 缓存文件，再以 mmap 方式打开，长时间范围的报表
+不需要把全部数据读入内存。
+
+写入是幂等的：同一天的分区已存在时先与已有数据按 id 合并，因此中途失败后重跑不会丢数据
+（已归档但尚未删除的行会在重跑时再次合并并删除）。
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import QuizAttempt
+
+DELETE_BATCH_SIZE = 5000
+
+# 题型编码（未知题型追加到分区自己的编码表）
+QUIZ_TYPES = ('flashcard', 'multiple_choice', 'true_false', 'typing', 'listening')
+
+ARCHIVE_COLUMNS = {
+    'id': np.int64,
+    'user_id': np.int32,
+    'vocabulary_id': np.int32,
+    'quiz_type': np.uint8,
+    'is_correct': np.bool_,
+    'time_taken': np.int32,           # NULL 记为 -1
+    'selected_vocabulary_id': np.int32,   # 选择题答错时所选的词汇，NULL 记为 -1
+    'created_at': 'datetime64[s]',
+}
+
+_PREFIX = 'attempts-'
+_MMAP_DIR = '.mmap'
+
+
+def archive_path(app):
+    """归档目录（ATTEMPT_ARCHIVE_PATH，默认 instance/attempt_archive）"""
+    path = app.config.get('ATTEMPT_ARCHIVE_PATH') or os.path.join(app.instance_path, 'attempt_archive')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _partition_file(root, day):
+    return os.path.join(root, f'{_PREFIX}{day.isoformat()}.npz')
+
+
+def list_partitions(root, start=None, end=None):
+    """归档中的日期列表（可按 [start, end] 过滤，已排序）"""
+    days = []
+    for name in os.listdir(root):
+        if name.startswith(_PREFIX) and name.endswith('.npz'):
+            try:
+                day = datetime.strptime(name[len(_PREFIX):-4], '%Y-%m-%d').date()
+            except ValueError:  # 不是分区文件（如其他工具留下的文件）
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+    return sorted(days)
+
+
+def remap_codes(quiz_types, names):
+    """分区编码表 names -> quiz_types 中的编码（未知题型追加到 quiz_types）"""
+    codes = []
+    for name in names:
+        if name not in quiz_types:
+            quiz_types.append(name)
+        codes.append(quiz_types.index(name))
+    return np.array(codes, dtype=np.uint8)
+
+
+# ==================== 写入 ====================
+
+def _columns_from_rows(rows, quiz_types):
+    """(id, user_id, vocabulary_id, quiz_type, is_correct, time_taken, selected_vocabulary_id, created_at)
+    行 -> 列数组"""
+    codes = {name: i for i, name in enumerate(quiz_types)}
+    ids, users, vocabs, types, correct, taken, selected, created = zip(*rows)
+    for name in types:
+        if name not in codes:
+            codes[name] = len(quiz_types)
+            quiz_types.append(name)
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'user_id': np.array(users, dtype=np.int32),
+        'vocabulary_id': np.array(vocabs, dtype=np.int32),
+        'quiz_type': np.array([codes[t] for t in types], dtype=np.uint8),
+        'is_correct': np.array(correct, dtype=np.bool_),
+        'time_taken': np.array([-1 if t is None else t for t in taken], dtype=np.int32),
+        'selected_vocabulary_id': np.array([-1 if v is None else v for v in selected], dtype=np.int32),
+        'created_at': np.array(created, dtype='datetime64[s]'),
+    }
+
+
+def _read_file(path):
+    with np.load(path) as data:
+        # 旧版本的分区没有后来增加的列，按 NULL（-1）补齐
+        size = len(data['id'])
+        columns = {name: data[name] if name in data.files else np.full(size, -1, dtype=dtype)
+                   for name, dtype in ARCHIVE_COLUMNS.items()}
+        quiz_types = [str(t) for t in data['quiz_types']]
+    return columns, quiz_types
+
+
+def _write_partition(root, day, columns, quiz_types):
+    """与已有分区按 id 合并后原子替换"""
+    path = _partition_file(root, day)
+    if os.path.exists(path):
+        old, old_types = _read_file(path)
+        old['quiz_type'] = remap_codes(quiz_types, old_types)[old['quiz_type']]
+        merged = {name: np.concatenate([old[name], columns[name]]) for name in ARCHIVE_COLUMNS}
+        _, unique = np.unique(merged['id'], return_index=True)
+        columns = {name: values[unique] for name, values in merged.items()}
+
+    # 临时文件不以 _PREFIX 开头，写到一半崩溃时不会被 list_partitions 当成分区
+    tmp = os.path.join(root, f'tmp-{os.getpid()}-{os.path.basename(path)}')
+    np.savez_compressed(tmp, quiz_types=np.array(quiz_types), **columns)
+    os.replace(tmp, path)
+    return len(columns['id'])
+
+
+def archive_attempts(root, older_than, batch_size=DELETE_BATCH_SIZE, on_day=None, dry_run=False):
+    """
+    归档并删除 created_at < older_than 的答题记录（按天处理）
+
+    Args:
+        root: 归档目录
+        older_than: 截止时间
+        batch_size: 每批删除的行数（每批提交一次）
+        on_day: 每天处理完后调用 on_day(日期, 归档行数)
+        dry_run: 只统计不写入
+
+    Returns:
+        dict: 日期 -> 该天本次归档的行数
+    """
+    day_column = db.func.date(QuizAttempt.created_at)
+    days = [datetime.strptime(str(key)[:10], '%Y-%m-%d').date() for key, in db.session.execute(
+        db.select(day_column).where(QuizAttempt.created_at < older_than).group_by(day_column).order_by(day_column)
+    )]
+
+    archived = {}
+    for day in days:
+        start = datetime.combine(day, datetime.min.time())
+        end = min(start + timedelta(days=1), older_than)
+        rows = db.session.execute(
+            db.select(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.vocabulary_id, QuizAttempt.quiz_type,
+                      QuizAttempt.is_correct, QuizAttempt.time_taken, QuizAttempt.selected_vocabulary_id,
+                      QuizAttempt.created_at)
+            .where(QuizAttempt.created_at >= start, QuizAttempt.created_at < end)
+            .order_by(QuizAttempt.id)
+        ).all()
+        if not rows:
+            continue
+        archived[day] = len(rows)
+        if dry_run:
+            continue
+
+        quiz_types = list(QUIZ_TYPES)
+        columns = _columns_from_rows(rows, quiz_types)
+        del rows
+        _write_partition(root, day, columns, quiz_types)
+
+        # 只删除已写入归档的 id
+        for batch in np.array_split(columns['id'], max(1, -(-len(columns['id']) // batch_size))):
+            db.session.execute(
+                db.delete(QuizAttempt).where(QuizAttempt.id.in_(batch.tolist()))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        if on_day is not None:
+            on_day(day, archived[day])
+    return archived
+
+
+# ==================== 读取 ====================
+
+def open_partition(root, day):
+    """
+    以 mmap 方式打开一天的分区
+
+    Returns:
+        (列名 -> 只读数组, 题型编码表)
+    """
+    path = _partition_file(root, day)
+    cache = os.path.join(root, _MMAP_DIR, day.isoformat())
+    marker = os.path.join(cache, 'quiz_types.npy')
+    stale = not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(path) \
+        or not all(os.path.exists(os.path.join(cache, f'{name}.npy')) for name in ARCHIVE_COLUMNS)
+    if stale:
+        os.makedirs(cache, exist_ok=True)
+        columns, quiz_types = _read_file(path)
+        for name, values in columns.items():
+            tmp = os.path.join(cache, f'{name}.{os.getpid()}.tmp.npy')
+            np.save(tmp, values)
+            os.replace(tmp, os.path.join(cache, f'{name}.npy'))
+        tmp = os.path.join(cache, f'quiz_types.{os.getpid()}.tmp.npy')
+        np.save(tmp, np.array(quiz_types))
+        os.replace(tmp, marker)
+
+    columns = {name: np.load(os.path.join(cache, f'{name}.npy'), mmap_mode='r') for name in ARCHIVE_COLUMNS}
+    return columns, [str(t) for t in np.load(marker)]
+
+
+def read_archived(root, start=None, end=None, columns=('user_id', 'vocabulary_id', 'is_correct', 'created_at')):
+    """
+    读取 [start, end] 日期范围内的归档（拼接为普通数组）
+
+    quiz_type 列统一按 QUIZ_TYPES（及各分区追加的未知题型）重新编码
+
+    Returns:
+        (列名 -> 数组, 题型编码表)
+    """
+    quiz_types = list(QUIZ_TYPES)
+    parts = {name: [] for name in columns}
+    for day in list_partitions(root, start, end):
+        data, day_types = open_partition(root, day)
+        for name in columns:
+            values = data[name]
+            if name == 'quiz_type':
+                values = remap_codes(quiz_types, day_types)[values]
+            parts[name].append(values)
+    result = {}
+    for name in columns:
+        if parts[name]:
+            result[name] = np.concatenate(parts[name])
+        else:
+            result[name] = np.empty(0, dtype=ARCHIVE_COLUMNS[name])
+    return result, quiz_types
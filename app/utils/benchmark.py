@@ -0,0 +1,246 @@
+"""
+学习流程压测
+
+用 Flask 测试客户端模拟多个并发学员，每个学员登录后重复完整的学习会话：
+开始学习 → 逐词作答（闪卡/选择题/判断题）→ 学习总结，然后练习字母和对话。
+按路由统计延迟分位数（p50/p95/p99）、吞吐量和每请求 SQL 语句数，结果可写成 JSON 供
+不同版本之间对比。
+
+应在 generate_load_data.py 生成的数据集上运行。
+"""
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models import User, UserVocabulary, QuizAttempt, Conversation, ThaiAlphabet
+from app.utils.sql_stats import capture_sql_stats
+from app.utils.synthetic import SYNTHETIC_PASSWORD
+
+LEARNING_MODES = ['flashcard', 'multiple_choice', 'true_false']
+
+
+def percentile(sorted_values, p):
+    """最近秩法分位数（sorted_values 需已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class _Recorder:
+    """收集各路由的耗时和状态码（多线程共享）"""
+
+    def __init__(self):
+        self.latencies = {}   # endpoint -> [秒]
+        self.errors = {}      # endpoint -> 次数
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, elapsed, ok):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class Learner:
+    """一个模拟学员（独立的测试客户端和 Cookie）"""
+
+    def __init__(self, app, username, recorder, rng, submits):
+        self.app = app
+        self.client = app.test_client()
+        self.username = username
+        self.recorder = recorder
+        self.rng = rng
+        self.submits = submits
+        self._urls = app.url_map.bind('localhost')
+
+    def request(self, method, path, json=None, data=None, expect=(200,)):
+        endpoint = self._urls.match(path.split('?')[0], method)[0]
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, json=json, data=data)
+        self.recorder.add(endpoint, time.perf_counter() - started, response.status_code in expect)
+        return response
+
+    def login(self):
+        response = self.request('POST', '/auth/login', expect=(302,),
+                                data={'username': self.username, 'password': SYNTHETIC_PASSWORD})
+        return response.status_code == 302
+
+    def _session_value(self, key, default=None):
+        with self.client.session_transaction() as sess:
+            return sess.get(key, default)
+
+    # ---------- 词汇学习 ----------
+
+    def learning_session(self):
+        mode = self.rng.choice(LEARNING_MODES)
+        response = self.request('GET', f'/learning/start/{mode}', expect=(200, 302))
+        if response.status_code != 200:
+            return
+        vocab_list = self._session_value('learning_vocab', [])
+
+        for index, vocab in enumerate(vocab_list[:self.submits]):
+            if mode == 'flashcard':
+                self.request('POST', '/learning/submit', json={
+                    'vocabulary_id': vocab['id'], 'quiz_type': 'flashcard',
+                    'familiarity': self.rng.randint(1, 5), 'time_taken': self.rng.randint(1, 10),
+                })
+                continue
+            if mode == 'multiple_choice':
+                answer = vocab['chinese_meaning'] if self.rng.random() < 0.8 else '?'
+                self.request('POST', '/learning/check-answer', json={
+                    'vocabulary_id': vocab['id'], 'selected_answer': answer,
+                    'time_taken': self.rng.randint(1, 10),
+                })
+            else:
+                self.request('POST', '/learning/check-judgment', json={
+                    'vocabulary_id': vocab['id'], 'user_answer': self.rng.random() < 0.5,
+                    'is_correct_pairing': True, 'time_taken': self.rng.randint(1, 10),
+                })
+            if index + 1 < len(vocab_list):
+                self.request('POST', '/learning/next')
+
+        self.request('GET', '/learning/summary')
+
+    # ---------- 字母 ----------
+
+    def alphabet_session(self):
+        response = self.request('GET', '/alphabet/practice?mode=flashcard', expect=(200, 302))
+        if response.status_code != 200:
+            return
+        practice = self._session_value('alphabet_practice', [])
+        for alphabet in practice[:self.submits]:
+            self.request('POST', '/alphabet/practice/submit', json={
+                'alphabet_id': alphabet['id'], 'familiarity': self.rng.randint(1, 5),
+            })
+            self.request('POST', '/alphabet/practice/next')
+        self.request('GET', '/alphabet/practice/summary')
+
+    # ---------- 对话 ----------
+
+    def conversation_session(self, conversation_ids):
+        if not conversation_ids:
+            return
+        self.request('GET', '/conversation/')
+        conversation_id = self.rng.choice(conversation_ids)
+        self.request('POST', '/conversation/submit-practice', json={
+            'conversation_id': conversation_id,
+            'mode': self.rng.choice(['fill_blank', 'order', 'role_play']),
+            'score': self.rng.randint(0, 1),
+        })
+        self.request('GET', '/conversation/progress')
+
+
+def _dataset_summary():
+    count = lambda model: db.session.scalar(db.select(db.func.count()).select_from(model))  # noqa: E731
+    return {
+        'users': count(User),
+        'user_vocabularies': count(UserVocabulary),
+        'quiz_attempts': count(QuizAttempt),
+        'alphabets': count(ThaiAlphabet),
+        'conversations': count(Conversation),
+    }
+
+
+def run_benchmark(app, learners=20, concurrency=4, sessions=2, submits=10, prefix='load_', seed=1):
+    """
+    运行压测
+
+    Args:
+        app: Flask 应用（数据库中需有 generate_load_data.py 生成的用户）
+        learners: 模拟学员数
+        concurrency: 并发线程数（1 表示在当前线程顺序执行）
+        sessions: 每个学员的学习会话数
+        submits: 每个会话最多作答的题数
+        prefix: 合成用户名前缀
+        seed: 学员行为的随机种子
+
+    Returns:
+        dict: 可直接写成 JSON 的结果
+    """
+    with app.app_context():
+        usernames = list(db.session.scalars(
+            db.select(User.username)
+            .where(User.username.startswith(prefix, autoescape=True), User.is_active == True)  # noqa: E712
+            .order_by(User.id).limit(learners)
+        ))
+        conversation_ids = list(db.session.scalars(
+            db.select(Conversation.id).where(Conversation.is_active == True)  # noqa: E712
+        ))
+        dataset = _dataset_summary()
+        dialect = db.engine.dialect.name
+    if not usernames:
+        raise ValueError(f"没有前缀为 '{prefix}' 的用户，请先运行 generate_load_data.py")
+
+    recorder = _Recorder()
+
+    def drive(index):
+        learner = Learner(app, usernames[index], recorder, random.Random(f'{seed}:{index}'), submits)
+        if not learner.login():
+            return
+        for _ in range(sessions):
+            learner.learning_session()
+            learner.alphabet_session()
+            learner.conversation_session(conversation_ids)
+
+    with capture_sql_stats(app) as captured:
+        started = time.perf_counter()
+        if concurrency <= 1:
+            for index in range(len(usernames)):
+                drive(index)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(drive, range(len(usernames))))
+        wall_time = time.perf_counter() - started
+
+    # capture_sql_stats 不依赖 SQL_INSTRUMENTATION，有请求却没有收集到统计说明 SQL 统计没有挂上
+    if recorder.latencies and not captured:
+        raise RuntimeError('没有收集到每请求的 SQL 统计，无法报告查询数')
+    queries = {}
+    for endpoint, stats in captured:
+        queries.setdefault(endpoint, []).append(stats.count)
+
+    endpoints = {}
+    total_requests = 0
+    for endpoint, values in sorted(recorder.latencies.items()):
+        values.sort()
+        total_requests += len(values)
+        counts = queries.get(endpoint, [])
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'errors': recorder.errors.get(endpoint, 0),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'mean_ms': round(sum(values) / len(values) * 1000, 2),
+            'queries_mean': round(sum(counts) / len(counts), 2) if counts else None,
+            'queries_max': max(counts) if counts else None,
+        }
+
+    return {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': {
+            'learners': len(usernames), 'concurrency': concurrency, 'sessions': sessions,
+            'submits': submits, 'seed': seed,
+        },
+        'database': dialect,
+        'dataset': dataset,
+        'wall_time_s': round(wall_time, 3),
+        'requests': total_requests,
+        'throughput_rps': round(total_requests / wall_time, 2) if wall_time else 0.0,
+        'errors': sum(recorder.errors.values()),
+        'endpoints': endpoints,
+    }
+
+
+def compare(baseline, current):
+    """对比两次结果：{endpoint: (基线 p95, 当前 p95, 变化比例)}"""
+    result = {}
+    for endpoint, stats in current['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(endpoint)
+        if old and old['p95_ms']:
+            result[endpoint] = (old['p95_ms'], stats['p95_ms'], stats['p95_ms'] / old['p95_ms'] - 1)
+    return result
@@ -0,0 +1,223 @@
+"""
+易混淆条目（干扰项）近邻表
+
+选择题的干扰项如果只是同分类/同类型中随机抽取，很多选项一眼就能排除。这里为每个
+词汇和字母预先计算最容易混淆的 TOP_K 个条目：
+
+- 词汇：QuizAttempt.selected_vocabulary_id 记录了答错时选中的干扰项，
+  按 (词汇, 误选词汇) 计数（包括已归档的答题记录）
+- 字母：答错时累加 AlphabetConfusion 计数，再加上形近字母（ด/ค/ต、บ/ป、ผ/ฝ/พ/ฟ 等）
+  的静态相似度
+
+A 被误选为 B 时 B 是 A 的好干扰项，反过来 A 也常是 B 的好干扰项，因此反向计数按
+REVERSE_WEIGHT 折算后计入。每个条目的得分按它被作答的总次数归一化，再取前 TOP_K 个，
+写入 confusable_neighbors 表并编译进内容包；出题时按条目 id 在内容包的有序列上二分
+定位（或一次索引查询），取近邻不依赖条目总数。
+"""
+import random
+
+import numpy as np
+
+from app import db
+from app.models import QuizAttempt, ThaiAlphabet, AlphabetConfusion, ConfusableNeighbor
+
+TOP_K = 8
+CONFUSABLE_OPTIONS = 2    # 每道选择题最多使用的近邻干扰项数，其余仍随机抽取
+REVERSE_WEIGHT = 0.5
+GLYPH_WEIGHT = 5.0        # 形近字母相当于多少次误选
+SMOOTHING = 10.0          # 归一化分母的平滑项，作答很少的条目不会因为一两次误选得到极端得分
+
+# 形近字母（同一组内两两相似）
+GLYPH_GROUPS = (
+    ('ด', 'ค', 'ต'),
+    ('บ', 'ป', 'ษ'),
+    ('ผ', 'ฝ', 'พ', 'ฟ'),
+    ('ข', 'ฃ', 'ช', 'ซ'),
+    ('ถ', 'ภ'),
+    ('ม', 'น', 'ฆ'),
+    ('ฎ', 'ฏ'),
+    ('ศ', 'ส'),
+    ('ท', 'ฑ'),
+    ('อ', 'ฮ'),
+    ('ร', 'ธ'),
+    ('◌ิ', '◌ี'),
+    ('◌ึ', '◌ื'),
+    ('◌ุ', '◌ู'),
+)
+
+DOMAINS = ('vocab', 'alphabet')
+
+
+def top_k_neighbors(items, neighbors, weights, totals=None, k=TOP_K):
+    """
+    由 (条目, 混淆条目, 权重) 三元组计算每个条目的 top-k 近邻
+
+    Args:
+        items, neighbors, weights: 等长数组，同一对可以出现多次（累加）
+        totals: {条目 id: 作答次数}，用于归一化（缺省按 0）
+        k: 每个条目保留的近邻数
+
+    Returns:
+        (items, neighbors, scores)：按 (条目, 得分降序) 排列
+    """
+    items = np.asarray(items, dtype=np.int64)
+    neighbors = np.asarray(neighbors, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    # 反向计入，去掉自身
+    items, neighbors = np.concatenate([items, neighbors]), np.concatenate([neighbors, items])
+    weights = np.concatenate([weights, weights * REVERSE_WEIGHT])
+    keep = items != neighbors
+    items, neighbors, weights = items[keep], neighbors[keep], weights[keep]
+    if not len(items):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    # 合并重复的 (条目, 近邻)
+    pairs, inverse = np.unique(np.stack([items, neighbors], axis=1), axis=0, return_inverse=True)
+    scores = np.bincount(inverse.ravel(), weights=weights, minlength=len(pairs))
+    items, neighbors = pairs[:, 0], pairs[:, 1]
+
+    totals = totals or {}
+    scores = scores / (np.array([totals.get(int(i), 0) for i in items], dtype=np.float64) + SMOOTHING)
+
+    # 每个条目内按得分降序，取前 k 个
+    order = np.lexsort((neighbors, -scores, items))
+    items, neighbors, scores = items[order], neighbors[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]])
+    rank = np.arange(len(items)) - np.repeat(starts, np.diff(np.r_[starts, len(items)]))
+    keep = rank < k
+    return items[keep], neighbors[keep], scores[keep]
+
+
+def _archived_vocab_confusions(archive):
+    """
+    归档分区中的误选计数和选择题作答次数
+
+    归档后在线行会被删除；中途失败时可能有行同时在归档和在线表中，按 id 去掉这部分
+    （归档的 id 都小于仍在线的行，只需查询不超过归档最大 id 的在线 id）。
+    """
+    from app.utils.attempt_archive import read_archived
+
+    columns, quiz_types = read_archived(archive, columns=(
+        'id', 'vocabulary_id', 'quiz_type', 'is_correct', 'selected_vocabulary_id'))
+    if not len(columns['id']):
+        return [], {}
+    live = np.fromiter(db.session.scalars(
+        db.select(QuizAttempt.id).where(QuizAttempt.id <= int(columns['id'].max()))), dtype=np.int64)
+    keep = ~np.isin(columns['id'], live)
+    items = columns['vocabulary_id'][keep].astype(np.int64)
+    selected = columns['selected_vocabulary_id'][keep].astype(np.int64)
+
+    wrong = (selected >= 0) & ~columns['is_correct'][keep]
+    pairs, counts = np.unique(np.stack([items[wrong], selected[wrong]], axis=1), axis=0, return_counts=True)
+    rows = [(int(a), int(b), int(c)) for (a, b), c in zip(pairs, counts)]
+
+    choice = columns['quiz_type'][keep] == quiz_types.index('multiple_choice')
+    vocab_ids, totals = np.unique(items[choice], return_counts=True)
+    return rows, dict(zip(vocab_ids.tolist(), totals.tolist()))
+
+
+def _vocab_confusions(archive=None):
+    rows = db.session.execute(
+        db.select(QuizAttempt.vocabulary_id, QuizAttempt.selected_vocabulary_id, db.func.count())
+        .where(QuizAttempt.selected_vocabulary_id.is_not(None), QuizAttempt.is_correct == False)  # noqa: E712
+        .group_by(QuizAttempt.vocabulary_id, QuizAttempt.selected_vocabulary_id)
+    ).all()
+    totals = dict(db.session.execute(
+        db.select(QuizAttempt.vocabulary_id, db.func.count())
+        .where(QuizAttempt.quiz_type == 'multiple_choice')
+        .group_by(QuizAttempt.vocabulary_id)
+    ).all())
+    if archive is not None:
+        # 超过保留期的答题记录已移入归档，同样计入（top_k_neighbors 会合并重复的对）
+        archived_rows, archived_totals = _archived_vocab_confusions(archive)
+        rows = list(rows) + archived_rows
+        for vocab_id, count in archived_totals.items():
+            totals[vocab_id] = totals.get(vocab_id, 0) + count
+    return rows, totals
+
+
+def glyph_pairs():
+    """形近字母对应的 (字母 id, 字母 id) 对"""
+    ids = {}
+    for alphabet_id, character in db.session.execute(db.select(ThaiAlphabet.id, ThaiAlphabet.character)):
+        ids.setdefault(character, []).append(alphabet_id)
+    pairs = []
+    for group in GLYPH_GROUPS:
+        members = [i for character in group for i in ids.get(character, [])]
+        pairs.extend((a, b) for a in members for b in members if a < b)
+    return pairs
+
+
+def _alphabet_confusions():
+    rows = [(a, b, count) for a, b, count in db.session.execute(
+        db.select(AlphabetConfusion.alphabet_id, AlphabetConfusion.selected_alphabet_id, AlphabetConfusion.count))]
+    totals = {}
+    for a, _, count in rows:
+        totals[a] = totals.get(a, 0) + count
+    # 形近字母两个方向各加入一次，计入反向权重后每个方向的总权重正好是 GLYPH_WEIGHT
+    weight = GLYPH_WEIGHT / (1 + REVERSE_WEIGHT)
+    for a, b in glyph_pairs():
+        rows.append((a, b, weight))
+        rows.append((b, a, weight))
+    return rows, totals
+
+
+def build_neighbors(k=TOP_K, archive=None):
+    """
+    重新计算并写入近邻表（不提交）
+
+    Args:
+        k: 每个条目保留的近邻数
+        archive: 答题记录归档目录（attempt_archive.archive_path），给出时词汇的误选也读取归档
+
+    Returns:
+        dict: 领域 -> 写入的近邻行数
+    """
+    result = {}
+    for domain, source in (('vocab', lambda: _vocab_confusions(archive)), ('alphabet', _alphabet_confusions)):
+        rows, totals = source()
+        if rows:
+            items, neighbors, scores = top_k_neighbors(*zip(*rows), totals=totals, k=k)
+        else:
+            items = neighbors = scores = []
+        db.session.execute(db.delete(ConfusableNeighbor).where(ConfusableNeighbor.domain == domain))
+        values = [{'domain': domain, 'item_id': int(i), 'neighbor_id': int(n), 'score': round(float(s), 6)}
+                  for i, n, s in zip(items, neighbors, scores)]
+        if values:
+            db.session.execute(db.insert(ConfusableNeighbor), values)
+        result[domain] = len(values)
+    return result
+
+
+def neighbor_ids(domain, item_id):
+    """条目的近邻 id（按得分降序）；有内容包时直接读取，否则查询近邻表"""
+    from app.utils.content_bundle import get_content_bundle
+
+    bundle = get_content_bundle()
+    if bundle is not None:
+        section = bundle[f'{domain}_neighbors']
+        column = section.column('neighbor_id')
+        start, end = section.range_of('item_id', item_id)
+        return [column[i] for i in range(start, end)]
+    return list(db.session.scalars(
+        db.select(ConfusableNeighbor.neighbor_id)
+        .where(ConfusableNeighbor.domain == domain, ConfusableNeighbor.item_id == item_id)
+        .order_by(ConfusableNeighbor.score.desc(), ConfusableNeighbor.neighbor_id)
+    ))
+
+
+def pick_confusable(candidates, limit=CONFUSABLE_OPTIONS):
+    """从近邻候选中随机取 limit 个（得分前列的候选被取到的机会更大）"""
+    candidates = list(candidates)
+    if len(candidates) <= limit:
+        return candidates
+    # 每个候选以其名次的倒数为权重，无放回抽样
+    chosen = []
+    weights = [1.0 / (rank + 1) for rank in range(len(candidates))]
+    for _ in range(limit):
+        index = random.choices(range(len(candidates)), weights=weights)[0]
+        chosen.append(candidates.pop(index))
+        weights.pop(index)
+    return chosen
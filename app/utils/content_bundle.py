@@ -0,0 +1,530 @@
+"""
+预编译内容包（只读内容的二进制快照）
+
+把所有启用的词汇、字母、对话场景/对话/句子编译成一个按列存储的二进制文件，
+工作进程启动时以 mmap 方式打开。多个进程映射同一个文件时共享操作系统的页缓存，
+读取某个字段时只解码这一格数据，不需要整体反序列化。
+
+文件格式（本机字节序）：
+    magic(4) | 格式版本 u32 | 目录长度 u32 | 目录(JSON) | 各列数据 | 字符串堆
+
+每个分区（section）按主键排序（句子按 conversation_id, line_order 排序），
+整数列为 int32 数组，字符串列为（起始偏移, 长度）两个 uint32 数组，指向字符串堆。
+"""
+import json
+import logging
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LTCB'
+FORMAT_VERSION = 5
+
+INT_NULL = -2 ** 31          # 整数列的空值
+STR_NULL = 0xFFFFFFFF        # 字符串列的空值（长度）
+
+# 分区结构：(列名, 类型)  i=整数  s=字符串
+SCHEMAS = {
+    'vocabularies': [
+        ('id', 'i'), ('thai_word', 's'), ('chinese_meaning', 's'), ('pronunciation', 's'),
+        ('audio_file', 's'), ('category', 's'), ('difficulty_level', 'i'), ('frequency_rank', 'i'),
+        ('example_sentence_thai', 's'), ('example_sentence_chinese', 's'), ('category_code', 'i'),
+    ],
+    # 词汇行号的排列索引（见 _derive_vocab_indexes）
+    'vocab_by_category': [('row', 'i')],
+    'vocab_by_difficulty': [('row', 'i'), ('difficulty', 'i')],
+    'thai_alphabets': [
+        ('id', 'i'), ('character', 's'), ('name_thai', 's'), ('name_chinese', 's'),
+        ('pronunciation', 's'), ('sound', 's'), ('alphabet_type', 's'), ('consonant_class', 's'),
+        ('vowel_type', 's'), ('example_word', 's'), ('example_meaning', 's'), ('audio_file', 's'),
+        ('sort_order', 'i'),
+    ],
+    'conversation_scenes': [
+        ('id', 'i'), ('name_chinese', 's'), ('name_thai', 's'), ('icon', 's'), ('description', 's'),
+        ('difficulty_level', 'i'), ('sort_order', 'i'),
+    ],
+    'conversations': [
+        ('id', 'i'), ('scene_id', 'i'), ('title_chinese', 's'), ('title_thai', 's'), ('situation', 's'),
+        ('difficulty_level', 'i'), ('sort_order', 'i'),
+    ],
+    'conversation_lines': [
+        ('conversation_id', 'i'), ('line_order', 'i'), ('id', 'i'), ('speaker_role', 's'),
+        ('speaker_role_thai', 's'), ('text_thai', 's'), ('text_chinese', 's'), ('pronunciation', 's'),
+        ('audio_file', 's'), ('key_words', 's'), ('notes', 's'),
+    ],
+    # 易混淆近邻（见 confusability.py），按 (item_id, 得分降序) 排列
+    'vocab_neighbors': [('item_id', 'i'), ('neighbor_id', 'i')],
+    'alphabet_neighbors': [('item_id', 'i'), ('neighbor_id', 'i')],
+    # 预生成题库（见 question_bank.py），按 item_id 排序，每个条目若干行
+    'vocab_questions': [('item_id', 'i'), ('option_1', 'i'), ('option_2', 'i'), ('option_3', 'i')],
+    'vocab_pairings': [('item_id', 'i'), ('shown_id', 'i')],
+    'alphabet_questions': [('item_id', 'i'), ('option_1', 'i'), ('option_2', 'i'), ('option_3', 'i')],
+}
+
+
+def _align(buf, size=8):
+    """用 0 填充到 size 字节对齐"""
+    pad = (-len(buf)) % size
+    if pad:
+        buf.extend(b'\0' * pad)
+
+
+def _load_rows():
+    """从数据库读取所有启用的内容行，返回 {分区名: [行dict]}"""
+    from app import db
+    from app.models import Vocabulary, ThaiAlphabet, ConversationScene, Conversation, ConversationLine, \
+        ConfusableNeighbor
+
+    def rows_of(query, section, extra=()):
+        columns = [name for name, _ in SCHEMAS[section]] + list(extra)
+        return [{name: getattr(obj, name, None) for name in columns} for obj in query]
+
+    def neighbors_of(domain):
+        return rows_of(ConfusableNeighbor.query.filter_by(domain=domain).order_by(
+            ConfusableNeighbor.item_id, ConfusableNeighbor.score.desc(), ConfusableNeighbor.neighbor_id),
+            f'{domain}_neighbors')
+
+    active_conversations = db.session.query(Conversation.id).join(
+        ConversationScene, Conversation.scene_id == ConversationScene.id
+    ).filter(Conversation.is_active == True, ConversationScene.is_active == True)
+
+    return {
+        'vocabularies': rows_of(
+            Vocabulary.query.filter_by(is_active=True).order_by(Vocabulary.id), 'vocabularies',
+            extra=('irt_difficulty',)),
+        'thai_alphabets': rows_of(
+            ThaiAlphabet.query.filter_by(is_active=True).order_by(ThaiAlphabet.id), 'thai_alphabets'),
+        'conversation_scenes': rows_of(
+            ConversationScene.query.filter_by(is_active=True).order_by(ConversationScene.id),
+            'conversation_scenes'),
+        'conversations': rows_of(
+            Conversation.query.filter(Conversation.id.in_(active_conversations)).order_by(Conversation.id),
+            'conversations'),
+        'conversation_lines': rows_of(
+            ConversationLine.query.filter(ConversationLine.conversation_id.in_(active_conversations))
+            .order_by(ConversationLine.conversation_id, ConversationLine.line_order, ConversationLine.id),
+            'conversation_lines'),
+        'vocab_neighbors': neighbors_of('vocab'),
+        'alphabet_neighbors': neighbors_of('alphabet'),
+    }
+
+
+def _derive_vocab_indexes(sections):
+    """
+    为词汇分区生成分类编码和排列索引
+
+    - category_code: 分类在 categories 列表中的下标
+    - vocab_by_category: 按 (分类, id) 排序的行号，同一分类的行是连续的一段
+    - vocab_by_difficulty: 按 (难度, id) 排序的行号和难度（千分之一 logit），即新词的出场顺序；
+      难度为 IRT 校准难度，未校准时由 difficulty_level 换算（见 irt.effective_difficulty）
+
+    Returns:
+        list: [[分类名, 起始, 结束], ...]，区间指向 vocab_by_category
+    """
+    from app.utils.irt import effective_difficulty
+
+    rows = sections.get('vocabularies', [])
+    names = sorted({row.get('category') or '' for row in rows})
+    codes = {name: code for code, name in enumerate(names)}
+    for row in rows:
+        row['category_code'] = codes[row.get('category') or '']
+
+    by_category = sorted(range(len(rows)), key=lambda i: (rows[i]['category_code'], rows[i]['id']))
+    difficulty = [round(1000 * effective_difficulty(row.get('irt_difficulty'), row.get('difficulty_level')))
+                  for row in rows]
+    by_difficulty = sorted(range(len(rows)), key=lambda i: (difficulty[i], rows[i]['id']))
+    sections['vocab_by_category'] = [{'row': i} for i in by_category]
+    sections['vocab_by_difficulty'] = [{'row': i, 'difficulty': difficulty[i]} for i in by_difficulty]
+
+    categories = []
+    start = 0
+    for code, name in enumerate(names):
+        end = start
+        while end < len(by_category) and rows[by_category[end]]['category_code'] == code:
+            end += 1
+        categories.append([name, start, end])
+        start = end
+    return categories
+
+
+def encode_sections(sections):
+    """
+    把行数据编码为内容包字节
+
+    Args:
+        sections: {分区名: [行dict]}，行必须已按分区的排序键排好；只有整数列的分区
+            也可以是 {列名: 本机字节序 int32 数组}
+
+    Returns:
+        bytes: 完整的内容包文件内容
+    """
+    heap = bytearray()
+    heap_index = {}
+    data = bytearray()
+    directory = {'built_at': int(time.time()), 'byteorder': sys.byteorder, 'sections': {}}
+    directory['categories'] = _derive_vocab_indexes(sections)
+
+    def intern(value):
+        raw = value.encode('utf-8')
+        offset = heap_index.get(raw)
+        if offset is None:
+            offset = heap_index[raw] = len(heap)
+            heap.extend(raw)
+        return offset, len(raw)
+
+    for section, schema in SCHEMAS.items():
+        rows = sections.get(section, [])
+        columns = {}
+        if isinstance(rows, dict):
+            # 已按列组织的整数分区（{列名: int32 数组}，见 question_bank.py）
+            for name, kind in schema:
+                _align(data)
+                columns[name] = [kind, len(data)]
+                data.extend(rows[name].tobytes())
+            directory['sections'][section] = {'rows': len(rows[schema[0][0]]), 'columns': columns}
+            continue
+        for name, kind in schema:
+            if kind == 's':
+                starts, lengths = array('I'), array('I')
+                for row in rows:
+                    value = row.get(name)
+                    if value is None:
+                        starts.append(0)
+                        lengths.append(STR_NULL)
+                    else:
+                        start, length = intern(str(value))
+                        starts.append(start)
+                        lengths.append(length)
+                _align(data)
+                start_offset = len(data)
+                data.extend(starts.tobytes())
+                _align(data)
+                columns[name] = [kind, start_offset, len(data)]
+                data.extend(lengths.tobytes())
+            else:
+                values = array('i', (INT_NULL if row.get(name) is None else int(row[name]) for row in rows))
+                _align(data)
+                columns[name] = [kind, len(data)]
+                data.extend(values.tobytes())
+        directory['sections'][section] = {'rows': len(rows), 'columns': columns}
+
+    directory['heap'] = len(data)
+    data.extend(heap)
+
+    header_json = json.dumps(directory, separators=(',', ':')).encode('utf-8')
+    prefix = bytearray(MAGIC)
+    prefix.extend(array('I', [FORMAT_VERSION, len(header_json)]).tobytes())
+    prefix.extend(header_json)
+    _align(prefix)
+
+    return bytes(prefix) + bytes(data)
+
+
+def build_bundle(path):
+    """
+    从当前数据库编译内容包并原子地写入 path
+
+    需要在应用上下文中调用。先写临时文件再 os.replace，
+    正在读取旧文件的进程不受影响。
+
+    Returns:
+        dict: 各分区的行数
+    """
+    from app.utils.question_bank import build_question_bank
+
+    sections = _load_rows()
+    sections.update(build_question_bank(sections))
+    payload = encode_sections(sections)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # 临时文件名唯一，同一进程的多个线程同时编译也不会写到同一个文件
+    f = tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp', delete=False)
+    try:
+        with f:
+            f.write(payload)
+        os.chmod(f.name, 0o644)  # NamedTemporaryFile 创建的文件只有属主可读
+        os.replace(f.name, path)
+    except BaseException:
+        os.remove(f.name)
+        raise
+
+    return {section: len(sections[section]) for section in ('vocabularies', 'thai_alphabets',
+            'conversation_scenes', 'conversations', 'conversation_lines')}
+
+
+class BundleRecord:
+    """内容包中的一行，按属性访问时才解码对应字段"""
+    __slots__ = ('_section', '_index')
+
+    def __init__(self, section, index):
+        self._section = section
+        self._index = index
+
+    def __getattr__(self, name):
+        try:
+            return self._section.value(name, self._index)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def to_dict(self):
+        return {name: self._section.value(name, self._index) for name in self._section.column_names}
+
+    def __repr__(self):
+        return f'<BundleRecord {self._section.name}#{self.id}>'
+
+
+class Section:
+    """内容包中的一个分区（一张表）"""
+
+    def __init__(self, bundle, name, meta):
+        self.name = name
+        self.rows = meta['rows']
+        self.column_names = [column for column, _ in SCHEMAS[name]]
+        self._bundle = bundle
+        self._columns = {}
+        for column, spec in meta['columns'].items():
+            if spec[0] == 's':
+                self._columns[column] = ('s', bundle._view(spec[1], self.rows, 'I'),
+                                         bundle._view(spec[2], self.rows, 'I'))
+            else:
+                self._columns[column] = (spec[0], bundle._view(spec[1], self.rows, 'i'))
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """返回整数列的零拷贝视图（memoryview）"""
+        return self._columns[name][1]
+
+    def value(self, name, index):
+        spec = self._columns[name]
+        if spec[0] == 's':
+            length = spec[2][index]
+            if length == STR_NULL:
+                return None
+            return self._bundle._string(spec[1][index], length)
+        value = spec[1][index]
+        return None if value == INT_NULL else value
+
+    def record(self, index):
+        return BundleRecord(self, index)
+
+    def __iter__(self):
+        return (BundleRecord(self, i) for i in range(self.rows))
+
+    def range_of(self, column, value):
+        """在已排序的整数列上二分查找 value 所在的行区间"""
+        view = self.column(column)
+        return bisect_left(view, value), bisect_right(view, value)
+
+    def get(self, record_id):
+        """按 id 查找一行（分区必须以 id 排序）"""
+        start, end = self.range_of('id', record_id)
+        return BundleRecord(self, start) if start < end else None
+
+
+class ContentBundle:
+    """以 mmap 打开的内容包"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        if bytes(self._buffer[:4]) != MAGIC:
+            self.close()
+            raise ValueError(f'不是有效的内容包文件: {path}')
+        version, header_len = array('I', bytes(self._buffer[4:12]))
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'内容包格式版本不匹配: {version}（需要 {FORMAT_VERSION}）')
+
+        directory = json.loads(bytes(self._buffer[12:12 + header_len]))
+        if directory['byteorder'] != sys.byteorder:
+            self.close()
+            raise ValueError('内容包字节序与当前平台不一致，请重新编译')
+
+        self._data_start = 12 + header_len + (-(12 + header_len)) % 8
+        self._heap_start = self._data_start + directory['heap']
+        self.built_at = directory['built_at']
+        self.categories = directory['categories']
+        self.sections = {name: Section(self, name, meta) for name, meta in directory['sections'].items()}
+
+    @property
+    def size(self):
+        """文件大小（字节）"""
+        return len(self._mmap)
+
+    def _view(self, offset, count, typecode):
+        start = self._data_start + offset
+        size = count * array(typecode).itemsize
+        return self._buffer[start:start + size].cast(typecode)
+
+    def _string(self, offset, length):
+        start = self._heap_start + offset
+        return str(self._buffer[start:start + length], 'utf-8')
+
+    def close(self):
+        self.sections = {}
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 仍有列视图被引用（如旧的词汇目录），最后一个视图释放时映射随之解除
+            pass
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+    # ---------- 常用查询 ----------
+
+    def alphabets(self, **filters):
+        """按 sort_order 返回符合条件的字母（过滤值为列表/元组时表示 IN 条件）"""
+        def match(record):
+            for name, value in filters.items():
+                actual = getattr(record, name)
+                if actual not in value if isinstance(value, (list, tuple)) else actual != value:
+                    return False
+            return True
+
+        result = [r for r in self.sections['thai_alphabets'] if match(r)]
+        result.sort(key=lambda r: r.sort_order or 0)
+        return result
+
+    def conversation(self, conversation_id):
+        return self.sections['conversations'].get(conversation_id)
+
+    def conversation_lines(self, conversation_id):
+        """返回对话的句子（按 line_order），对话不在包内时返回 None"""
+        if self.conversation(conversation_id) is None:
+            return None
+        section = self.sections['conversation_lines']
+        start, end = section.range_of('conversation_id', conversation_id)
+        return [section.record(i) for i in range(start, end)]
+
+
+class _BundleHolder:
+    """
+    每个进程持有一份映射；文件被重新编译后自动重新映射
+
+    换下的映射不立即关闭：其他线程中进行中的请求可能还在读取。保留一代，
+    下一次重新映射时再关闭它。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.bundle = None
+        self._stamp = None
+        self._retired = None
+        self._lock = threading.Lock()
+        self.rebuilder = None    # _BundleRebuilder，见 init_content_bundle
+
+    def get(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    try:
+                        bundle = ContentBundle(self.path)
+                    except (OSError, ValueError):
+                        return None
+                    if self._retired is not None:
+                        self._retired.close()
+                    self._retired, self.bundle, self._stamp = self.bundle, bundle, stamp
+        return self.bundle
+
+
+class _BundleRebuilder:
+    """
+    请求中触发的重新编译交给后台线程执行
+
+    触发后等待 delay 秒再编译，期间的多次触发（管理员连续编辑）合并为一次；
+    编译过程中又有触发时，结束后再编译一次。线程在首次触发时启动，
+    fork 出的子进程中会重新创建。
+    """
+
+    def __init__(self, app, path, delay):
+        self.app = app
+        self.path = path
+        self.delay = delay
+        self._pending = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._pending = threading.Event()
+            threading.Thread(target=self._run, name='content-bundle-rebuild', daemon=True).start()
+
+    def _run(self):
+        from app import db
+        pending = self._pending
+        while True:
+            pending.wait()
+            time.sleep(self.delay)
+            pending.clear()
+            with self.app.app_context():
+                try:
+                    build_bundle(self.path)
+                except Exception:
+                    logger.exception('重新编译内容包失败')
+                finally:
+                    db.session.remove()
+
+    def request(self):
+        self._ensure_thread()
+        self._pending.set()
+
+
+def init_content_bundle(app):
+    """在 create_app 中调用：配置了 CONTENT_BUNDLE_PATH 时预先映射内容包"""
+    path = app.config.get('CONTENT_BUNDLE_PATH')
+    if not path:
+        return
+    holder = _BundleHolder(path)
+    holder.get()
+    delay = app.config.get('CONTENT_BUNDLE_REBUILD_DELAY')
+    if delay is not None:
+        holder.rebuilder = _BundleRebuilder(app, path, delay)
+    app.extensions['content_bundle'] = holder
+
+
+def get_content_bundle():
+    """返回当前进程的内容包，未配置或文件不存在时返回 None"""
+    from flask import current_app
+    holder = current_app.extensions.get('content_bundle')
+    return holder.get() if holder else None
+
+
+def refresh_content_bundle():
+    """
+    内容变更后重新编译内容包（未配置时什么也不做）
+
+    在请求中调用时交给后台线程延迟合并执行，不阻塞管理后台的请求；命令行脚本、
+    后台导入线程中调用，或 CONTENT_BUNDLE_REBUILD_DELAY 为 None 时直接编译。
+    """
+    from flask import current_app, has_request_context
+    holder = current_app.extensions.get('content_bundle')
+    if not holder:
+        return
+    if holder.rebuilder is not None and has_request_context():
+        holder.rebuilder.request()
+    else:
+        build_bundle(holder.path)
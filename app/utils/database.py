@@ -0,0 +1,86 @@
+"""数据库引擎调优（连接时 PRAGMA、启动自检）和已有表的列升级"""
+from sqlalchemy import event, inspect, text
+
+# 在已有表上新增的列：db.create_all 只创建缺少的表，不会修改已存在的表，
+# 这些列由 upgrade_schema 补上（只能是允许 NULL 且没有默认值的列）。(表名, 列名, 类型)
+ADDED_COLUMNS = [
+    ('users', 'ability', 'FLOAT'),
+    ('vocabularies', 'irt_difficulty', 'FLOAT'),
+    ('vocabularies', 'irt_discrimination', 'FLOAT'),
+    ('quiz_attempts', 'selected_vocabulary_id', 'INTEGER'),
+]
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """每个新的 SQLite 连接都执行一次 PRAGMA"""
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def describe_engine(engine, pragmas=None):
+    """读取引擎的实际生效配置，返回 dict"""
+    info = {
+        'dialect': engine.dialect.name,
+        'pool': type(engine.pool).__name__,
+    }
+    size = getattr(engine.pool, 'size', None)
+    if callable(size):
+        info['pool_size'] = size()
+    if engine.dialect.name == 'sqlite' and pragmas:
+        with engine.connect() as conn:
+            for name in pragmas:
+                info[name] = conn.execute(text(f'PRAGMA {name}')).scalar()
+    return info
+
+
+def configure_engine(app, db):
+    """在 create_app 中调用：应用 SQLITE_PRAGMAS 并记录生效配置"""
+    level = app.config.get('LOG_LEVEL')
+    if level:
+        app.logger.setLevel(level)
+
+    # 只有配置了 SQLITE_PRAGMAS 的环境（生产）才调优和自检
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if not pragmas or ':memory:' in uri:
+        return
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            apply_sqlite_pragmas(engine, pragmas)
+        try:
+            info = describe_engine(engine, pragmas)
+        except Exception as e:
+            app.logger.error('数据库自检失败: %s', e)
+            return
+        finally:
+            # 自检的连接不留在池中：预先 fork 的工作进程各自建立连接，不共享父进程的连接
+            engine.dispose()
+
+    app.logger.info('数据库配置: %s', ', '.join(f'{k}={v}' for k, v in info.items()))
+    if 'journal_mode' in info and str(info['journal_mode']).lower() != str(pragmas['journal_mode']).lower():
+        app.logger.warning('journal_mode 未生效: 期望 %s, 实际 %s', pragmas['journal_mode'], info['journal_mode'])
+
+
+def upgrade_schema(engine):
+    """
+    为已存在的表补上 ADDED_COLUMNS 中缺少的列（可重复执行）
+
+    Returns:
+        list: 本次添加的 (表名, 列名)
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table, column, kind in ADDED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            if column not in {c['name'] for c in inspector.get_columns(table)}:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {kind}'))
+                added.append((table, column))
+    return added
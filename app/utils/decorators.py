@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import flash, redirect, url_for, abort
+from flask import flash, redirect, url_for, abort, g
 from flask_login import current_user
 
 def admin_required(f):
@@ -13,3 +13,12 @@ def admin_required(f):
             abort(403)
         return f(*args, **kwargs)
     return decorated_function
+
+def read_replica(f):
+    """只读视图：查询走只读副本（未配置副本或处于读自己写窗口时仍读主库）"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from app.utils.routing import in_read_your_writes_window
+        g.use_replica = not in_read_your_writes_window()
+        return f(*args, **kwargs)
+    return decorated_function
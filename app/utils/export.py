@@ -0,0 +1,160 @@
+"""
+学习数据导出
+
+按过滤条件流式导出答题记录（QuizAttempt）或词汇进度（UserVocabulary），格式为 NDJSON 或 CSV。
+查询使用 yield_per（PostgreSQL/MySQL 上为服务端游标），只选取列不加载 ORM 对象，
+每 EXPORT_BATCH_SIZE 行编码成一个响应块，内存占用与导出行数无关。
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import User, Vocabulary, UserVocabulary, QuizAttempt
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportError(ValueError):
+    """导出参数无效"""
+
+
+class ExportFilters:
+    """
+    导出过滤条件
+
+    Args:
+        user_ids: 用户 ID 列表（None 表示全部）
+        username_prefix: 用户名前缀（按批次导入的学员通常共用前缀）
+        start: 起始日期（含）
+        end: 结束日期（含）
+        quiz_types: 题型列表（仅答题记录）
+    """
+
+    def __init__(self, user_ids=None, username_prefix=None, start=None, end=None, quiz_types=None):
+        self.user_ids = user_ids
+        self.username_prefix = username_prefix
+        self.start = start
+        self.end = end
+        self.quiz_types = quiz_types
+
+    @classmethod
+    def from_args(cls, args):
+        """从查询参数解析：users=1,2,3 prefix= start=YYYY-MM-DD end=YYYY-MM-DD quiz_type=a,b"""
+        def split(name):
+            value = args.get(name, '').strip()
+            return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+        def date(name):
+            value = args.get(name, '').strip()
+            if not value:
+                return None
+            try:
+                return datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise ExportError(f'{name} 日期格式应为 YYYY-MM-DD')
+
+        users = split('users')
+        try:
+            user_ids = [int(u) for u in users] if users else None
+        except ValueError:
+            raise ExportError('users 应为逗号分隔的用户 ID')
+        filters = cls(user_ids=user_ids, username_prefix=args.get('prefix', '').strip() or None,
+                      start=date('start'), end=date('end'), quiz_types=split('quiz_type'))
+        if filters.start and filters.end and filters.start > filters.end:
+            raise ExportError('start 不能晚于 end')
+        return filters
+
+    def apply(self, query, user_column, time_column):
+        if self.user_ids is not None:
+            query = query.where(user_column.in_(self.user_ids))
+        if self.username_prefix:
+            query = query.where(User.username.startswith(self.username_prefix, autoescape=True))
+        if self.start:
+            query = query.where(time_column >= datetime.combine(self.start, datetime.min.time()))
+        if self.end:
+            query = query.where(time_column < datetime.combine(self.end + timedelta(days=1), datetime.min.time()))
+        return query
+
+
+def _attempts_query(filters):
+    query = db.select(
+        QuizAttempt.id, QuizAttempt.user_id, User.username, QuizAttempt.vocabulary_id,
+        Vocabulary.thai_word, QuizAttempt.quiz_type, QuizAttempt.is_correct,
+        QuizAttempt.time_taken, QuizAttempt.created_at,
+    ).join(User, User.id == QuizAttempt.user_id).join(Vocabulary, Vocabulary.id == QuizAttempt.vocabulary_id)
+    query = filters.apply(query, QuizAttempt.user_id, QuizAttempt.created_at)
+    if filters.quiz_types:
+        query = query.where(QuizAttempt.quiz_type.in_(filters.quiz_types))
+    return query.order_by(QuizAttempt.id)
+
+
+def _progress_query(filters):
+    if filters.quiz_types:
+        raise ExportError('词汇进度不支持按题型过滤')
+    query = db.select(
+        UserVocabulary.user_id, User.username, UserVocabulary.vocabulary_id, Vocabulary.thai_word,
+        UserVocabulary.familiarity_level, UserVocabulary.review_count, UserVocabulary.correct_count,
+        UserVocabulary.next_review_date, UserVocabulary.last_reviewed, UserVocabulary.created_at,
+    ).join(User, User.id == UserVocabulary.user_id).join(Vocabulary, Vocabulary.id == UserVocabulary.vocabulary_id)
+    # 日期范围按最后复习时间过滤
+    query = filters.apply(query, UserVocabulary.user_id, UserVocabulary.last_reviewed)
+    return query.order_by(UserVocabulary.user_id, UserVocabulary.vocabulary_id)
+
+
+EXPORT_DATASETS = {
+    'attempts': _attempts_query,
+    'progress': _progress_query,
+}
+
+
+def export_query(dataset, filters):
+    """返回导出用的查询（数据集不存在或过滤条件不适用时抛出 ExportError）"""
+    builder = EXPORT_DATASETS.get(dataset)
+    if builder is None:
+        raise ExportError(f'未知的导出数据集: {dataset}')
+    return builder(filters)
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _batches(query):
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    return result.keys(), result.partitions()
+
+
+def stream_ndjson(query):
+    """每行一个 JSON 对象"""
+    columns, batches = _batches(query)
+    columns = list(columns)
+    for batch in batches:
+        yield ''.join(json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + '\n'
+                      for row in batch)
+
+
+def stream_csv(query):
+    """带表头的 CSV"""
+    columns, batches = _batches(query)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(columns))
+    for batch in batches:
+        writer.writerows([_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_WRITERS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+}
@@ -0,0 +1,120 @@
+"""
+复习量预测
+
+统计未来 FORECAST_DAYS 天每天到期的词汇数（UTC 日期）。每次只执行一条按日期分组的
+查询：单个用户的预测走 idx_user_next_review 索引的范围扫描，全体用户的汇总只返回
+几十行分组结果。
+
+单个用户的结果缓存到该用户下一次提交答案（progress.py 的写入函数会调用
+invalidate_forecast）；其他工作进程最迟在 FORECAST_CACHE_TTL 秒后刷新。
+日期变化后缓存自动失效。
+"""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import UserVocabulary
+
+FORECAST_DAYS = 30
+_ALL_USERS = None  # 全体用户汇总在缓存中的键
+
+
+def compute_forecast(user_id=None, days=FORECAST_DAYS, now=None):
+    """
+    查询复习量预测
+
+    Args:
+        user_id: 用户 ID，None 表示全体用户
+        days: 预测天数
+        now: 当前时间（默认 utcnow）
+
+    Returns:
+        dict: start（今天的日期）、overdue（今天之前已到期的数量）、
+              counts（从今天起每天到期的数量）、total
+    """
+    now = now or datetime.utcnow()
+    today = datetime.combine(now.date(), datetime.min.time())
+    end = today + timedelta(days=days)
+
+    column = UserVocabulary.next_review_date
+    bucket = db.case((column < today, 'overdue'),
+                     else_=db.cast(db.func.date(column), db.String)).label('bucket')
+    query = db.select(bucket, db.func.count()).where(column < end).group_by(bucket)
+    if user_id is not None:
+        query = query.where(UserVocabulary.user_id == user_id)
+
+    overdue = 0
+    counts = [0] * days
+    for key, count in db.session.execute(query):
+        if key == 'overdue':
+            overdue = count
+            continue
+        offset = (datetime.strptime(str(key)[:10], '%Y-%m-%d') - today).days
+        if 0 <= offset < days:
+            counts[offset] += count
+
+    return {
+        'start': today.date().isoformat(),
+        'overdue': overdue,
+        'counts': counts,
+        'total': overdue + sum(counts),
+    }
+
+
+class ForecastCache:
+    """按用户缓存预测结果（过期时间 + 日期双重校验）"""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}  # user_id -> (过期时间, 结果)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id, loader, ttl=None):
+        now = time.monotonic()
+        today = datetime.utcnow().date().isoformat()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now and entry[1]['start'] == today:
+            return entry[1]
+
+        result = loader(user_id)
+        if user_id not in self._entries and len(self._entries) >= self.max_size:
+            try:
+                self._entries.pop(next(iter(self._entries)))
+            except (StopIteration, KeyError, RuntimeError):
+                pass
+        self._entries[user_id] = (now + (self.ttl if ttl is None else ttl), result)
+        return result
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+
+def get_forecast_cache():
+    cache = current_app.extensions.get('forecast_cache')
+    if cache is None:
+        cache = current_app.extensions['forecast_cache'] = ForecastCache(
+            ttl=current_app.config.get('FORECAST_CACHE_TTL', 3600),
+            max_size=current_app.config.get('FORECAST_CACHE_SIZE', 10000),
+        )
+    return cache
+
+
+def user_forecast(user_id):
+    """单个用户未来 FORECAST_DAYS 天的复习量（带缓存）"""
+    return get_forecast_cache().get(user_id, lambda uid: compute_forecast(uid))
+
+
+def global_forecast():
+    """全体用户的复习量汇总（缓存 FORECAST_GLOBAL_TTL 秒，不随单个用户的提交失效）"""
+    return get_forecast_cache().get(_ALL_USERS, lambda _: compute_forecast(),
+                                    ttl=current_app.config.get('FORECAST_GLOBAL_TTL', 300))
+
+
+def invalidate_forecast(user_id):
+    """用户的词汇进度变化后调用"""
+    get_forecast_cache().invalidate(user_id)
@@ -0,0 +1,74 @@
+"""
+登录用户身份缓存
+
+Flask-Login 每个请求都会调用 user_loader。这里按用户 ID 缓存一个只读快照
+（id、username、is_admin、is_active、ability），在 USER_CACHE_TTL 秒内不再查询数据库。
+管理员修改用户状态或权限时调用 invalidate_user() 立即失效本进程的缓存，
+其他工作进程最迟在 TTL 到期后看到变更。
+"""
+import time
+from collections import namedtuple
+
+from flask import current_app
+from flask_login import UserMixin
+
+
+class UserSnapshot(namedtuple('UserSnapshot', 'id username is_admin is_active ability'), UserMixin):
+    """登录用户的不可变快照（不绑定数据库会话）"""
+    __slots__ = ()
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, bool(user.is_admin), bool(user.is_active), user.ability)
+
+
+class IdentityCache:
+    """带过期时间的用户快照缓存"""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}  # user_id -> (过期时间, 快照)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id, loader):
+        """返回缓存的快照；未命中或已过期时调用 loader(user_id) 重新加载"""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        user = loader(user_id)
+        if user is None:
+            self._entries.pop(user_id, None)
+            return None
+
+        snapshot = UserSnapshot.from_user(user)
+        if len(self._entries) >= self.max_size:
+            # 淘汰最早加入的一项
+            try:
+                self._entries.pop(next(iter(self._entries)))
+            except (StopIteration, KeyError, RuntimeError):
+                pass
+        self._entries[user_id] = (now + self.ttl, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+
+def get_identity_cache():
+    cache = current_app.extensions.get('identity_cache')
+    if cache is None:
+        cache = current_app.extensions['identity_cache'] = IdentityCache(
+            ttl=current_app.config.get('USER_CACHE_TTL', 30),
+            max_size=current_app.config.get('USER_CACHE_SIZE', 10000),
+        )
+    return cache
+
+
+def invalidate_user(user_id):
+    """用户状态或权限变更后调用"""
+    get_identity_cache().invalidate(user_id)
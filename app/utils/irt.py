@@ -0,0 +1,185 @@
+"""
+词汇难度校准（两参数 IRT）
+
+模型：P(答对) = sigmoid(a_i × (θ_u − b_i))
+    b_i  词汇难度        先验 N(由 difficulty_level 换算的难度, σ_b²)
+    a_i  区分度          log a_i 的先验 N(0, σ_a²)
+    θ_u  用户能力        先验 N(0, σ_θ²)
+
+用带先验的联合极大似然（JMAP）拟合：依次对 θ、b、log a 做一步对角牛顿更新，
+每一步的梯度和二阶导都是按用户/词汇 np.bincount 汇总的逐行向量运算，内存和时间
+与答题记录数成线性关系，几百万行在单机上几秒内完成。答题少的词汇和用户被先验
+拉向默认值，不会出现极端估计。
+
+校准结果写入 Vocabulary.irt_difficulty / irt_discrimination 和 User.ability；
+内容包按校准难度预先排好新词顺序，学习时只需在排列中按用户能力定位。
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+
+from app import db
+from app.models import User, Vocabulary
+
+LEVEL_SCALE = 0.75          # difficulty_level 每级对应的难度差（logit）
+PRIOR_SD_ABILITY = 1.0
+PRIOR_SD_DIFFICULTY = 1.0
+PRIOR_SD_LOG_DISCRIMINATION = 0.5
+MAX_STEP = 1.0              # 单次牛顿更新的最大步长
+MIN_DISCRIMINATION, MAX_DISCRIMINATION = 0.25, 4.0
+
+# 新词的目标答对率：选择难度约为 能力 − logit(TARGET_SUCCESS) 的词
+TARGET_SUCCESS = 0.75
+
+
+def prior_difficulty(level):
+    """人工设定的 difficulty_level（1-5）换算为 logit 难度"""
+    return ((level or 1) - 3) * LEVEL_SCALE
+
+
+def effective_difficulty(irt_difficulty, level):
+    """已校准时使用校准难度，否则使用 difficulty_level 的换算值"""
+    return irt_difficulty if irt_difficulty is not None else prior_difficulty(level)
+
+
+def effective_difficulty_column():
+    """effective_difficulty 的 SQL 表达式"""
+    return db.func.coalesce(Vocabulary.irt_difficulty,
+                            (db.func.coalesce(Vocabulary.difficulty_level, 1) - 3) * LEVEL_SCALE)
+
+
+def target_difficulty(ability):
+    """能力为 ability 的用户答对率为 TARGET_SUCCESS 时的词汇难度（按区分度 1 计算）"""
+    return ability - math.log(TARGET_SUCCESS / (1 - TARGET_SUCCESS))
+
+
+class IrtFit:
+    """
+    校准结果
+
+    Attributes:
+        item_ids / difficulty / discrimination / item_attempts: 每个词汇一项
+        user_ids / ability / user_attempts: 每个用户一项
+        iterations: 迭代次数
+        log_likelihood: 最终的平均对数似然（每条答题记录）
+    """
+
+    def __init__(self, item_ids, difficulty, discrimination, item_attempts,
+                 user_ids, ability, user_attempts, iterations, log_likelihood):
+        self.item_ids = item_ids
+        self.difficulty = difficulty
+        self.discrimination = discrimination
+        self.item_attempts = item_attempts
+        self.user_ids = user_ids
+        self.ability = ability
+        self.user_attempts = user_attempts
+        self.iterations = iterations
+        self.log_likelihood = log_likelihood
+
+
+def _newton(grad, hess, current, sd, mean=0.0):
+    """带高斯先验的一步对角牛顿更新"""
+    grad = grad - (current - mean) / sd ** 2
+    hess = hess + 1.0 / sd ** 2
+    return current + np.clip(grad / hess, -MAX_STEP, MAX_STEP)
+
+
+def fit_irt(user_ids, item_ids, correct, item_prior=None, max_iterations=50, tol=1e-3):
+    """
+    拟合两参数 IRT 模型
+
+    Args:
+        user_ids, item_ids, correct: 每条答题记录一项的数组
+        item_prior: {词汇 id: 先验难度}，缺省为 0
+        max_iterations: 最大迭代次数
+        tol: 参数最大变化量小于 tol 时停止
+
+    Returns:
+        IrtFit
+    """
+    users, u = np.unique(np.asarray(user_ids), return_inverse=True)
+    items, i = np.unique(np.asarray(item_ids), return_inverse=True)
+    y = np.asarray(correct, dtype=np.float64)
+    item_prior = item_prior or {}
+    b0 = np.array([item_prior.get(int(item), 0.0) for item in items], dtype=np.float64)
+
+    theta = np.zeros(len(users))
+    b = b0.copy()
+    log_a = np.zeros(len(items))
+    bounds = (math.log(MIN_DISCRIMINATION), math.log(MAX_DISCRIMINATION))
+
+    def residuals():
+        a = np.exp(log_a)[i]
+        z = a * (theta[u] - b[i])
+        p = 1.0 / (1.0 + np.exp(-z))
+        return a, z, y - p, p * (1.0 - p)
+
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        previous = (theta.copy(), b.copy(), log_a.copy())
+
+        a, _, r, w = residuals()
+        theta = _newton(np.bincount(u, a * r, len(users)), np.bincount(u, a * a * w, len(users)),
+                        theta, PRIOR_SD_ABILITY)
+
+        a, _, r, w = residuals()
+        b = _newton(np.bincount(i, -a * r, len(items)), np.bincount(i, a * a * w, len(items)),
+                    b, PRIOR_SD_DIFFICULTY, b0)
+
+        _, z, r, w = residuals()
+        log_a = np.clip(_newton(np.bincount(i, r * z, len(items)), np.bincount(i, w * z * z, len(items)),
+                                log_a, PRIOR_SD_LOG_DISCRIMINATION), *bounds)
+
+        change = max(np.abs(theta - previous[0]).max(initial=0), np.abs(b - previous[1]).max(initial=0),
+                     np.abs(log_a - previous[2]).max(initial=0))
+        if change < tol:
+            break
+
+    a, z, _, _ = residuals()
+    # log p(y) = y·z − log(1 + e^z)
+    log_likelihood = float(np.mean(y * z - np.logaddexp(0, z))) if len(y) else 0.0
+    return IrtFit(items, b, np.exp(log_a), np.bincount(i, minlength=len(items)),
+                  users, theta, np.bincount(u, minlength=len(users)), iterations, log_likelihood)
+
+
+def calibrate(user_ids, item_ids, correct, **kwargs):
+    """以当前 difficulty_level 为先验拟合（需要应用上下文）"""
+    prior = {vocab_id: prior_difficulty(level) for vocab_id, level in db.session.execute(
+        db.select(Vocabulary.id, Vocabulary.difficulty_level))}
+    return fit_irt(user_ids, item_ids, correct, item_prior=prior, **kwargs)
+
+
+def store_calibration(fit, batch_size=5000):
+    """
+    把校准结果写回 Vocabulary 和 User（按主键分批 executemany，不提交）
+
+    Returns:
+        (更新的词汇数, 更新的用户数)
+    """
+    known_items = set(db.session.scalars(db.select(Vocabulary.id)))
+    known_users = set(db.session.scalars(db.select(User.id)))
+    items = [{'id': int(item), 'irt_difficulty': round(float(b), 4), 'irt_discrimination': round(float(a), 4)}
+             for item, b, a in zip(fit.item_ids, fit.difficulty, fit.discrimination) if int(item) in known_items]
+    users = [{'id': int(user), 'ability': round(float(theta), 4)}
+             for user, theta in zip(fit.user_ids, fit.ability) if int(user) in known_users]
+    for model, rows in ((Vocabulary, items), (User, users)):
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(db.update(model), rows[start:start + batch_size])
+    return len(items), len(users)
+
+
+def calibration_report(fit, top=10):
+    """校准结果概要（命令行输出用）"""
+    order = np.argsort(fit.difficulty)
+    return {
+        'items': len(fit.item_ids),
+        'users': len(fit.user_ids),
+        'iterations': fit.iterations,
+        'log_likelihood': round(fit.log_likelihood, 4),
+        'easiest': [(int(fit.item_ids[k]), round(float(fit.difficulty[k]), 2)) for k in order[:top]],
+        'hardest': [(int(fit.item_ids[k]), round(float(fit.difficulty[k]), 2)) for k in order[::-1][:top]],
+        'ability_mean': round(float(fit.ability.mean()), 3) if len(fit.ability) else 0.0,
+        'ability_sd': round(float(fit.ability.std()), 3) if len(fit.ability) else 0.0,
+        'fitted_at': datetime.utcnow().isoformat(),
+    }
@@ -0,0 +1,185 @@
+"""
+用户已学/已掌握集合（压缩位图）
+
+每个用户按领域（vocab / alphabet）保存两张位图：
+- seen：有进度记录的条目（学过或练过）
+- mastered：熟悉度 >= MASTERED_LEVEL 的条目
+
+位图以 zlib 压缩后的字节存入 user_bitmaps 表，每个请求只需按主键读一行，
+之后的集合差（新词选择）和计数（已掌握数量）都在内存中完成。
+progress.py 的写入函数在同一事务内同步位图；还没有位图的老用户在第一次读取时
+从进度表构建，在下一次答题时写入。
+"""
+import zlib
+
+from app import db
+from app.models import UserBitmap, UserVocabulary, UserAlphabet
+
+MASTERED_LEVEL = 4
+
+# 领域 -> (进度模型, 条目 ID 列名)
+DOMAINS = {
+    'vocab': (UserVocabulary, 'vocabulary_id'),
+    'alphabet': (UserAlphabet, 'alphabet_id'),
+}
+
+_FORMAT_VERSION = 1
+
+
+class IdBitmap:
+    """非负整数 ID 的位图（bytearray 存储，第 i 位表示 ID i）"""
+    __slots__ = ('_bits',)
+
+    def __init__(self, ids=()):
+        self._bits = bytearray()
+        for item_id in ids:
+            self.add(item_id)
+
+    @classmethod
+    def _from_int(cls, value):
+        bitmap = cls()
+        bitmap._bits = bytearray(value.to_bytes((value.bit_length() + 7) // 8, 'little'))
+        return bitmap
+
+    def _int(self):
+        return int.from_bytes(self._bits, 'little')
+
+    def add(self, item_id):
+        if item_id < 0:
+            raise ValueError(f'ID 不能为负数: {item_id}')
+        index = item_id >> 3
+        if index >= len(self._bits):
+            self._bits.extend(bytes(index + 1 - len(self._bits)))
+        self._bits[index] |= 1 << (item_id & 7)
+
+    def discard(self, item_id):
+        index = item_id >> 3
+        if 0 <= index < len(self._bits):
+            self._bits[index] &= ~(1 << (item_id & 7)) & 0xFF
+
+    def __contains__(self, item_id):
+        index = item_id >> 3
+        return 0 <= index < len(self._bits) and bool(self._bits[index] >> (item_id & 7) & 1)
+
+    def __len__(self):
+        return self._int().bit_count()
+
+    def __bool__(self):
+        return any(self._bits)
+
+    def __iter__(self):
+        for index, byte in enumerate(self._bits):
+            while byte:
+                low = byte & -byte
+                yield (index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def __and__(self, other):
+        return IdBitmap._from_int(self._int() & other._int())
+
+    def __or__(self, other):
+        return IdBitmap._from_int(self._int() | other._int())
+
+    def __sub__(self, other):
+        return IdBitmap._from_int(self._int() & ~other._int())
+
+    def __eq__(self, other):
+        if not isinstance(other, IdBitmap):
+            return NotImplemented
+        return self._int() == other._int()
+
+    def __repr__(self):
+        return f'<IdBitmap {len(self)} ids>'
+
+    def to_bytes(self):
+        """序列化：1 字节版本号 + zlib 压缩的位数组（去掉末尾的 0 字节）"""
+        return bytes([_FORMAT_VERSION]) + zlib.compress(bytes(self._bits).rstrip(b'\0'))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        bitmap = cls()
+        if blob:
+            if blob[0] != _FORMAT_VERSION:
+                raise ValueError(f'不支持的位图格式版本: {blob[0]}')
+            bitmap._bits = bytearray(zlib.decompress(blob[1:]))
+        return bitmap
+
+
+class LearnedSets:
+    """一个用户在一个领域的 seen / mastered 位图"""
+    __slots__ = ('seen', 'mastered')
+
+    def __init__(self, seen=None, mastered=None):
+        self.seen = seen if seen is not None else IdBitmap()
+        self.mastered = mastered if mastered is not None else IdBitmap()
+
+    def apply(self, item_id, familiarity=None):
+        """
+        记录一次进度变化
+
+        Args:
+            item_id: 条目 ID
+            familiarity: 新熟悉度；None 表示只标记为已学（不改变掌握状态）
+
+        Returns:
+            set: 内容发生变化的位图名（'seen' / 'mastered'）
+        """
+        changed = set()
+        if item_id not in self.seen:
+            self.seen.add(item_id)
+            changed.add('seen')
+        if familiarity is not None:
+            mastered = familiarity >= MASTERED_LEVEL
+            if mastered != (item_id in self.mastered):
+                if mastered:
+                    self.mastered.add(item_id)
+                else:
+                    self.mastered.discard(item_id)
+                changed.add('mastered')
+        return changed
+
+
+def bitmap_kinds(domain):
+    """领域对应的两个 user_bitmaps.kind"""
+    return f'{domain}_seen', f'{domain}_mastered'
+
+
+def build_learned_sets(user_id, domain):
+    """从进度表构建位图"""
+    model, column = DOMAINS[domain]
+    sets = LearnedSets()
+    for item_id, familiarity in db.session.execute(
+        db.select(getattr(model, column), model.familiarity_level).where(model.user_id == user_id)
+    ):
+        sets.apply(item_id, familiarity or 0)
+    return sets
+
+
+def _select_bitmaps(user_id, domain):
+    return db.select(UserBitmap.kind, UserBitmap.data).where(
+        UserBitmap.user_id == user_id, UserBitmap.kind.in_(bitmap_kinds(domain)))
+
+
+def _from_rows(user_id, domain, rows):
+    """由 (kind, data) 行组装位图；行不全或尚未构建时从进度表构建"""
+    data = dict(rows)
+    seen_kind, mastered_kind = bitmap_kinds(domain)
+    if data.get(seen_kind) is None or data.get(mastered_kind) is None:
+        return build_learned_sets(user_id, domain)
+    return LearnedSets(IdBitmap.from_bytes(data[seen_kind]), IdBitmap.from_bytes(data[mastered_kind]))
+
+
+def get_learned_sets(user_id, domain):
+    """读取用户在某领域的已学/已掌握位图（一条主键查询）"""
+    return _from_rows(user_id, domain, db.session.execute(_select_bitmaps(user_id, domain)).all())
+
+
+def lock_learned_sets(user_id, domain):
+    """
+    写入前加行锁读取位图（SQLite 不支持 FOR UPDATE，由数据库级写锁保证串行）
+
+    Returns:
+        (LearnedSets, 已存在的 kind 集合)
+    """
+    rows = db.session.execute(_select_bitmaps(user_id, domain).with_for_update()).all()
+    return _from_rows(user_id, domain, rows), {kind for kind, data in rows if data is not None}
@@ -0,0 +1,214 @@
+"""
+轻量指标收集（Prometheus 文本格式）
+
+每个线程写自己的分片，计数和直方图更新不加锁；抓取时合并所有分片。
+指标按工作进程统计，多个 gunicorn worker 由 Prometheus 分别抓取或在查询时求和。
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 512, 1024, 2048, 3072, 4096, 8192)
+
+
+class _Shard:
+    """单个线程的指标数据"""
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> float
+        self.histograms = {}  # (name, labels) -> [各桶计数..., +Inf, 总和]
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()  # 只在新线程创建分片时使用
+        self._meta = {}     # name -> (类型, 说明, 桶)
+        self._gauges = {}   # name -> (说明, 回调)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    # ---------- 定义 ----------
+
+    def counter(self, name, help_text):
+        self._meta[name] = ('counter', help_text, None)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help_text, tuple(buckets))
+
+    def gauge(self, name, help_text, callback):
+        """抓取时调用 callback()，返回数值或 {标签元组: 数值}"""
+        self._gauges[name] = (help_text, callback)
+
+    # ---------- 记录 ----------
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = self._meta[name][2]
+        histograms = self._shard().histograms
+        key = (name, labels)
+        data = histograms.get(key)
+        if data is None:
+            data = histograms[key] = [0] * (len(buckets) + 2)
+        data[bisect_left(buckets, value)] += 1
+        data[-1] += value
+
+    # ---------- 输出 ----------
+
+    def collect(self):
+        """合并所有分片，返回 (counters, histograms)"""
+        counters, histograms = {}, {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in shard.counters.copy().items():
+                counters[key] = counters.get(key, 0) + value
+            for key, data in shard.histograms.copy().items():
+                merged = histograms.setdefault(key, [0] * len(data))
+                for i, value in enumerate(list(data)):
+                    merged[i] += value
+        return counters, histograms
+
+    def render(self):
+        """生成 Prometheus 文本格式"""
+        counters, histograms = self.collect()
+        lines = []
+
+        for name, (kind, help_text, buckets) in sorted(self._meta.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            else:
+                for (metric, labels), data in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), data[:-1]):
+                        cumulative += count
+                        le = bound if bound == '+Inf' else _number(bound)
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(data[-1])}')
+                    lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+        for name, (help_text, callback) in sorted(self._gauges.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            values = value.items() if isinstance(value, dict) else [((), value)]
+            for labels, v in values:
+                lines.append(f'{name}{_labels(labels)} {_number(v)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def get_metrics():
+    """当前应用的指标注册表，未启用时返回 None"""
+    return current_app.extensions.get('metrics')
+
+
+def init_metrics(app):
+    """在 create_app 中调用：注册请求指标和缓存大小指标"""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+
+    registry.counter('learnthai_http_requests_total', '按路由和状态码统计的请求数')
+    registry.histogram('learnthai_http_request_duration_seconds', '按路由统计的请求耗时')
+    registry.histogram('learnthai_session_cookie_bytes', '响应中会话 Cookie 的大小', BYTES_BUCKETS)
+    registry.counter('learnthai_db_queries_total', '按路由统计的 SQL 语句数')
+    registry.histogram('learnthai_db_time_seconds', '按路由统计的每请求数据库耗时')
+
+    registry.gauge('learnthai_worker_start_time_seconds', '工作进程启动时间',
+                   lambda value=time.time(): value)
+    registry.gauge('learnthai_worker_pid', '工作进程 PID', os.getpid)
+
+    def content_bundle_bytes():
+        holder = app.extensions.get('content_bundle')
+        bundle = holder.bundle if holder else None
+        return bundle.size if bundle else 0
+    registry.gauge('learnthai_content_bundle_bytes', '已映射的内容包大小', content_bundle_bytes)
+
+    def vocab_catalog_rows():
+        holder = app.extensions.get('content_bundle')
+        bundle = holder.bundle if holder else None
+        return len(bundle['vocabularies']) if bundle else 0
+    registry.gauge('learnthai_vocab_catalog_rows', '共享词汇目录中的词汇数', vocab_catalog_rows)
+
+    def identity_cache_entries():
+        cache = app.extensions.get('identity_cache')
+        return len(cache) if cache else 0
+    registry.gauge('learnthai_identity_cache_entries', '登录用户快照缓存条目数', identity_cache_entries)
+
+    def forecast_cache_entries():
+        cache = app.extensions.get('forecast_cache')
+        return len(cache) if cache else 0
+    registry.gauge('learnthai_forecast_cache_entries', '复习量预测缓存条目数', forecast_cache_entries)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unknown'
+        registry.inc('learnthai_http_requests_total',
+                     (('endpoint', endpoint), ('status', str(response.status_code))))
+        registry.observe('learnthai_http_request_duration_seconds', time.perf_counter() - start,
+                         (('endpoint', endpoint),))
+
+        cookie_name = app.config.get('SESSION_COOKIE_NAME', 'session')
+        for header in response.headers.getlist('Set-Cookie'):
+            if header.startswith(cookie_name + '='):
+                registry.observe('learnthai_session_cookie_bytes', len(header))
+        return response
+
+    # 每请求的语句数和耗时来自 sql_stats：开启指标时它总是统计这两项，与 SQL_INSTRUMENTATION 无关
+    def record_db_metrics(endpoint, stats):
+        labels = (('endpoint', endpoint),)
+        registry.inc('learnthai_db_queries_total', labels, stats.count)
+        registry.observe('learnthai_db_time_seconds', stats.total_time, labels)
+
+    app.extensions.setdefault('sql_stats_listeners', []).append(record_db_metrics)
@@ -0,0 +1,143 @@
+"""
+密码哈希进程池
+
+scrypt 哈希每次要占用几百毫秒 CPU。登录高峰时把哈希和校验放到独立的进程池里执行，
+请求线程只等待结果：
+- 同时排队的任务数有上限（PASSWORD_POOL_WORKERS + PASSWORD_POOL_QUEUE），超出时立即拒绝
+- 等待超过 PASSWORD_POOL_TIMEOUT 秒视为超时
+- PASSWORD_POOL_WORKERS 为 0 时在当前线程直接计算（测试和命令行脚本）
+
+修改 PASSWORD_HASH_METHOD 后，用户下次登录时会用新参数重新哈希（见 needs_rehash）。
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+
+
+class PasswordPoolBusy(Exception):
+    """进程池已满或等待超时"""
+
+
+class PasswordPool:
+    """有界的密码哈希进程池（在每个工作进程中首次使用时创建）"""
+
+    def __init__(self, workers, queue_size, timeout, metrics=None):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self._metrics = metrics
+        self._slots = threading.BoundedSemaphore(self.capacity) if workers else None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    def _get_executor(self):
+        # gunicorn fork 之后要在子进程里重新创建进程池
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordPoolBusy('密码计算队列已满')
+
+        started = time.perf_counter()
+        with self._count_lock:
+            self.in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                self._count('timeout')
+                raise PasswordPoolBusy('密码计算超时') from None
+        finally:
+            with self._count_lock:
+                self.in_flight -= 1
+            self._slots.release()
+            if self._metrics is not None:
+                self._metrics.observe('learnthai_password_pool_wait_seconds', time.perf_counter() - started)
+
+    def _count(self, reason):
+        if self._metrics is not None:
+            self._metrics.inc('learnthai_password_pool_rejections_total', (('reason', reason),))
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+def _get_pool():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('password_pool')
+
+
+def hash_method():
+    """当前配置的哈希方法（无应用上下文时使用默认值）"""
+    if not has_app_context():
+        return DEFAULT_METHOD
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+def hash_password(password):
+    """按 PASSWORD_HASH_METHOD 生成密码哈希（在进程池中执行）"""
+    pool = _get_pool()
+    if pool is None:
+        return generate_password_hash(password, method=hash_method())
+    return pool.run(generate_password_hash, password, hash_method())
+
+
+def verify_password(pwhash, password):
+    """校验密码（在进程池中执行）"""
+    pool = _get_pool()
+    if pool is None:
+        return check_password_hash(pwhash, password)
+    return pool.run(check_password_hash, pwhash, password)
+
+
+_canonical_prefixes = {}
+
+
+def needs_rehash(pwhash):
+    """哈希参数与当前 PASSWORD_HASH_METHOD 不一致时返回 True"""
+    method = hash_method()
+    prefix = _canonical_prefixes.get(method)
+    if prefix is None:
+        # 'scrypt' 这样的简写会展开为带参数的完整前缀，生成一次空密码的哈希即可得到
+        prefix = _canonical_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return pwhash.split('$', 1)[0] != prefix
+
+
+def init_password_pool(app):
+    """在 create_app 中调用（需在 init_metrics 之后）"""
+    metrics = app.extensions.get('metrics')
+    pool = PasswordPool(
+        workers=app.config.get('PASSWORD_POOL_WORKERS', 0),
+        queue_size=app.config.get('PASSWORD_POOL_QUEUE', 0),
+        timeout=app.config.get('PASSWORD_POOL_TIMEOUT', 5),
+        metrics=metrics,
+    )
+    app.extensions['password_pool'] = pool
+
+    if metrics is not None:
+        metrics.counter('learnthai_password_pool_rejections_total', '密码计算被拒绝或超时的次数')
+        metrics.histogram('learnthai_password_pool_wait_seconds', '密码计算从提交到完成的耗时')
+        metrics.gauge('learnthai_password_pool_in_flight', '正在计算或排队的密码任务数', lambda: pool.in_flight)
+        metrics.gauge('learnthai_password_pool_capacity', '密码任务的最大并发数（含排队）', lambda: pool.capacity)
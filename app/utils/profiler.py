@@ -0,0 +1,108 @@
+"""
+按需请求性能分析（仅管理员）
+
+管理员在请求中带上 X-Profile: 1 请求头或 ?_profile=1 参数时，这次请求在 cProfile
+下运行。结果（耗时最多的函数、SQL 时间线、原始 pstats 数据）保存在每个工作进程的
+环形缓冲区中，可在 /admin/profiles 查看和下载。
+"""
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, g, request
+from flask_login import current_user
+
+from app.utils.sql_stats import current_stats, RequestSqlStats
+
+
+class ProfileRecord:
+    """一次请求的分析结果"""
+
+    def __init__(self, id, method, path, endpoint, status, duration, top_stats, sql_timeline, pstats_data,
+                 sql_count=None, sql_time=None):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.status = status
+        self.duration = duration
+        self.top_stats = top_stats
+        self.sql_timeline = sql_timeline    # 最多 sql_stats.MAX_TIMELINE 条
+        self.pstats_data = pstats_data
+        # 语句总数和总耗时（时间线被截断时大于时间线中的合计）
+        self.sql_count = len(sql_timeline) if sql_count is None else sql_count
+        self.sql_time = sum(elapsed for _, elapsed, _ in sql_timeline) if sql_time is None else sql_time
+        self.created_at = datetime.utcnow()
+
+
+def _wants_profile():
+    if request.headers.get('X-Profile') != '1' and request.args.get('_profile') != '1':
+        return False
+    return current_user.is_authenticated and current_user.is_admin
+
+
+def get_profiles():
+    """当前进程保存的分析结果（新的在前）"""
+    buffer = current_app.extensions.get('profiles')
+    return list(reversed(buffer)) if buffer is not None else []
+
+
+def get_profile(profile_id):
+    for record in get_profiles():
+        if record.id == profile_id:
+            return record
+    return None
+
+
+def init_profiler(app):
+    """在 create_app 中调用（需在 init_sql_stats 之后，以便读取 SQL 时间线）"""
+    buffer = deque(maxlen=app.config.get('PROFILE_BUFFER_SIZE', 20))
+    app.extensions['profiles'] = buffer
+    ids = itertools.count(1)
+
+    @app.before_request
+    def start_profiler():
+        if not _wants_profile():
+            return
+        # 未开启 SQL_INSTRUMENTATION 时也记录这次请求的 SQL 时间线
+        if g.get('sql_stats') is None:
+            g.sql_stats = RequestSqlStats()
+        g.sql_stats.detailed = True
+        profiler = cProfile.Profile()
+        g.profiler = profiler
+        g.profiler_start = time.perf_counter()
+        profiler.enable()
+
+    @app.after_request
+    def stop_profiler(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        duration = time.perf_counter() - g.pop('profiler_start')
+
+        stats = pstats.Stats(profiler)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(app.config.get('PROFILE_TOP_N', 40))
+
+        sql = current_stats()
+        buffer.append(ProfileRecord(
+            id=next(ids),
+            method=request.method,
+            path=request.full_path.rstrip('?'),
+            endpoint=request.endpoint,
+            status=response.status_code,
+            duration=duration,
+            top_stats=out.getvalue(),
+            sql_timeline=list(sql.timeline) if sql else [],
+            pstats_data=marshal.dumps(stats.stats),
+            sql_count=sql.count if sql else 0,
+            sql_time=sql.total_time if sql else 0.0,
+        ))
+        return response
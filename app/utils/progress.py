@@ -0,0 +1,368 @@
+"""
+学习进度写入层
+
+所有进度表（UserVocabulary / UserAlphabet / UserConversation）的更新都用一条
+INSERT ... ON CONFLICT DO UPDATE 完成，计数在数据库端自增，不需要先 SELECT。
+用户双击或多个标签页同时提交时不会再触发唯一约束的 IntegrityError。
+
+词汇和字母的写入函数还会在同一事务内同步用户的已学/已掌握位图
+（见 learned_sets.py），位图内容没有变化时不写入；词汇答题和对话练习同时记入
+活跃用户草图（见 activity.py）。
+
+注意：更新字段的顺序是有意安排的——依赖旧值的字段（next_review_date）排在前面，
+这样在按顺序求值的 MySQL ON DUPLICATE KEY UPDATE 中结果也与 SQLite/PostgreSQL 一致。
+"""
+import json
+from datetime import datetime
+
+from app import db
+from app.models import UserVocabulary, UserAlphabet, UserConversation, UserBitmap, ActivitySketch, \
+    AlphabetConfusion
+from app.utils.activity import HyperLogLog, get_activity_tracker
+from app.utils.forecast import invalidate_forecast
+from app.utils.learned_sets import bitmap_kinds, lock_learned_sets
+from app.utils.srs import calculate_next_review_date
+
+
+def _insert(model):
+    """按当前数据库方言返回支持冲突处理的 insert 构造"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        raise NotImplementedError(f'不支持的数据库: {dialect}')
+    return insert(model), dialect
+
+
+def _execute_returning(stmt, column, where):
+    """
+    执行 INSERT/UPDATE 并返回写入后 column 的值
+
+    数据库支持 RETURNING 时在同一条语句中取回，否则按 where 条件再查一次；
+    没有匹配的行时返回 None
+    """
+    dialect = db.session.get_bind().dialect
+    supported = dialect.insert_returning if stmt.is_insert else dialect.update_returning
+    if supported:
+        return db.session.execute(stmt.returning(column)).scalar()
+    db.session.execute(stmt)
+    return db.session.scalar(db.select(column).where(*where))
+
+
+def _upsert(model, keys, values, update, returning=None):
+    """
+    执行一条 upsert
+
+    Args:
+        model: 进度模型
+        keys: 唯一约束列名列表
+        values: 新插入时的值
+        update: 冲突时的 SET 子句（可以引用已有行的列）
+        returning: 需要取回写入后值的列（返回该值）
+    """
+    stmt, dialect = _insert(model)
+    stmt = stmt.values(**values)
+    if dialect in ('mysql', 'mariadb'):
+        stmt = stmt.on_duplicate_key_update(update)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=update)
+    if returning is not None:
+        table = model.__table__.c
+        return _execute_returning(stmt, returning, [table[key] == values[key] for key in keys])
+    db.session.execute(stmt)
+
+
+def _insert_ignore(model, keys, rows):
+    """批量插入，已存在的行保持不变"""
+    if not rows:
+        return
+    stmt, dialect = _insert(model)
+    stmt = stmt.values(rows)
+    if dialect in ('mysql', 'mariadb'):
+        stmt = stmt.prefix_with('IGNORE')
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    db.session.execute(stmt)
+
+
+def _least(expr, value):
+    return db.case((expr > value, value), else_=expr)
+
+
+def _greatest(expr, value):
+    return db.case((expr < value, value), else_=expr)
+
+
+def next_review_expr(familiarity, review_count, now):
+    """
+    calculate_next_review_date 的 SQL 表达式版本
+
+    Args:
+        familiarity: 新熟悉度（整数或 SQL 表达式）
+        review_count: 新复习次数（SQL 表达式）
+        now: 计算起点
+    """
+    relearn = calculate_next_review_date(0, 0, now)
+    by_count = db.case(
+        *[(review_count == n, calculate_next_review_date(3, n, now)) for n in range(7)],
+        else_=calculate_next_review_date(3, 7, now)
+    )
+    if isinstance(familiarity, int):
+        return relearn if familiarity < 3 else by_count
+    return db.case((familiarity < 3, relearn), else_=by_count)
+
+
+def _sync_learned_sets(user_id, domain, updates, now):
+    """
+    把本次写入同步到用户的位图
+
+    Args:
+        updates: [(条目 ID, 新熟悉度)]，熟悉度为 None 表示只标记为已学
+    """
+    sets, stored = lock_learned_sets(user_id, domain)
+    kinds = dict(zip(('seen', 'mastered'), bitmap_kinds(domain)))
+    if len(stored) < len(kinds):
+        # 第一次写入：先插入占位行再加锁，并发的首次写入在唯一约束上排队，不会互相覆盖
+        _insert_ignore(UserBitmap, ['user_id', 'kind'], [
+            {'user_id': user_id, 'kind': kind, 'data': None, 'updated_at': now} for kind in kinds.values()
+        ])
+        sets, stored = lock_learned_sets(user_id, domain)
+
+    changed = set()
+    for item_id, familiarity in updates:
+        changed |= sets.apply(item_id, familiarity)
+    if len(stored) < len(kinds):
+        changed = set(kinds)  # 刚从进度表构建，整体写入
+
+    for name in changed:
+        db.session.execute(
+            db.update(UserBitmap)
+            .where(UserBitmap.user_id == user_id, UserBitmap.kind == kinds[name])
+            .values(data=getattr(sets, name).to_bytes(), updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _track_activity(kind, user_id, now):
+    tracker = get_activity_tracker()
+    tracker.add(kind, user_id, now.date())
+    if tracker.flush_due():
+        flush_activity(now)
+
+
+def flush_activity(now=None):
+    """把本进程累积的活跃用户草图合并进 activity_sketches（随当前事务提交）"""
+    now = now or datetime.utcnow()
+    for (day, kind), sketch in get_activity_tracker().take_dirty(now.date()):
+        select = db.select(ActivitySketch.registers).where(
+            ActivitySketch.day == day, ActivitySketch.kind == kind).with_for_update()
+        stored = db.session.scalar(select)
+        if stored is None:
+            _insert_ignore(ActivitySketch, ['day', 'kind'], [
+                {'day': day, 'kind': kind, 'registers': sketch.to_bytes(), 'updated_at': now}
+            ])
+            stored = db.session.scalar(select)
+        merged = HyperLogLog.from_bytes(stored)
+        if merged.merge(sketch):
+            db.session.execute(
+                db.update(ActivitySketch)
+                .where(ActivitySketch.day == day, ActivitySketch.kind == kind)
+                .values(registers=merged.to_bytes(), updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+
+# ==================== 词汇 ====================
+
+def ensure_vocab_progress(user_id, vocab_ids, now=None):
+    """为新词汇创建初始进度记录（已存在的不变）"""
+    now = now or datetime.utcnow()
+    if vocab_ids:
+        invalidate_forecast(user_id)
+    _insert_ignore(UserVocabulary, ['user_id', 'vocabulary_id'], [{
+        'user_id': user_id,
+        'vocabulary_id': vocab_id,
+        'familiarity_level': 0,
+        'next_review_date': now,
+        'review_count': 0,
+        'correct_count': 0,
+        'created_at': now,
+    } for vocab_id in vocab_ids])
+    if vocab_ids:
+        _sync_learned_sets(user_id, 'vocab', [(vocab_id, None) for vocab_id in vocab_ids], now)
+
+
+def record_vocab_rating(user_id, vocab_id, familiarity, now=None):
+    """闪卡自评：熟悉度直接设为用户选择的等级"""
+    now = now or datetime.utcnow()
+    is_correct = 1 if familiarity >= 3 else 0
+    uv = UserVocabulary.__table__.c
+    invalidate_forecast(user_id)
+    _upsert(UserVocabulary, ['user_id', 'vocabulary_id'], {
+        'user_id': user_id,
+        'vocabulary_id': vocab_id,
+        'familiarity_level': familiarity,
+        'next_review_date': calculate_next_review_date(familiarity, 0, now),
+        'review_count': 1,
+        'correct_count': is_correct,
+        'last_reviewed': now,
+        'created_at': now,
+    }, {
+        'next_review_date': next_review_expr(familiarity, uv.review_count + 1, now),
+        'familiarity_level': familiarity,
+        'correct_count': uv.correct_count + is_correct,
+        'review_count': uv.review_count + 1,
+        'last_reviewed': now,
+    })
+    _sync_learned_sets(user_id, 'vocab', [(vocab_id, familiarity)], now)
+    _track_activity('learning', user_id, now)
+
+
+def record_vocab_answer(user_id, vocab_id, is_correct, now=None):
+    """
+    选择题/判断题作答：答对熟悉度 +1（最高 5），答错重置为 1
+
+    只更新已有记录（与学习会话开始时创建的记录对应）
+    """
+    now = now or datetime.utcnow()
+    uv = UserVocabulary.__table__.c
+    invalidate_forecast(user_id)
+    familiarity = _least(uv.familiarity_level + 1, 5) if is_correct else 1
+    where = [uv.user_id == user_id, uv.vocabulary_id == vocab_id]
+    level = _execute_returning(
+        UserVocabulary.__table__.update()
+        .where(*where)
+        .values({
+            uv.next_review_date: next_review_expr(familiarity, uv.review_count + 1, now),
+            uv.familiarity_level: familiarity,
+            uv.correct_count: uv.correct_count + (1 if is_correct else 0),
+            uv.review_count: uv.review_count + 1,
+            uv.last_reviewed: now,
+        })
+        .execution_options(synchronize_session=False),
+        uv.familiarity_level, where
+    )
+    if level is not None:
+        _sync_learned_sets(user_id, 'vocab', [(vocab_id, level)], now)
+    _track_activity('learning', user_id, now)
+
+
+# ==================== 字母 ====================
+
+def record_alphabet_answer(user_id, alphabet_id, is_correct, now=None):
+    """字母选择题：答对熟悉度 +1（最高 5），答错 -1（最低 0）"""
+    now = now or datetime.utcnow()
+    initial = 1 if is_correct else 0
+    ua = UserAlphabet.__table__.c
+    if is_correct:
+        familiarity = _least(ua.familiarity_level + 1, 5)
+    else:
+        familiarity = _greatest(ua.familiarity_level - 1, 0)
+    level = _upsert(UserAlphabet, ['user_id', 'alphabet_id'], {
+        'user_id': user_id,
+        'alphabet_id': alphabet_id,
+        'familiarity_level': initial,
+        'review_count': 1,
+        'correct_count': initial,
+        'next_review_date': calculate_next_review_date(initial, 1, now),
+        'last_reviewed': now,
+        'created_at': now,
+    }, {
+        'next_review_date': next_review_expr(familiarity, ua.review_count + 1, now),
+        'familiarity_level': familiarity,
+        'correct_count': ua.correct_count + initial,
+        'review_count': ua.review_count + 1,
+        'last_reviewed': now,
+    }, returning=ua.familiarity_level)
+    _sync_learned_sets(user_id, 'alphabet', [(alphabet_id, level)], now)
+
+
+def record_alphabet_confusion(alphabet_id, selected_alphabet_id, now=None):
+    """字母选择题答错时累加误选计数（供 confusability.py 构建近邻表）"""
+    now = now or datetime.utcnow()
+    ac = AlphabetConfusion.__table__.c
+    _upsert(AlphabetConfusion, ['alphabet_id', 'selected_alphabet_id'], {
+        'alphabet_id': alphabet_id,
+        'selected_alphabet_id': selected_alphabet_id,
+        'count': 1,
+        'updated_at': now,
+    }, {
+        'count': ac.count + 1,
+        'updated_at': now,
+    })
+
+
+def record_alphabet_rating(user_id, alphabet_id, familiarity, now=None):
+    """字母闪卡自评：熟悉度直接设为用户选择的等级"""
+    now = now or datetime.utcnow()
+    is_correct = 1 if familiarity >= 3 else 0
+    ua = UserAlphabet.__table__.c
+    _upsert(UserAlphabet, ['user_id', 'alphabet_id'], {
+        'user_id': user_id,
+        'alphabet_id': alphabet_id,
+        'familiarity_level': familiarity,
+        'review_count': 1,
+        'correct_count': is_correct,
+        'next_review_date': calculate_next_review_date(familiarity, 1, now),
+        'last_reviewed': now,
+        'created_at': now,
+    }, {
+        'next_review_date': next_review_expr(familiarity, ua.review_count + 1, now),
+        'familiarity_level': familiarity,
+        'correct_count': ua.correct_count + is_correct,
+        'review_count': ua.review_count + 1,
+        'last_reviewed': now,
+    })
+    _sync_learned_sets(user_id, 'alphabet', [(alphabet_id, familiarity)], now)
+
+
+# ==================== 对话 ====================
+
+def record_conversation_practice(user_id, conversation_id, mode, accuracy, now=None):
+    """
+    对话练习：练习次数 +1，记录完成的模式，并按正确率调整熟练度
+
+    - 正确率 >= 90%：熟练度 +1（最高 5）
+    - 正确率 >= 70%：熟练度至少为 3
+    - 正确率 < 50%：熟练度 -1（最低 0）
+    """
+    now = now or datetime.utcnow()
+    uc = UserConversation.__table__.c
+
+    if accuracy >= 0.9:
+        familiarity, initial = _least(uc.familiarity_level + 1, 5), 1
+    elif accuracy >= 0.7:
+        familiarity, initial = _greatest(uc.familiarity_level, 3), 3
+    elif accuracy < 0.5:
+        familiarity, initial = _greatest(uc.familiarity_level - 1, 0), 0
+    else:
+        familiarity, initial = uc.familiarity_level, 0
+
+    # completed_modes 是 json.dumps 生成的列表字符串，在数据库端追加新模式
+    item = json.dumps(mode)
+    modes = db.func.coalesce(uc.completed_modes, '[]')
+    appended = db.case(
+        (modes == '[]', f'[{item}]'),
+        else_=db.func.substr(modes, 1, db.func.length(modes) - 1).concat(f', {item}]')
+    )
+    completed_modes = db.case((modes.contains(item, autoescape=True), modes), else_=appended)
+
+    _upsert(UserConversation, ['user_id', 'conversation_id'], {
+        'user_id': user_id,
+        'conversation_id': conversation_id,
+        'familiarity_level': initial,
+        'completed_modes': json.dumps([mode]),
+        'practice_count': 1,
+        'last_practiced': now,
+        'created_at': now,
+    }, {
+        'completed_modes': completed_modes,
+        'familiarity_level': familiarity,
+        'practice_count': uc.practice_count + 1,
+        'last_practiced': now,
+    })
+    _track_activity('conversation', user_id, now)
@@ -0,0 +1,147 @@
+"""
+批量创建用户
+
+按块流式读取 CSV（username,email[,password]），每块：
+1. 用两条 IN 查询检查用户名/邮箱是否已存在（同时去掉文件内的重复）
+2. 在进程池中并行计算密码哈希
+3. 一条 executemany INSERT 写入并提交
+
+密码列为空时生成随机密码，写入凭据文件交给管理员分发。
+"""
+import csv
+import os
+import secrets
+import time
+from datetime import datetime
+from itertools import islice, repeat
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+from app.utils.password_pool import hash_method
+
+MIN_PASSWORD_LENGTH = 6
+
+
+class ProvisionResult:
+    """批量创建的结果"""
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = []      # [(行号, 用户名, 原因)]
+        self.generated = []    # [(用户名, 邮箱, 生成的密码)]
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        """每秒创建的用户数"""
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+
+def read_user_rows(f):
+    """从 CSV 文件对象逐行读取 (行号, 用户名, 邮箱, 密码)"""
+    reader = csv.DictReader(f)
+    for line_no, row in enumerate(reader, start=2):
+        yield (line_no,
+               (row.get('username') or '').strip(),
+               (row.get('email') or '').strip(),
+               row.get('password') or '')
+
+
+def _existing(column, values):
+    if not values:
+        return set()
+    return set(db.session.scalars(db.select(column).where(column.in_(values))))
+
+
+def _validate_chunk(chunk, seen_usernames, seen_emails, result):
+    """去掉无效行和重复行，返回可以插入的 [(用户名, 邮箱, 密码, 是否生成)]"""
+    candidates = []
+    for line_no, username, email, password in chunk:
+        if not username or not email:
+            result.skipped.append((line_no, username, '用户名或邮箱为空'))
+        elif password and len(password) < MIN_PASSWORD_LENGTH:
+            result.skipped.append((line_no, username, f'密码少于 {MIN_PASSWORD_LENGTH} 位'))
+        elif username in seen_usernames:
+            result.skipped.append((line_no, username, '文件内用户名重复'))
+        elif email in seen_emails:
+            result.skipped.append((line_no, username, '文件内邮箱重复'))
+        else:
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            candidates.append((line_no, username, email, password))
+
+    taken_usernames = _existing(User.username, [c[1] for c in candidates])
+    taken_emails = _existing(User.email, [c[2] for c in candidates])
+
+    rows = []
+    for line_no, username, email, password in candidates:
+        if username in taken_usernames:
+            result.skipped.append((line_no, username, '用户名已存在'))
+        elif email in taken_emails:
+            result.skipped.append((line_no, username, '邮箱已注册'))
+        elif password:
+            rows.append((username, email, password, False))
+        else:
+            rows.append((username, email, secrets.token_urlsafe(9), True))
+    return rows
+
+
+def provision_users(rows, executor=None, chunk_size=500, on_chunk=None):
+    """
+    批量创建普通用户
+
+    Args:
+        rows: read_user_rows 产生的 (行号, 用户名, 邮箱, 密码) 迭代器
+        executor: 用于并行哈希的 concurrent.futures 执行器，None 时在当前进程计算
+        chunk_size: 每批处理和提交的行数
+        on_chunk: 每批提交后调用 on_chunk(result)，用于输出进度
+
+    Returns:
+        ProvisionResult
+    """
+    result = ProvisionResult()
+    started = time.perf_counter()
+    method = hash_method()
+    mapper = executor.map if executor is not None else map
+    seen_usernames, seen_emails = set(), set()
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        valid = _validate_chunk(chunk, seen_usernames, seen_emails, result)
+        if valid:
+            hashes = mapper(generate_password_hash, [r[2] for r in valid], repeat(method, len(valid)))
+            now = datetime.utcnow()
+            db.session.execute(db.insert(User), [{
+                'username': username,
+                'email': email,
+                'password_hash': pwhash,
+                'is_admin': False,
+                'is_active': True,
+                'created_at': now,
+            } for (username, email, _, _), pwhash in zip(valid, hashes)])
+            db.session.commit()
+
+            result.created += len(valid)
+            result.generated.extend((u, e, p) for u, e, p, generated in valid if generated)
+
+        result.elapsed = time.perf_counter() - started
+        if on_chunk is not None:
+            on_chunk(result)
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def write_credentials(path, generated):
+    """把生成的密码写入 CSV（仅当前用户可读）"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['username', 'email', 'password'])
+        writer.writerows(generated)
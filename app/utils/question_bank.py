@@ -0,0 +1,185 @@
+"""
+预生成题库
+
+选择题和判断题原来在每次请求时现场生成：遍历会话词汇筛选同分类候选、查询易混淆近邻、
+随机抽样。这里在编译内容包时为每个词汇和字母预先生成 QUESTION_SETS 组干扰项、为每个
+词汇生成 FALSE_PAIRINGS 个判断题错误配对，写入内容包的 vocab_questions / vocab_pairings /
+alphabet_questions 分区（按 item_id 排序）。出题时在分区中二分定位条目、随机取一行，
+再打乱选项顺序即可。
+
+干扰项的规则与现场生成一致：最多 CONFUSABLE_OPTIONS 个取自易混淆近邻（名次越靠前越容易
+被选中），其余优先从同分类（字母为同类型）中抽取，不足时从全部条目中抽取；同一组内的
+释义互不相同且不等于正确答案。所有条目一起按数组运算抽样，编译时间与条目数成线性关系。
+内容变更时 refresh_content_bundle 重新编译内容包，题库随之更新。
+"""
+import random
+
+import numpy as np
+
+from app.utils.confusability import CONFUSABLE_OPTIONS
+from app.utils.content_bundle import INT_NULL
+
+QUESTION_SETS = 6       # 每个条目预生成的选择题干扰项组数
+FALSE_PAIRINGS = 4      # 每个词汇预生成的判断题错误配对数
+OPTION_COLUMNS = ('option_1', 'option_2', 'option_3')
+DRAW_ROUNDS = 8         # 不合格的空位在同分类、全部条目中各最多重抽的轮数
+
+
+def _neighbor_slots(item_rows, neighbor_rows, n, sets, limit, rng):
+    """
+    为每个条目的每组抽取最多 limit 个近邻（按名次倒数加权、无放回）
+
+    每组给每个近邻一个 Exp(1) / 权重 的随机键，取条目内键最小的 limit 个，
+    与 confusability.pick_confusable 的逐个加权抽样等价。
+
+    Args:
+        item_rows, neighbor_rows: 近邻表（行号），按条目排序，同一条目内按得分降序
+
+    Returns:
+        (n, sets, limit) 的行号数组，空位为 -1
+    """
+    result = np.full((n, sets, limit), -1, dtype=np.int64)
+    if not len(item_rows) or not limit:
+        return result
+    starts = np.flatnonzero(np.r_[True, item_rows[1:] != item_rows[:-1]])
+    rank = np.arange(len(item_rows)) - np.repeat(starts, np.diff(np.r_[starts, len(item_rows)]))
+    weight = 1.0 / (rank + 1)
+    for s in range(sets):
+        # 条目已有序，按 (条目, 随机键) 排序后每个条目的区间不变
+        order = np.lexsort((rng.exponential(size=len(item_rows)) / weight, item_rows))
+        keep = rank < limit
+        result[item_rows[keep], s, rank[keep]] = neighbor_rows[order][keep]
+    return result
+
+
+def _invalid(slots, meanings):
+    """空位、与正确答案同义、与同组前面的干扰项同义的位置"""
+    codes = np.where(slots >= 0, meanings[slots], -1)
+    bad = (slots < 0) | (codes == meanings[:, None, None])
+    for j in range(1, slots.shape[2]):
+        earlier = (codes[:, :, :j] == codes[:, :, j:j + 1]) & (slots[:, :, :j] >= 0)
+        bad[:, :, j] |= earlier.any(axis=2)
+    return bad
+
+
+def sample_distractors(meanings, categories, sets, slots, preset=None, rng=None):
+    """
+    为每个条目抽取 sets 组、每组 slots 个干扰项
+
+    Args:
+        meanings: 每个条目释义的整数编码（释义相同的条目编码相同）
+        categories: 每个条目的分类编码
+        preset: (条目数, sets, k) 预先选定的干扰项（近邻），放在每组前 k 个位置，-1 为空位
+        rng: numpy Generator
+
+    Returns:
+        (条目数, sets, slots) 的行号数组，凑不满的位置为 -1
+    """
+    rng = rng or np.random.default_rng()
+    meanings = np.asarray(meanings, dtype=np.int64)
+    categories = np.asarray(categories, dtype=np.int64)
+    n = len(meanings)
+    result = np.full((n, sets, slots), -1, dtype=np.int64)
+    if preset is not None:
+        k = min(preset.shape[2], slots)
+        result[:, :, :k] = preset[:, :, :k]
+    if not n:
+        return result
+
+    # 按分类排序后，每个条目的同分类候选是 by_category[first:first + size]
+    by_category = np.argsort(categories, kind='stable')
+    first = np.searchsorted(categories[by_category], categories)
+    size = np.bincount(categories)[categories]
+
+    for scope in ('category', 'all'):
+        for _ in range(DRAW_ROUNDS):
+            item, s, j = np.nonzero(_invalid(result, meanings))
+            if not len(item):
+                return result
+            if scope == 'category':
+                offset = (rng.random(len(item)) * size[item]).astype(np.int64)
+                result[item, s, j] = by_category[first[item] + offset]
+            else:
+                result[item, s, j] = rng.integers(0, n, len(item))
+    result[_invalid(result, meanings)] = -1
+    return result
+
+
+def _item_distractors(rows, meaning_key, category_key, neighbors, sets, slots, confusable, rng):
+    """内容行 -> (条目 id 数组, 干扰项 id 数组 (条目数, sets, slots)，空位为 -1)"""
+    ids = np.array([row['id'] for row in rows], dtype=np.int64)
+    if not len(ids):
+        return ids, np.empty((0, sets, slots), dtype=np.int64)
+    _, meanings = np.unique([row.get(meaning_key) or '' for row in rows], return_inverse=True)
+    _, categories = np.unique([row.get(category_key) or '' for row in rows], return_inverse=True)
+
+    # 近邻 id -> 行号（内容行按 id 排序），已禁用的条目丢弃
+    pairs = np.array([(row['item_id'], row['neighbor_id']) for row in neighbors], dtype=np.int64).reshape(-1, 2)
+    item_rows = np.minimum(np.searchsorted(ids, pairs[:, 0]), len(ids) - 1)
+    neighbor_rows = np.minimum(np.searchsorted(ids, pairs[:, 1]), len(ids) - 1)
+    known = (ids[item_rows] == pairs[:, 0]) & (ids[neighbor_rows] == pairs[:, 1])
+    preset = _neighbor_slots(item_rows[known], neighbor_rows[known], len(ids), sets,
+                             min(confusable, slots), rng)
+
+    chosen = sample_distractors(meanings.ravel(), categories.ravel(), sets, slots, preset, rng)
+    return ids, np.where(chosen >= 0, ids[chosen], -1)
+
+
+def _question_columns(ids, options, columns):
+    """按列组织题库分区：每个条目 sets 行，空位为 INT_NULL"""
+    table = {'item_id': np.repeat(ids, options.shape[1]).astype(np.int32)}
+    for j, column in enumerate(columns):
+        values = options[:, :, j].ravel()
+        table[column] = np.where(values >= 0, values, INT_NULL).astype(np.int32)
+    return table
+
+
+def build_question_bank(sections, seed=None):
+    """
+    由已读取的内容行生成题库分区（编译内容包时调用，不访问数据库）
+
+    Args:
+        sections: content_bundle._load_rows 的结果（需要词汇、字母和近邻分区）
+        seed: 随机种子（测试用）
+
+    Returns:
+        {分区名: {列名: int32 数组}}：题库行数是条目数的数倍，直接按列交给 encode_sections，
+        不逐行构造 dict
+    """
+    rng = np.random.default_rng(seed)
+    vocab = sections.get('vocabularies', [])
+    alphabets = sections.get('thai_alphabets', [])
+    vocab_neighbors = sections.get('vocab_neighbors', [])
+
+    ids, options = _item_distractors(vocab, 'chinese_meaning', 'category', vocab_neighbors,
+                                     QUESTION_SETS, len(OPTION_COLUMNS), CONFUSABLE_OPTIONS, rng)
+    vocab_questions = _question_columns(ids, options, OPTION_COLUMNS)
+
+    # 判断题的错误配对：与原来一样不使用近邻，只优先取同分类的释义
+    ids, shown = _item_distractors(vocab, 'chinese_meaning', 'category', (), FALSE_PAIRINGS, 1, 0, rng)
+    vocab_pairings = _question_columns(ids, shown, ('shown_id',))
+
+    ids, options = _item_distractors(alphabets, 'name_chinese', 'alphabet_type',
+                                     sections.get('alphabet_neighbors', []),
+                                     QUESTION_SETS, len(OPTION_COLUMNS), CONFUSABLE_OPTIONS, rng)
+    alphabet_questions = _question_columns(ids, options, OPTION_COLUMNS)
+
+    return {
+        'vocab_questions': vocab_questions,
+        'vocab_pairings': vocab_pairings,
+        'alphabet_questions': alphabet_questions,
+    }
+
+
+def sample_question(section, item_id):
+    """
+    从题库分区中随机取条目的一行
+
+    Returns:
+        list: 该行除 item_id 外各列的值（空位为 None）；条目不在题库中时返回 None
+    """
+    start, end = section.range_of('item_id', item_id)
+    if start >= end:
+        return None
+    row = random.randrange(start, end)
+    return [section.value(name, row) for name in section.column_names[1:]]
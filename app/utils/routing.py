@@ -0,0 +1,89 @@
+"""
+读写分离：把只读视图的查询路由到只读副本
+
+- 视图用 @read_replica 装饰后，本次请求中的 SELECT 走副本，flush 仍然走主库
+- 本次请求一旦写过数据，后续查询都回到主库
+- 用户自己提交答案后的 READ_YOUR_WRITES_SECONDS 秒内，该用户的请求都读主库，
+  避免副本复制延迟导致看不到自己刚提交的进度
+"""
+import random
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+
+from app.utils.database import apply_sqlite_pragmas
+
+LAST_WRITE_KEY = '_last_write'
+
+
+def _replica_engine():
+    """当前请求应使用的副本引擎，不使用副本时返回 None"""
+    if not has_request_context() or not g.get('use_replica') or g.get('db_wrote'):
+        return None
+    replicas = current_app.extensions.get('db_replicas')
+    if not replicas:
+        return None
+    return random.choice(replicas)
+
+
+class RoutingSession(Session):
+    """按请求上下文在主库和副本之间选择连接的会话"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False):
+            replica = _replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session_, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_dml(orm_execute_state):
+    # 直接执行的 INSERT/UPDATE/DELETE（如进度 upsert）同样算写入
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        if has_request_context():
+            g.db_wrote = True
+
+
+def in_read_your_writes_window():
+    """当前用户最近是否写过数据（仍在读自己写窗口内）"""
+    window = current_app.config.get('READ_YOUR_WRITES_SECONDS', 0)
+    last_write = session.get(LAST_WRITE_KEY)
+    return bool(last_write) and time.time() - last_write < window
+
+
+def init_read_replicas(app):
+    """在 create_app 中调用：为 SQLALCHEMY_REPLICA_URIS 创建副本引擎"""
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return
+
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    engines = []
+    for uri in uris:
+        engine = create_engine(uri, **options)
+        if pragmas and engine.dialect.name == 'sqlite':
+            apply_sqlite_pragmas(engine, pragmas)
+        engines.append(engine)
+    app.extensions['db_replicas'] = engines
+
+    @app.before_request
+    def reset_routing_flags():
+        g.use_replica = False
+        g.db_wrote = False
+
+    @app.after_request
+    def remember_last_write(response):
+        # 记录写入时间，供读自己写窗口使用
+        if g.get('db_wrote'):
+            session[LAST_WRITE_KEY] = time.time()
+        return response
@@ -0,0 +1,130 @@
+"""
+请求级 SQL 统计与 N+1 检测
+
+挂在 SQLAlchemy Engine 的 cursor 事件上，记录每个请求执行的语句数、数据库总耗时，
+以及按“指纹”（去掉参数后的语句）分组的执行次数。同一指纹在一次请求中执行超过
+SQL_REPEAT_THRESHOLD 次时记录警告，通常意味着循环里在查询（N+1）。
+
+语句数和总耗时只是两次计时和加法，开启了 METRICS_ENABLED 或 SQL_INSTRUMENTATION 时
+每个请求都统计（/admin/metrics 的数据库指标依赖它）；计算指纹和记录时间线开销较大，
+只在 SQL_INSTRUMENTATION 开启（默认只在开发和测试环境）或按需性能分析的请求中进行。
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*%\(\w+\)s\s*,)+\s*%\(\w+\)s\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACES = re.compile(r'\s+')
+
+MAX_TIMELINE = 500  # 每个请求的时间线最多保留的语句数（计数和指纹不受限制）
+
+
+def fingerprint(statement):
+    """语句指纹：合并空白、字面量和 IN 列表，使同一类查询得到相同的指纹"""
+    statement = _SPACES.sub(' ', statement).strip()
+    statement = _IN_LIST.sub('(?)', statement)
+    return _LITERAL.sub('?', statement)
+
+
+class RequestSqlStats:
+    """一次请求中的 SQL 统计"""
+
+    def __init__(self, detailed=True):
+        self.count = 0
+        self.total_time = 0.0
+        self.detailed = detailed  # 为假时只统计语句数和总耗时
+        self.fingerprints = Counter()
+        self.timeline = []  # [(相对请求开始的秒数, 耗时, 语句)]，最多 MAX_TIMELINE 条
+        self.started = time.perf_counter()
+
+    def record(self, statement, started, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        if not self.detailed:
+            return
+        self.fingerprints[fingerprint(statement)] += 1
+        if len(self.timeline) < MAX_TIMELINE:
+            self.timeline.append((started - self.started, elapsed, statement))
+
+    def repeated(self, threshold):
+        """执行次数超过 threshold 的指纹 [(指纹, 次数)]"""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n > threshold]
+
+
+def current_stats():
+    """当前请求的统计，不在请求中或未启用时返回 None"""
+    if not has_request_context():
+        return None
+    return g.get('sql_stats')
+
+
+# 开始时间记在本次执行的 context 上：语句出错时没有 after_cursor_execute，
+# 记在连接上会留下残留，使同一连接之后的语句耗时全部算错
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._sql_stats_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_sql_stats_start', None)
+    stats = current_stats()
+    if started is not None and stats is not None:
+        stats.record(statement, started, time.perf_counter() - started)
+
+
+def init_sql_stats(app):
+    """
+    在 create_app 中调用：按请求统计 SQL
+
+    SQL_INSTRUMENTATION 为真时记录指纹和时间线并检测 N+1；否则只在有 sql_stats_listeners
+    （指标、capture_sql_stats）时统计语句数和总耗时。是否统计在每个请求开始时判断，
+    应用创建之后再调用 capture_sql_stats（如压测）也能收集到。
+    """
+    detailed = bool(app.config.get('SQL_INSTRUMENTATION'))
+    listeners = app.extensions.setdefault('sql_stats_listeners', [])
+
+    @app.before_request
+    def start_sql_stats():
+        if detailed or listeners:
+            g.sql_stats = RequestSqlStats(detailed=detailed)
+
+    @app.after_request
+    def report_sql_stats(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+
+        endpoint = request.endpoint or request.path
+        threshold = app.config.get('SQL_REPEAT_THRESHOLD', 10)
+        for fp, n in stats.repeated(threshold):
+            app.logger.warning('可能的 N+1 查询: %s 中同一语句执行了 %d 次: %s', endpoint, n, fp[:200])
+        app.logger.debug('SQL 统计: %s 语句 %d 条, 耗时 %.1fms',
+                         endpoint, stats.count, stats.total_time * 1000)
+
+        for listener in listeners:
+            listener(endpoint, stats)
+        return response
+
+
+@contextmanager
+def capture_sql_stats(app):
+    """在 with 块内收集每个请求的 (endpoint, RequestSqlStats)，供测试使用"""
+    captured = []
+    listeners = app.extensions.setdefault('sql_stats_listeners', [])
+
+    def listener(endpoint, stats):
+        captured.append((endpoint, stats))
+
+    listeners.append(listener)
+    try:
+        yield captured
+    finally:
+        listeners.remove(listener)
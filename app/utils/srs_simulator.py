@@ -0,0 +1,420 @@
+"""
+SRS 调度离线模拟器
+
+在修改 calculate_next_review_minutes 的间隔之前，用它估算每日复习量、单个用户的负担
+分位数和预测记忆保持率，从而提前评估数据库写入量和工作进程数。
+
+- 学员群体可以来自合成参数（synthetic_population），也可以由 QuizAttempt 历史重建
+  （population_from_attempts）：按 (用户, 词汇) 重放作答记录得到熟悉度、复习次数、
+  上次复习时间，以及每个用户的正确率和活跃度
+- 所有用户的所有卡片放在同一组 NumPy 数组里，每个学习时段对全体卡片做一次向量运算
+- 调度规则与线上一致：答对熟悉度 +1（最高 5），答错重置为 1；熟悉度 < 3 时按重学间隔，
+  否则按新的复习次数查间隔表；每个时段最多 session_size 个词，先复习到期词再补新词
+- 记忆模型：回忆概率 = 用户正确率 × exp(-间隔天数 / 稳定度)；答对后稳定度按间隔长短
+  增长，答错时回落
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import QuizAttempt
+from app.utils.srs import calculate_next_review_minutes
+
+MINUTES_PER_DAY = 1440.0
+MAX_FAMILIARITY = 5
+
+
+class SchedulingPolicy:
+    """复习间隔策略"""
+
+    def __init__(self, intervals_minutes, relearn_minutes=10, pass_level=3):
+        """
+        Args:
+            intervals_minutes: 按复习次数（0, 1, 2, ...）的间隔分钟数，超出部分使用最后一项
+            relearn_minutes: 熟悉度低于 pass_level 时的重学间隔
+            pass_level: 进入间隔递增阶段的最低熟悉度
+        """
+        self.intervals = np.asarray(intervals_minutes, dtype=np.float64) / MINUTES_PER_DAY
+        self.relearn = relearn_minutes / MINUTES_PER_DAY
+        self.pass_level = pass_level
+
+    @classmethod
+    def current(cls):
+        """线上 calculate_next_review_minutes 使用的策略"""
+        return cls([calculate_next_review_minutes(3, n) for n in range(8)],
+                   relearn_minutes=calculate_next_review_minutes(0, 0))
+
+    @classmethod
+    def from_days(cls, days, relearn_minutes=10):
+        """由以天为单位的间隔列表创建（命令行参数使用）"""
+        return cls([d * MINUTES_PER_DAY for d in days], relearn_minutes=relearn_minutes)
+
+    def interval_days(self, familiarity, review_count):
+        """向量化的下次复习间隔（天）"""
+        index = np.minimum(review_count, len(self.intervals) - 1)
+        return np.where(familiarity < self.pass_level, self.relearn, self.intervals[index])
+
+    def to_dict(self):
+        return {
+            'intervals_days': [round(float(d), 4) for d in self.intervals],
+            'relearn_minutes': round(self.relearn * MINUTES_PER_DAY, 2),
+            'pass_level': self.pass_level,
+        }
+
+
+class RetentionModel:
+    """指数遗忘模型参数"""
+
+    def __init__(self, initial_stability=5.0, growth=2.5, lapse_stability=2.0, first_recall=0.7):
+        self.initial_stability = initial_stability  # 首次学习答对后的稳定度（天）
+        self.growth = growth                        # 间隔足够长时答对的稳定度倍数
+        self.lapse_stability = lapse_stability      # 答错后的稳定度（天）
+        self.first_recall = first_recall            # 新词第一次出现时答对的概率系数
+
+    def recall(self, skill, elapsed, stability):
+        return skill * np.exp(-np.maximum(elapsed, 0.0) / stability)
+
+    def update(self, stability, elapsed, success, first):
+        # 间隔越接近稳定度，答对带来的增长越多；短时间内重复答对几乎不增长
+        spacing = np.minimum(1.0, np.maximum(elapsed, 0.0) / stability)
+        grown = stability * (1.0 + (self.growth - 1.0) * spacing)
+        grown = np.where(first, self.initial_stability, grown)
+        return np.where(success, grown, self.lapse_stability)
+
+
+class Population:
+    """
+    模拟的学员群体
+
+    卡片数组（按卡片索引）: user, familiarity, review_count, due, last, stability
+    用户数组（按用户索引）: skill（正确率）, active_prob（每个时段学习的概率）, remaining（未学新词数）
+    时间单位为天，0 表示模拟开始的时刻
+    """
+
+    def __init__(self, skill, active_prob, remaining, cards=None):
+        self.skill = np.asarray(skill, dtype=np.float64)
+        self.active_prob = np.asarray(active_prob, dtype=np.float64)
+        self.remaining = np.asarray(remaining, dtype=np.int64)
+        self.size = 0
+        self._capacity = 0
+        self.user = np.empty(0, dtype=np.int64)
+        self.familiarity = np.empty(0, dtype=np.int8)
+        self.review_count = np.empty(0, dtype=np.int32)
+        self.due = np.empty(0, dtype=np.float64)
+        self.last = np.empty(0, dtype=np.float64)
+        self.stability = np.empty(0, dtype=np.float64)
+        if cards is not None:
+            start = self.append(len(cards['user']))
+            for name, values in cards.items():
+                getattr(self, name)[start:self.size] = values
+
+    @property
+    def users(self):
+        return len(self.skill)
+
+    def append(self, n):
+        """追加 n 张新卡片（容量按倍数扩展），返回第一张的索引"""
+        start = self.size
+        if start + n > self._capacity:
+            capacity = max(1024, start + n, self._capacity * 2)
+            for name in ('user', 'familiarity', 'review_count', 'due', 'last', 'stability'):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[:start] = old[:start]
+                setattr(self, name, new)
+            self._capacity = capacity
+        self.size = start + n
+        return start
+
+
+def synthetic_population(users, vocab_size, seed=0):
+    """合成学员：正确率和活跃度按 Beta 分布抽取，从零开始学习"""
+    rng = np.random.default_rng(seed)
+    return Population(
+        skill=rng.beta(8, 2, users),
+        active_prob=rng.beta(2, 2, users),
+        remaining=np.full(users, vocab_size, dtype=np.int64),
+    )
+
+
+def population_from_attempts(user_ids, vocab_ids, is_correct, times, vocab_size, model=None):
+    """
+    由作答记录重建学员群体
+
+    Args:
+        user_ids, vocab_ids, is_correct: 每条 QuizAttempt 的列（NumPy 数组）
+        times: 作答时间（距模拟开始的天数，历史记录为负数）
+        vocab_size: 可学习的词汇总数
+        model: RetentionModel，用于估算稳定度
+
+    Returns:
+        (Population, 外部用户 ID 数组)
+    """
+    model = model or RetentionModel()
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    if len(user_ids) == 0:
+        return Population([], [], []), user_ids
+    external_users, user_index = np.unique(user_ids, return_inverse=True)
+    vocab_ids = np.asarray(vocab_ids, dtype=np.int64)
+    correct = np.asarray(is_correct, dtype=bool)
+    times = np.asarray(times, dtype=np.float64)
+
+    # 按 (用户, 词汇, 时间) 排序后每个 (用户, 词汇) 是连续的一段
+    order = np.lexsort((times, vocab_ids, user_index))
+    pair_user, pair_vocab = user_index[order], vocab_ids[order]
+    correct, times = correct[order], times[order]
+    boundary = np.ones(len(order), dtype=bool)
+    boundary[1:] = (pair_user[1:] != pair_user[:-1]) | (pair_vocab[1:] != pair_vocab[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(order))
+
+    # 末尾连续答对的次数决定当前熟悉度：最后一次答错后熟悉度为 1，之后每答对一次 +1
+    positions = np.arange(len(order))
+    last_wrong = np.maximum.accumulate(np.where(correct, -1, positions))[ends - 1]
+    had_wrong = last_wrong >= starts
+    streak = np.where(had_wrong, ends - 1 - last_wrong, ends - starts)
+    familiarity = np.minimum(MAX_FAMILIARITY, np.where(had_wrong, 1, 0) + streak)
+    review_count = ends - starts
+    last = times[ends - 1]
+    stability = np.where(streak > 0,
+                         model.initial_stability * model.growth ** np.minimum(streak - 1, 10),
+                         model.lapse_stability)
+
+    policy = SchedulingPolicy.current()
+    cards = {
+        'user': pair_user[starts],
+        'familiarity': familiarity,
+        'review_count': review_count,
+        'due': last + policy.interval_days(familiarity, review_count),
+        'last': last,
+        'stability': stability,
+    }
+
+    # 用户正确率与活跃度（有作答的天数 / 首次作答至今的天数）
+    users = len(external_users)
+    attempts = np.bincount(user_index, minlength=users)
+    skill = np.clip(np.bincount(pair_user, weights=correct, minlength=users) / attempts, 0.3, 0.99)
+    day = np.floor(times).astype(np.int64)
+    day_keys = np.unique(pair_user * 100000 + (day - day.min()))
+    active_days = np.bincount(day_keys // 100000, minlength=users)
+    first_seen = np.full(users, np.inf)
+    np.minimum.at(first_seen, pair_user, times)
+    span = np.maximum(1.0, np.ceil(-first_seen))
+    active_prob = np.clip(active_days / span, 0.05, 1.0)
+
+    learned = np.bincount(cards['user'], minlength=users)
+    remaining = np.maximum(0, vocab_size - learned)
+    return Population(skill, active_prob, remaining, cards), external_users
+
+
+class SimulationResult:
+    """模拟结果"""
+
+    def __init__(self, days):
+        self.due = np.zeros(days, dtype=np.int64)           # 每天开始时到期（含逾期）的卡片数
+        self.reviews = np.zeros(days, dtype=np.int64)       # 每天的作答次数（含新词）
+        self.new = np.zeros(days, dtype=np.int64)           # 每天新学的词数
+        self.correct = np.zeros(days, dtype=np.int64)
+        self.retention = np.zeros(days, dtype=np.float64)   # 每天结束时已学词汇的平均回忆概率
+        self.active_users = np.zeros(days, dtype=np.int64)
+        self.workload = np.zeros(1, dtype=np.int64)         # 活跃用户每日作答数的直方图
+
+    def add_workload(self, per_user):
+        counts = np.bincount(per_user[per_user > 0])
+        if len(counts) > len(self.workload):
+            counts[:len(self.workload)] += self.workload
+            self.workload = counts
+        else:
+            self.workload[:len(counts)] += counts
+
+    def workload_percentile(self, p):
+        """活跃用户单日作答数的分位数"""
+        total = self.workload.sum()
+        if not total:
+            return 0
+        return int(np.searchsorted(np.cumsum(self.workload), np.ceil(p / 100 * total)))
+
+    def to_dict(self):
+        days = len(self.reviews)
+        return {
+            'summary': {
+                'days': days,
+                'total_reviews': int(self.reviews.sum()),
+                'mean_daily_reviews': round(float(self.reviews.mean()), 1) if days else 0.0,
+                'peak_daily_reviews': int(self.reviews.max()) if days else 0,
+                'peak_daily_due': int(self.due.max()) if days else 0,
+                'user_daily_reviews_p50': self.workload_percentile(50),
+                'user_daily_reviews_p95': self.workload_percentile(95),
+                'user_daily_reviews_p99': self.workload_percentile(99),
+                'final_retention': round(float(self.retention[-1]), 4) if days else 0.0,
+                'success_rate': round(float(self.correct.sum() / max(1, self.reviews.sum())), 4),
+                # 每次作答写入一条 QuizAttempt 并更新一条进度记录
+                'quiz_attempt_rows_added': int(self.reviews.sum()),
+            },
+            'daily': [{
+                'day': day,
+                'due': int(self.due[day]),
+                'reviews': int(self.reviews[day]),
+                'new': int(self.new[day]),
+                'active_users': int(self.active_users[day]),
+                'retention': round(float(self.retention[day]), 4),
+            } for day in range(days)],
+        }
+
+
+def _rank_within_user(users, keys):
+    """按 (用户, keys) 排序后每张卡片在所属用户内的名次"""
+    order = np.lexsort((keys, users))
+    sorted_users = users[order]
+    group_start = np.ones(len(order), dtype=bool)
+    group_start[1:] = sorted_users[1:] != sorted_users[:-1]
+    first = np.maximum.accumulate(np.where(group_start, np.arange(len(order)), 0))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - first
+    return rank
+
+
+def _answer(pop, idx, now, policy, model, rng):
+    """对 idx 中的卡片作答一次并更新状态，返回答对的数量"""
+    user = pop.user[idx]
+    first = pop.review_count[idx] == 0
+    elapsed = now - pop.last[idx]
+    recall = np.where(first, pop.skill[user] * model.first_recall,
+                      model.recall(pop.skill[user], elapsed, pop.stability[idx]))
+    success = rng.random(len(idx)) < recall
+
+    familiarity = np.where(success, np.minimum(pop.familiarity[idx] + 1, MAX_FAMILIARITY), 1)
+    review_count = pop.review_count[idx] + 1
+    pop.stability[idx] = model.update(pop.stability[idx], elapsed, success, first)
+    pop.familiarity[idx] = familiarity
+    pop.review_count[idx] = review_count
+    pop.last[idx] = now
+    pop.due[idx] = now + policy.interval_days(familiarity, review_count)
+    return int(success.sum())
+
+
+def simulate(pop, policy, days, sessions_per_day=1, session_size=20, max_new_per_session=None,
+             model=None, seed=0):
+    """
+    按给定策略模拟 days 天
+
+    Args:
+        pop: Population（会被原地修改）
+        policy: SchedulingPolicy
+        days: 模拟天数
+        sessions_per_day: 每天的学习时段数（每个时段用户按 active_prob 决定是否学习）
+        session_size: 每个时段最多的词数（对应 learning.MAX_SESSION_WORDS）
+        max_new_per_session: 每个时段最多新词数，None 表示像线上一样补满
+        model: RetentionModel
+        seed: 随机种子
+
+    Returns:
+        SimulationResult
+    """
+    model = model or RetentionModel()
+    rng = np.random.default_rng(seed)
+    result = SimulationResult(days)
+    users = pop.users
+
+    for day in range(days):
+        per_user = np.zeros(users, dtype=np.int64)
+        day_active = np.zeros(users, dtype=bool)
+        for session in range(sessions_per_day):
+            now = day + (session + 0.5) / sessions_per_day
+            active = rng.random(users) < pop.active_prob
+            day_active |= active
+
+            n = pop.size
+            is_due = pop.due[:n] <= now
+            if session == 0:
+                result.due[day] = int(is_due.sum())
+
+            # 到期复习：每个活跃用户最早到期的 session_size 张
+            idx = np.flatnonzero(is_due & active[pop.user[:n]])
+            if len(idx):
+                idx = idx[_rank_within_user(pop.user[idx], pop.due[idx]) < session_size]
+                result.correct[day] += _answer(pop, idx, now, policy, model, rng)
+            reviewed = np.bincount(pop.user[idx], minlength=users)
+
+            # 剩余名额补新词
+            slots = np.where(active, session_size - reviewed, 0)
+            if max_new_per_session is not None:
+                slots = np.minimum(slots, max_new_per_session)
+            slots = np.minimum(np.maximum(slots, 0), pop.remaining)
+            total_new = int(slots.sum())
+            if total_new:
+                start = pop.append(total_new)
+                new_idx = np.arange(start, pop.size)
+                pop.user[new_idx] = np.repeat(np.arange(users), slots)
+                pop.familiarity[new_idx] = 0
+                pop.review_count[new_idx] = 0
+                pop.last[new_idx] = now
+                pop.stability[new_idx] = model.initial_stability
+                pop.remaining -= slots
+                result.correct[day] += _answer(pop, new_idx, now, policy, model, rng)
+
+            result.new[day] += total_new
+            result.reviews[day] += len(idx) + total_new
+            per_user += reviewed + slots
+
+        result.active_users[day] = int(day_active.sum())
+        result.add_workload(per_user)
+        n = pop.size
+        if n:
+            end = day + 1.0
+            recall = model.recall(pop.skill[pop.user[:n]], end - pop.last[:n], pop.stability[:n])
+            result.retention[day] = float(recall.mean())
+
+    return result
+
+
+def load_attempts(since_days=None, now=None, archive=None):
+    """
+    读取 QuizAttempt 作答记录为 NumPy 数组
+
+    Args:
+        since_days: 只读取最近多少天（None 表示全部）
+        now: 当前时间
+        archive: 答题归档目录（见 attempt_archive.py），给出时同时读取已归档的分区
+
+    Returns:
+        (user_ids, vocab_ids, is_correct, times)，times 为相对 now 的天数（负数）
+    """
+    now = now or datetime.utcnow()
+    since = now - timedelta(days=since_days) if since_days is not None else None
+    query = db.select(QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.vocabulary_id,
+                      QuizAttempt.is_correct, QuizAttempt.created_at)
+    if since is not None:
+        query = query.where(QuizAttempt.created_at >= since)
+
+    chunks = []
+    result = db.session.execute(query.execution_options(yield_per=100000))
+    for partition in result.partitions():
+        ids, users, vocabs, correct, created = zip(*partition)
+        chunks.append((
+            np.fromiter(ids, dtype=np.int64, count=len(ids)),
+            np.fromiter(users, dtype=np.int64, count=len(users)),
+            np.fromiter(vocabs, dtype=np.int64, count=len(vocabs)),
+            np.fromiter(correct, dtype=bool, count=len(correct)),
+            np.fromiter(((c - now).total_seconds() / 86400.0 for c in created),
+                        dtype=np.float64, count=len(created)),
+        ))
+
+    if archive is not None:
+        from app.utils.attempt_archive import read_archived
+        columns, _ = read_archived(archive, start=since.date() if since is not None else None,
+                                   columns=('id', 'user_id', 'vocabulary_id', 'is_correct', 'created_at'))
+        days = (columns['created_at'] - np.datetime64(now, 's')).astype(np.float64) / 86400.0
+        keep = days >= (since - now).total_seconds() / 86400.0 if since is not None else np.ones(len(days), bool)
+        if chunks:
+            # 归档后尚未删除的行在线表中也有，以在线表为准
+            keep &= ~np.isin(columns['id'], np.concatenate([c[0] for c in chunks]))
+        chunks.append((columns['id'][keep], columns['user_id'][keep].astype(np.int64),
+                       columns['vocabulary_id'][keep].astype(np.int64), columns['is_correct'][keep],
+                       days[keep]))
+
+    if not chunks:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty.astype(bool), empty
+    return tuple(np.concatenate(column) for column in zip(*chunks))[1:]
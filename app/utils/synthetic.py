@@ -0,0 +1,219 @@
+"""
+合成压测数据
+
+按给定规模生成可复现的数据集：词汇、用户、词汇进度（UserVocabulary）、答题记录
+（QuizAttempt）和对话进度。同一个 seed 和 now 总是生成完全相同的数据；每个用户使用
+独立的随机数生成器，因此增大用户数时已有用户的数据不变。
+
+所有数据通过 executemany 批量写入，每 BATCH_SIZE 行提交一次。分批提交无法整体回滚，
+所以写入前先检查是否已有同一前缀的用户，不会在已有数据集上写入一半后失败。写完后
+从答题记录和对话进度重建活跃用户草图，统计页的日活/周活包含合成数据。
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import (Vocabulary, User, UserVocabulary, QuizAttempt,
+                        Conversation, UserConversation)
+from app.utils.activity import rebuild_sketches
+from app.utils.password_pool import hash_method
+from app.utils.srs import calculate_next_review_date
+
+BATCH_SIZE = 10000
+
+CATEGORIES = ['日常用语', '数字', '食物饮料', '交通出行', '购物', '时间日期', '家庭', '身体健康']
+QUIZ_TYPES = ['flashcard', 'multiple_choice', 'true_false']
+CONVERSATION_MODES = ['fill_blank', 'order', 'role_play']
+
+# 合成用户的统一密码（只计算一次哈希）
+SYNTHETIC_PASSWORD = 'loadtest'
+
+
+class SyntheticSpec:
+    """数据集规模"""
+
+    def __init__(self, users=1000, vocab=2000, words_per_user=200, attempts_per_user=500,
+                 conversations_per_user=5, days=180, seed=42, prefix='load_', now=None):
+        self.users = users
+        self.vocab = vocab
+        self.words_per_user = words_per_user
+        self.attempts_per_user = attempts_per_user
+        self.conversations_per_user = conversations_per_user
+        self.days = days
+        self.seed = seed
+        self.prefix = prefix
+        # 默认以当天零点为基准，同一天内重复生成结果一致
+        self.now = now or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bulk_insert(table, rows, on_batch=None):
+    """按批 executemany 写入，返回写入行数"""
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return total
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+        if on_batch is not None:
+            on_batch(table.name, total)
+
+
+def _thai_word(rng):
+    return ''.join(chr(rng.randint(0x0E01, 0x0E2E)) for _ in range(rng.randint(2, 6)))
+
+
+def _vocab_rows(spec, rank_offset):
+    rng = random.Random(f'{spec.seed}:vocab')
+    for i in range(spec.vocab):
+        rank = rank_offset + i + 1
+        yield {
+            'thai_word': _thai_word(rng),
+            'chinese_meaning': f'{spec.prefix}词{i}',
+            'pronunciation': f'syn-{i}',
+            'category': rng.choice(CATEGORIES),
+            # 越常用的词越简单
+            'difficulty_level': min(5, 1 + i * 5 // max(spec.vocab, 1)),
+            'frequency_rank': rank,
+            'created_at': spec.now - timedelta(days=spec.days),
+            'is_active': True,
+        }
+
+
+def _user_rows(spec):
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD, method=hash_method())
+    rng = random.Random(f'{spec.seed}:users')
+    for i in range(spec.users):
+        yield {
+            'username': f'{spec.prefix}{i:07d}',
+            'email': f'{spec.prefix}{i}@load.test',
+            'password_hash': password_hash,
+            'is_admin': False,
+            'is_active': True,
+            'created_at': spec.now - timedelta(days=rng.uniform(0, spec.days)),
+            'last_login': spec.now - timedelta(days=rng.expovariate(1 / 7)),
+        }
+
+
+def _user_rng(spec, index, kind):
+    return random.Random(f'{spec.seed}:{kind}:{index}')
+
+
+def _words_learned(spec, rng, vocab_count):
+    # 学习量呈长尾分布：少数用户学得很多
+    return min(vocab_count, max(1, int(rng.expovariate(1 / spec.words_per_user))))
+
+
+def _progress_rows(spec, user_ids, vocab_ids):
+    """词汇进度：按词频顺序学习，熟悉度越高复习间隔越长，部分记录已逾期"""
+    for index, user_id in enumerate(user_ids):
+        rng = _user_rng(spec, index, 'progress')
+        for vocab_id in vocab_ids[:_words_learned(spec, rng, len(vocab_ids))]:
+            familiarity = rng.choices(range(6), weights=(5, 10, 15, 25, 25, 20))[0]
+            review_count = rng.randint(1, 12) if familiarity else rng.randint(0, 2)
+            last_reviewed = spec.now - timedelta(days=rng.expovariate(1 / 10), minutes=rng.randint(0, 1439))
+            correct = rng.randint(0, review_count)
+            yield {
+                'user_id': user_id,
+                'vocabulary_id': vocab_id,
+                'familiarity_level': familiarity,
+                'next_review_date': calculate_next_review_date(familiarity, review_count - 1, last_reviewed),
+                'review_count': review_count,
+                'correct_count': correct,
+                'last_reviewed': last_reviewed if review_count else None,
+                'created_at': last_reviewed - timedelta(days=rng.randint(0, spec.days)),
+            }
+
+
+def _attempt_rows(spec, user_ids, vocab_ids):
+    """答题记录：每个用户的答题量长尾分布，时间分布在最近 days 天内"""
+    for index, user_id in enumerate(user_ids):
+        rng = _user_rng(spec, index, 'attempts')
+        # 与 _progress_rows 使用同一个生成器的第一个值，保证答题的词汇都已学过
+        learned = vocab_ids[:_words_learned(spec, _user_rng(spec, index, 'progress'), len(vocab_ids))]
+        if not learned:
+            continue
+        skill = rng.uniform(0.55, 0.95)
+        count = int(rng.expovariate(1 / spec.attempts_per_user)) if spec.attempts_per_user else 0
+        for _ in range(count):
+            yield {
+                'user_id': user_id,
+                'vocabulary_id': rng.choice(learned),
+                'quiz_type': rng.choice(QUIZ_TYPES),
+                'is_correct': rng.random() < skill,
+                'time_taken': max(1, int(rng.lognormvariate(1.5, 0.6))),
+                'created_at': spec.now - timedelta(seconds=rng.randint(0, spec.days * 86400)),
+            }
+
+
+def _conversation_rows(spec, user_ids, conversation_ids):
+    for index, user_id in enumerate(user_ids):
+        rng = _user_rng(spec, index, 'conversations')
+        k = min(len(conversation_ids), rng.randint(0, spec.conversations_per_user * 2))
+        for conversation_id in rng.sample(conversation_ids, k):
+            modes = rng.sample(CONVERSATION_MODES, rng.randint(1, len(CONVERSATION_MODES)))
+            last_practiced = spec.now - timedelta(days=rng.expovariate(1 / 14))
+            yield {
+                'user_id': user_id,
+                'conversation_id': conversation_id,
+                'familiarity_level': rng.randint(0, 5),
+                'completed_modes': json.dumps(modes),
+                'practice_count': rng.randint(len(modes), 20),
+                'last_practiced': last_practiced,
+                'created_at': last_practiced - timedelta(days=rng.randint(0, 30)),
+            }
+
+
+def generate(spec, on_batch=None):
+    """
+    生成合成数据集
+
+    Args:
+        spec: SyntheticSpec
+        on_batch: 每批提交后调用 on_batch(表名, 该表已写入行数)
+
+    Returns:
+        dict: 表名 -> 写入行数
+
+    Raises:
+        ValueError: 已存在前缀为 spec.prefix 的用户
+    """
+    existing = db.session.scalar(
+        db.select(User.id).where(User.username.startswith(spec.prefix, autoescape=True)).limit(1))
+    if existing is not None:
+        raise ValueError(f"已存在前缀为 '{spec.prefix}' 的用户，请换一个前缀")
+
+    counts = {}
+    rank_offset = db.session.scalar(db.select(db.func.max(Vocabulary.frequency_rank))) or 0
+    counts['vocabularies'] = _bulk_insert(Vocabulary.__table__, _vocab_rows(spec, rank_offset), on_batch)
+    counts['users'] = _bulk_insert(User.__table__, _user_rows(spec), on_batch)
+
+    user_ids = list(db.session.scalars(
+        db.select(User.id).where(User.username.startswith(spec.prefix, autoescape=True)).order_by(User.id)
+    ))
+    vocab_ids = list(db.session.scalars(
+        db.select(Vocabulary.id).where(Vocabulary.is_active == True)  # noqa: E712
+        .order_by(Vocabulary.frequency_rank, Vocabulary.id)
+    ))
+    conversation_ids = list(db.session.scalars(
+        db.select(Conversation.id).where(Conversation.is_active == True)  # noqa: E712
+        .order_by(Conversation.id)
+    ))
+
+    counts['user_vocabularies'] = _bulk_insert(
+        UserVocabulary.__table__, _progress_rows(spec, user_ids, vocab_ids), on_batch)
+    counts['quiz_attempts'] = _bulk_insert(
+        QuizAttempt.__table__, _attempt_rows(spec, user_ids, vocab_ids), on_batch)
+    counts['user_conversations'] = _bulk_insert(
+        UserConversation.__table__, _conversation_rows(spec, user_ids, conversation_ids), on_batch)
+
+    # 批量写入绕过了答题时的草图更新，按合成数据覆盖的天数重建
+    report = rebuild_sketches(days=spec.days + 1, now=spec.now)
+    counts['activity_sketches'] = sum(len(days) for days in report.values())
+    return counts
@@ -0,0 +1,111 @@
+"""
+词汇批量操作
+
+目标词汇由 ID 列表或与词汇列表页相同的筛选条件指定，每个操作只执行一条
+UPDATE/DELETE 语句，调用方在提交后刷新一次内容包（词汇目录和干扰项随之重建）。
+"""
+from app import db
+from app.models import Vocabulary, UserVocabulary, QuizAttempt
+
+MAX_BULK_IDS = 10000
+BULK_ACTIONS = ('activate', 'deactivate', 'set_category', 'set_difficulty', 'delete_unused')
+
+
+class BulkError(ValueError):
+    """批量操作参数无效"""
+
+
+def vocabulary_conditions(search='', category='', difficulty='', status=''):
+    """词汇列表页筛选条件对应的 WHERE 子句列表"""
+    conditions = []
+    if search:
+        conditions.append(db.or_(
+            Vocabulary.thai_word.contains(search),
+            Vocabulary.chinese_meaning.contains(search)
+        ))
+    if category:
+        conditions.append(Vocabulary.category == category)
+    if difficulty:
+        conditions.append(Vocabulary.difficulty_level == int(difficulty))
+    if status == 'active':
+        conditions.append(Vocabulary.is_active == True)  # noqa: E712
+    elif status == 'inactive':
+        conditions.append(Vocabulary.is_active == False)  # noqa: E712
+    return conditions
+
+
+def target_conditions(ids=None, filters=None):
+    """
+    把 ID 列表或筛选条件转换为 WHERE 子句
+
+    Args:
+        ids: 词汇 ID 列表
+        filters: {'search', 'category', 'difficulty', 'status'}，至少需要一个非空条件
+    """
+    if ids:
+        try:
+            ids = sorted({int(i) for i in ids})
+        except (TypeError, ValueError):
+            raise BulkError('ids 应为词汇 ID 列表')
+        if len(ids) > MAX_BULK_IDS:
+            raise BulkError(f'一次最多指定 {MAX_BULK_IDS} 个 ID，更多请使用筛选条件')
+        return [Vocabulary.id.in_(ids)]
+
+    filters = {k: str(v).strip() for k, v in (filters or {}).items()
+               if k in ('search', 'category', 'difficulty', 'status') and v is not None}
+    try:
+        conditions = vocabulary_conditions(**filters)
+    except ValueError:
+        raise BulkError('difficulty 应为 1-5')
+    if not conditions:
+        raise BulkError('请指定词汇 ID 或至少一个筛选条件')
+    return conditions
+
+
+def _values(action, value):
+    if action == 'activate':
+        return {'is_active': True}
+    if action == 'deactivate':
+        return {'is_active': False}
+    if action == 'set_category':
+        category = str(value or '').strip()
+        if not category or len(category) > 50:
+            raise BulkError('分类不能为空且不超过 50 个字符')
+        return {'category': category}
+    try:
+        level = int(value)
+    except (TypeError, ValueError):
+        level = 0
+    if not 1 <= level <= 5:
+        raise BulkError('难度应为 1-5')
+    return {'difficulty_level': level}
+
+
+def bulk_update_vocabulary(action, conditions, value=None):
+    """
+    执行批量操作（不提交）
+
+    Returns:
+        dict: matched（符合条件的词汇数）、affected（实际修改/删除的行数）
+    """
+    if action not in BULK_ACTIONS:
+        raise BulkError(f'未知操作: {action}')
+
+    matched = db.session.scalar(db.select(db.func.count()).select_from(Vocabulary).where(*conditions))
+    if action == 'delete_unused':
+        # 只删除没有任何学习进度和答题记录的词汇
+        statement = db.delete(Vocabulary).where(
+            *conditions,
+            ~db.exists().where(UserVocabulary.vocabulary_id == Vocabulary.id),
+            ~db.exists().where(QuizAttempt.vocabulary_id == Vocabulary.id),
+        )
+    else:
+        values = _values(action, value)
+        # 已经是目标值的行不重复写入
+        statement = db.update(Vocabulary).where(
+            *conditions,
+            db.or_(*[getattr(Vocabulary, name) != v for name, v in values.items()],
+                   *[getattr(Vocabulary, name).is_(None) for name in values]),
+        ).values(values)
+    result = db.session.execute(statement.execution_options(synchronize_session=False))
+    return {'matched': matched, 'affected': result.rowcount}
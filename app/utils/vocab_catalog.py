@@ -0,0 +1,171 @@
+"""
+共享词汇目录
+
+直接建立在预编译内容包的词汇分区之上：id、难度、分类编码、词频排名都是
+mmap 中的 int32 列，字符串通过偏移表指向字符串堆。所有工作进程映射同一个文件，
+目录只占一份页缓存，进程内只保存几个 memoryview，不复制数据。
+"""
+import random
+from bisect import bisect_left
+
+from app.utils.content_bundle import get_content_bundle
+from app.utils.learned_sets import IdBitmap
+from app.utils.question_bank import sample_question
+
+# 当前进程的 (内容包, 目录)；内容包重新映射后自动重建
+_current = (None, None)
+
+
+class VocabCatalog:
+    """只读词汇目录（列式）"""
+
+    def __init__(self, bundle):
+        self._vocab = bundle['vocabularies']
+        self._by_category = bundle['vocab_by_category'].column('row')
+        self._by_difficulty = bundle['vocab_by_difficulty'].column('row')
+        self._difficulty_keys = bundle['vocab_by_difficulty'].column('difficulty')
+        self.ids = self._vocab.column('id')
+        self.difficulty = self._vocab.column('difficulty_level')
+        self.category_codes = self._vocab.column('category_code')
+        self.frequency_rank = self._vocab.column('frequency_rank')
+        self.categories = [name for name, _, _ in bundle.categories]
+        self._category_ranges = [(start, end) for _, start, end in bundle.categories]
+        self._category_index = {name: code for code, name in enumerate(self.categories)}
+        self._questions = bundle['vocab_questions']
+        self._pairings = bundle['vocab_pairings']
+        self._id_bitmap = None
+
+    @property
+    def id_bitmap(self):
+        """全部（启用的）词汇 id 的位图，首次使用时构建"""
+        if self._id_bitmap is None:
+            self._id_bitmap = IdBitmap(self.ids)
+        return self._id_bitmap
+
+    def __len__(self):
+        return len(self._vocab)
+
+    def category_code(self, category):
+        """分类名 -> 编码，不存在时返回 None"""
+        return self._category_index.get(category or '')
+
+    def row_of(self, vocab_id):
+        """词汇 id -> 行号，不存在（或已禁用）时返回 None"""
+        start, end = self._vocab.range_of('id', vocab_id)
+        return start if start < end else None
+
+    def meaning(self, row):
+        return self._vocab.value('chinese_meaning', row)
+
+    def to_dict(self, row):
+        """返回学习会话使用的词汇字典"""
+        return {
+            'id': self.ids[row],
+            'thai_word': self._vocab.value('thai_word', row),
+            'chinese_meaning': self._vocab.value('chinese_meaning', row),
+            'pronunciation': self._vocab.value('pronunciation', row),
+            'category': self._vocab.value('category', row),
+        }
+
+    def sample_distractors(self, correct_meaning, category=None, k=3, max_tries=50):
+        """
+        随机抽取 k 个干扰项释义：优先同分类，不足时从整个目录补充
+
+        Returns:
+            list: 互不相同且不等于正确答案的释义
+        """
+        return [self.meaning(row) for row in self.sample_distractor_rows(correct_meaning, category, k, max_tries)]
+
+    def sample_distractor_rows(self, correct_meaning, category=None, k=3, max_tries=50, exclude=()):
+        """
+        与 sample_distractors 相同，但返回行号
+
+        每次抽样都是对排列索引的随机下标访问，与目录大小无关。
+
+        Args:
+            exclude: 不能再使用的释义（如已经选中的近邻干扰项）
+        """
+        chosen = []
+        seen = {correct_meaning, *exclude}
+
+        def draw(start, end):
+            # 候选不多时打乱后遍历，否则在区间内随机下标抽样
+            if end - start <= max_tries:
+                candidates = [self._by_category[i] for i in range(start, end)]
+                random.shuffle(candidates)
+            else:
+                candidates = (self._by_category[random.randrange(start, end)] for _ in range(max_tries))
+            for row in candidates:
+                if len(chosen) >= k:
+                    break
+                meaning = self.meaning(row)
+                if meaning not in seen:
+                    seen.add(meaning)
+                    chosen.append(row)
+
+        code = self.category_code(category)
+        if code is not None:
+            draw(*self._category_ranges[code])
+        if len(chosen) < k:
+            draw(0, len(self))
+        return chosen
+
+    def question_rows(self, vocab_id):
+        """随机取一组预生成的干扰项（行号，可能不足 3 个）；词汇不在题库中时返回 None"""
+        values = sample_question(self._questions, vocab_id)
+        if values is None:
+            return None
+        rows = (self.row_of(value) for value in values if value is not None)
+        return [row for row in rows if row is not None]
+
+    def pairing_row(self, vocab_id):
+        """随机取一个预生成的判断题错误配对（行号），没有时返回 None"""
+        values = sample_question(self._pairings, vocab_id)
+        if not values or values[0] is None:
+            return None
+        return self.row_of(values[0])
+
+    def new_words(self, learned_ids, limit, target=None):
+        """
+        返回用户未学过的词汇行号
+
+        Args:
+            learned_ids: 用户已学过的词汇 id 集合（支持 in 判断即可）
+            limit: 最多返回数量
+            target: 目标难度（logit）；None 时按难度从低到高，否则从排列中最接近目标难度的
+                位置向两侧展开，依次取难度最接近的词
+        """
+        result = []
+        ids = self.ids
+        order = self._by_difficulty
+        if target is None:
+            for row in order:
+                if ids[row] not in learned_ids:
+                    result.append(row)
+                    if len(result) >= limit:
+                        break
+            return result
+
+        keys = self._difficulty_keys
+        target = round(target * 1000)
+        high = bisect_left(keys, target)
+        low = high - 1
+        while len(result) < limit and (low >= 0 or high < len(order)):
+            if high >= len(order) or (low >= 0 and target - keys[low] <= keys[high] - target):
+                row, low = order[low], low - 1
+            else:
+                row, high = order[high], high + 1
+            if ids[row] not in learned_ids:
+                result.append(row)
+        return result
+
+
+def get_vocab_catalog():
+    """返回当前内容包对应的词汇目录，未配置内容包时返回 None"""
+    bundle = get_content_bundle()
+    if bundle is None:
+        return None
+    global _current
+    if _current[0] is not bundle:
+        _current = (bundle, VocabCatalog(bundle))
+    return _current[1]
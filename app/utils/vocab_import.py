@@ -0,0 +1,346 @@
+"""
+词汇 CSV 导入
+
+按块流式读取 CSV（thai_word,chinese_meaning[,pronunciation,category,difficulty_level,
+audio_file,example_thai,example_chinese]），每块：
+1. 校验字段，去掉文件内重复的泰语词
+2. 一条 IN 查询排除数据库中已存在的词汇
+3. 一条 executemany INSERT 写入并提交
+
+管理后台上传的文件先写入磁盘，由 ImportWorker 的后台线程执行导入，进度写入
+import_jobs 表，任何工作进程都能查询。导入完成后刷新一次内容包。
+
+任务队列只在进程内存中，进程重启后由 recover_stale_jobs 接手表中遗留的任务：
+仍在排队且文件还在的重新入队，其余（文件丢失、运行超过 IMPORT_STALE_SECONDS
+仍未结束）标记为失败并删除上传文件。任务开始时用带状态条件的 UPDATE 认领，
+同一任务被多个进程入队也只会执行一次。
+"""
+import csv
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+
+from flask import current_app
+
+from app import db
+from app.models import Vocabulary, ImportJob
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_MESSAGES = 100  # 任务记录中保留的明细条数
+IMPORT_STALE_SECONDS = 3600  # 运行超过这个时间仍未结束的任务视为所在进程已退出
+
+
+class VocabImportResult:
+    """导入结果"""
+
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = 0
+        self.messages = []   # [(行号, 泰语词, 原因)]，最多 MAX_MESSAGES 条
+        self.elapsed = 0.0
+
+    def note(self, line_no, word, reason, error=False):
+        if error:
+            self.errors += 1
+        else:
+            self.skipped += 1
+        if len(self.messages) < MAX_MESSAGES:
+            self.messages.append((line_no, word, reason))
+
+
+def read_vocab_rows(f):
+    """从 CSV 文件对象逐行读取 (行号, 字段字典)"""
+    reader = csv.DictReader(f)
+    for line_no, row in enumerate(reader, start=2):
+        yield line_no, {k.strip(): (v or '').strip() for k, v in row.items() if k}
+
+
+def _parse(row):
+    """校验一行，返回 (插入用的字典, 错误原因)"""
+    thai_word, meaning = row.get('thai_word', ''), row.get('chinese_meaning', '')
+    if not thai_word or not meaning:
+        return None, '泰语或中文释义为空'
+    if len(thai_word) > 100 or len(meaning) > 200:
+        return None, '泰语或中文释义过长'
+    difficulty = row.get('difficulty_level') or '1'
+    if difficulty not in ('1', '2', '3', '4', '5'):
+        return None, f'难度应为 1-5: {difficulty}'
+    return {
+        'thai_word': thai_word,
+        'chinese_meaning': meaning,
+        'pronunciation': row.get('pronunciation', '')[:100],
+        'category': row.get('category', '')[:50],
+        'difficulty_level': int(difficulty),
+        'audio_file': row.get('audio_file', '')[:200],
+        'example_sentence_thai': row.get('example_thai', ''),
+        'example_sentence_chinese': row.get('example_chinese', ''),
+        'is_active': True,
+    }, None
+
+
+def import_vocabulary(rows, chunk_size=IMPORT_CHUNK_SIZE, on_chunk=None):
+    """
+    批量导入词汇（已存在的泰语词跳过）
+
+    Args:
+        rows: read_vocab_rows 产生的 (行号, 字段字典) 迭代器
+        chunk_size: 每批处理和提交的行数
+        on_chunk: 每批提交后调用 on_chunk(result)
+
+    Returns:
+        VocabImportResult
+    """
+    result = VocabImportResult()
+    started = time.perf_counter()
+    seen = set()
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        candidates = []
+        for line_no, row in chunk:
+            values, reason = _parse(row)
+            if reason:
+                result.note(line_no, row.get('thai_word', ''), reason, error=True)
+            elif values['thai_word'] in seen:
+                result.note(line_no, values['thai_word'], '文件内重复')
+            else:
+                seen.add(values['thai_word'])
+                candidates.append((line_no, values))
+
+        words = [values['thai_word'] for _, values in candidates]
+        existing = set(db.session.scalars(
+            db.select(Vocabulary.thai_word).where(Vocabulary.thai_word.in_(words)))) if words else set()
+        now = datetime.utcnow()
+        new_rows = []
+        for line_no, values in candidates:
+            if values['thai_word'] in existing:
+                result.note(line_no, values['thai_word'], '词汇已存在')
+            else:
+                new_rows.append({**values, 'created_at': now})
+        if new_rows:
+            db.session.execute(db.insert(Vocabulary), new_rows)
+        db.session.commit()
+
+        result.processed += len(chunk)
+        result.created += len(new_rows)
+        result.elapsed = time.perf_counter() - started
+        if on_chunk is not None:
+            on_chunk(result)
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+# ==================== 后台任务 ====================
+
+def import_folder(app):
+    folder = app.config.get('IMPORT_FOLDER') or os.path.join(app.instance_path, 'imports')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def job_path(app, job_id):
+    return os.path.join(import_folder(app), f'vocab-{job_id}.csv')
+
+
+def _save_progress(job, result):
+    job.processed = result.processed
+    job.created = result.created
+    job.skipped = result.skipped
+    job.errors = result.errors
+    job.messages = json.dumps(result.messages, ensure_ascii=False)
+    db.session.commit()
+
+
+def _remove_upload(app, job_id):
+    try:
+        os.remove(job_path(app, job_id))
+    except OSError:
+        pass
+
+
+def run_import_job(job_id):
+    """执行一个导入任务（需要应用上下文）"""
+    from app.utils.content_bundle import refresh_content_bundle
+
+    # 认领任务：只有把状态从 queued 改为 running 的那一次执行继续
+    claimed = db.session.execute(
+        db.update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.status == 'queued')
+        .values(status='running', started_at=datetime.utcnow()))
+    db.session.commit()
+    if claimed.rowcount != 1:
+        return
+    job = db.session.get(ImportJob, job_id)
+    path = job_path(current_app, job_id)
+
+    try:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            result = import_vocabulary(read_vocab_rows(f), on_chunk=lambda r: _save_progress(job, r))
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        _save_progress(job, result)
+    except Exception as e:  # 任务失败记录原因，已提交的块保留
+        logger.exception('词汇导入任务 %s 失败', job_id)
+        db.session.rollback()
+        job = db.session.get(ImportJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)[:500]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return
+    finally:
+        _remove_upload(current_app, job_id)
+
+    # 词汇已经导入并提交，刷新内容包失败只记录日志，不影响任务状态
+    if result.created:
+        try:
+            refresh_content_bundle()
+        except Exception:
+            logger.exception('词汇导入任务 %s 完成后刷新内容包失败', job_id)
+
+
+def recover_stale_jobs(app):
+    """
+    处理进程重启后表中遗留的任务（需要应用上下文）
+
+    排队中且上传文件还在的任务返回给调用方重新入队；文件已丢失的、运行超过
+    IMPORT_STALE_SECONDS 的任务标记为失败并删除上传文件（已提交的块保留，
+    重新上传同一文件时已导入的词汇会被跳过）。
+
+    Returns:
+        list: 需要重新入队的任务 id
+    """
+    stale_seconds = app.config.get('IMPORT_STALE_SECONDS', IMPORT_STALE_SECONDS)
+    now = datetime.utcnow()
+    requeue = []
+    jobs = ImportJob.query.filter(ImportJob.status.in_(('queued', 'running'))).order_by(ImportJob.id).all()
+    for job in jobs:
+        if job.status == 'queued':
+            if os.path.exists(job_path(app, job.id)):
+                requeue.append(job.id)
+                continue
+            job.error = '上传文件丢失，任务未执行'
+        elif job.started_at is not None and (now - job.started_at).total_seconds() < stale_seconds:
+            continue  # 可能仍在其他进程中运行
+        else:
+            job.error = '工作进程重启，任务中断（已导入的词汇保留，可重新上传）'
+        logger.warning('词汇导入任务 %s 已失效: %s', job.id, job.error)
+        job.status = 'failed'
+        job.finished_at = now
+        _remove_upload(app, job.id)
+    db.session.commit()
+    return requeue
+
+
+class ImportWorker:
+    """
+    后台导入线程
+
+    workers=0 时在提交的请求中同步执行（测试环境）。线程在首次提交或首次打开导入
+    页面（ensure_started）时启动，fork 出的子进程中会重新创建；启动时把 recover_stale_jobs
+    找到的遗留任务放回队列。不在 create_app 中启动：那时数据表可能还不存在，
+    而且预先 fork 的服务器会在 fork 前调用它。
+    """
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_threads(self):
+        """启动本进程的线程，返回重新入队的遗留任务 id（已启动时返回空列表）"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return []
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f'vocab-import-{i}', daemon=True).start()
+            with self.app.app_context():
+                try:
+                    requeue = recover_stale_jobs(self.app)
+                except Exception:
+                    logger.exception('恢复遗留的词汇导入任务失败')
+                    requeue = []
+                finally:
+                    db.session.remove()
+            for job_id in requeue:
+                self._queue.put(job_id)
+            return requeue
+
+    def ensure_started(self):
+        """导入页面和进度查询时调用：本进程第一次调用时启动线程并处理遗留任务（需要应用上下文）"""
+        if self.workers > 0:
+            self._ensure_threads()
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        for job_id in recover_stale_jobs(self.app):
+            run_import_job(job_id)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            with self.app.app_context():
+                try:
+                    run_import_job(job_id)
+                except Exception:
+                    logger.exception('词汇导入任务 %s 异常', job_id)
+                finally:
+                    db.session.remove()
+
+    def submit(self, job_id):
+        if self.workers <= 0:
+            run_import_job(job_id)
+            return
+        if job_id not in self._ensure_threads():
+            self._queue.put(job_id)
+
+
+def init_vocab_import(app):
+    """在 create_app 中调用"""
+    app.extensions['vocab_import'] = ImportWorker(app, app.config.get('VOCAB_IMPORT_WORKERS', 1))
+
+
+def queue_import(upload, user_id):
+    """
+    把上传的文件保存到磁盘并创建导入任务
+
+    Args:
+        upload: werkzeug FileStorage
+        user_id: 提交任务的管理员
+
+    Returns:
+        ImportJob
+    """
+    job = ImportJob(filename=(upload.filename or 'upload.csv')[:200], status='queued', created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+    try:
+        # 按块从上传流复制到磁盘，不在内存中读入整个文件
+        upload.save(job_path(current_app, job.id))
+    except OSError as e:
+        job.status = 'failed'
+        job.error = f'保存上传文件失败: {e}'
+        db.session.commit()
+        return job
+    current_app.extensions['vocab_import'].submit(job.id)
+    return job
@@ -0,0 +1,39 @@
+"""把超过保留期的答题记录写入按天分区的列式归档，并分批从数据库删除"""
+import argparse
+import os
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.utils.attempt_archive import archive_attempts, archive_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='归档历史答题记录')
+    parser.add_argument('--days', type=int, default=None,
+                        help='保留最近多少天的记录（默认 ATTEMPT_RETENTION_DAYS）')
+    parser.add_argument('--batch-size', type=int, default=5000, help='每批删除的行数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计要归档的行数')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+        days = args.days if args.days is not None else app.config['ATTEMPT_RETENTION_DAYS']
+        older_than = datetime.combine(datetime.utcnow().date() - timedelta(days=days), datetime.min.time())
+        root = archive_path(app)
+        print(f"归档 {older_than.date()} 之前的答题记录到 {root}")
+
+        archived = archive_attempts(root, older_than, batch_size=args.batch_size, dry_run=args.dry_run,
+                                    on_day=lambda day, count: print(f"  {day.isoformat()}  {count} 条"))
+
+    total = sum(archived.values())
+    if args.dry_run:
+        for day, count in archived.items():
+            print(f"  {day.isoformat()}  {count} 条")
+        print(f"\n共 {len(archived)} 天 {total} 条待归档（未写入）")
+    else:
+        print(f"\n✓ 已归档 {len(archived)} 天 {total} 条")
+
+
+if __name__ == '__main__':
+    main()
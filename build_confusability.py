@@ -0,0 +1,30 @@
+"""根据误选记录和形近字母重新计算易混淆近邻表，并重新编译内容包"""
+import argparse
+import os
+
+from app import create_app, db
+from app.utils.attempt_archive import archive_path
+from app.utils.confusability import build_neighbors, TOP_K
+from app.utils.content_bundle import refresh_content_bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description='构建易混淆近邻表')
+    parser.add_argument('--top-k', type=int, default=TOP_K, help=f'每个条目保留的近邻数（默认 {TOP_K}）')
+    parser.add_argument('--skip-archive', action='store_true', help='不读取已归档的答题记录')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+        archive = None if args.skip_archive else archive_path(app)
+        counts = build_neighbors(k=args.top_k, archive=archive)
+        db.session.commit()
+        refresh_content_bundle()
+
+    print(f"词汇近邻 {counts['vocab']} 条，字母近邻 {counts['alphabet']} 条")
+    print("✓ 完成")
+
+
+if __name__ == '__main__':
+    main()
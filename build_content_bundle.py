@@ -0,0 +1,22 @@
+"""编译预编译内容包（词汇、字母、对话），供工作进程启动时 mmap 加载"""
+import os
+import sys
+from app import create_app
+from app.utils.content_bundle import build_bundle
+
+
+def main(path):
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        counts = build_bundle(path)
+
+    size = os.path.getsize(path)
+    print(f"✓ 内容包已写入 {path}（{size / 1024:.1f} KB）")
+    for section, count in counts.items():
+        print(f"  {section}: {count}")
+    print("提示：设置环境变量 CONTENT_BUNDLE_PATH 指向该文件后启动应用")
+
+
+if __name__ == '__main__':
+    default_path = os.environ.get('CONTENT_BUNDLE_PATH') or 'instance/content.bundle'
+    main(sys.argv[1] if len(sys.argv) > 1 else default_path)
@@ -0,0 +1,54 @@
+"""从答题记录校准词汇难度、区分度和用户能力（两参数 IRT），并重新编译内容包"""
+import argparse
+import os
+
+from app import create_app, db
+from app.utils.analytics_store import analytics_path, load_snapshot
+from app.utils.attempt_archive import archive_path
+from app.utils.content_bundle import refresh_content_bundle
+from app.utils.irt import calibrate, store_calibration, calibration_report
+from app.utils.srs_simulator import load_attempts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IRT 词汇难度校准')
+    parser.add_argument('--source', choices=['database', 'snapshot'], default='database',
+                        help='database：读取答题记录；snapshot：读取分析快照（refresh_analytics.py）')
+    parser.add_argument('--history-days', type=int, default=None, help='只使用最近 N 天的作答记录（database）')
+    parser.add_argument('--include-archive', action='store_true', help='同时读取已归档的作答记录（database）')
+    parser.add_argument('--max-iterations', type=int, default=50, help='最大迭代次数')
+    parser.add_argument('--dry-run', action='store_true', help='只拟合并输出结果，不写入数据库')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+        if args.source == 'snapshot':
+            snapshot = load_snapshot(analytics_path(app))
+            if snapshot is None:
+                parser.error('分析快照不存在，请先运行 refresh_analytics.py')
+            columns = (snapshot.attempts['user_id'], snapshot.attempts['vocabulary_id'],
+                       snapshot.attempts['is_correct'])
+        else:
+            archive = archive_path(app) if args.include_archive else None
+            columns = load_attempts(since_days=args.history_days, archive=archive)[:3]
+        print(f"已读取 {len(columns[0])} 条作答记录")
+
+        fit = calibrate(*columns, max_iterations=args.max_iterations)
+        report = calibration_report(fit)
+        if not args.dry_run:
+            items, users = store_calibration(fit)
+            db.session.commit()
+            refresh_content_bundle()
+            print(f"已更新 {items} 个词汇、{users} 个用户")
+
+    print(f"{report['items']} 个词汇、{report['users']} 个用户，迭代 {report['iterations']} 次，"
+          f"平均对数似然 {report['log_likelihood']}")
+    print(f"能力均值 {report['ability_mean']}，标准差 {report['ability_sd']}")
+    print(f"最容易: {report['easiest']}")
+    print(f"最难:   {report['hardest']}")
+    print("✓ 完成" if not args.dry_run else "✓ 完成（未写入）")
+
+
+if __name__ == '__main__':
+    main()
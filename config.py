@@ -13,23 +13,115 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
 
+    # 登录用户快照缓存
+    USER_CACHE_TTL = 30       # 秒
+    USER_CACHE_SIZE = 10000
+
+    # 复习量预测缓存（单个用户的结果在其下次提交答案时失效）
+    FORECAST_CACHE_TTL = 3600
+    FORECAST_CACHE_SIZE = 10000
+    FORECAST_GLOBAL_TTL = 300
+
+    # 活跃用户草图：进程内累积，每隔多少秒合并到数据库；是否同时用后台线程和进程退出时写入
+    ACTIVITY_FLUSH_INTERVAL = 60
+    ACTIVITY_BACKGROUND_FLUSH = True
+
+    # 密码哈希：参数修改后用户下次登录时自动重新哈希
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', 2))   # 0 表示不使用进程池
+    PASSWORD_POOL_QUEUE = 32
+    PASSWORD_POOL_TIMEOUT = 5  # 秒
+
+    # 词汇 CSV 后台导入：线程数（0 表示在请求中同步执行）和上传文件目录（默认 instance/imports）
+    VOCAB_IMPORT_WORKERS = 1
+    IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER')
+    # 运行超过这个秒数仍未结束的导入任务，在进程重启后标记为失败
+    IMPORT_STALE_SECONDS = int(os.environ.get('IMPORT_STALE_SECONDS', 3600))
+
+    # 答题记录归档：保留最近多少天在线，更早的按天写入归档目录（默认 instance/attempt_archive）
+    ATTEMPT_RETENTION_DAYS = int(os.environ.get('ATTEMPT_RETENTION_DAYS', 180))
+    ATTEMPT_ARCHIVE_PATH = os.environ.get('ATTEMPT_ARCHIVE_PATH')
+
+    # 分析快照目录（默认 instance/analytics），由 refresh_analytics.py 定期刷新
+    ANALYTICS_PATH = os.environ.get('ANALYTICS_PATH')
+
     # 分页
     ITEMS_PER_PAGE = 20
 
+    # 只读副本（逗号分隔的数据库 URL），以及用户写入后强制读主库的时长（秒）
+    SQLALCHEMY_REPLICA_URIS = [u for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u]
+    READ_YOUR_WRITES_SECONDS = 10
+
+    # 请求级 SQL 统计：同一语句在一次请求中执行超过阈值次数时记录 N+1 警告
+    # （每条语句都要计算指纹，默认只在开发和测试环境开启；每请求的语句数和数据库耗时指标不受影响）
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '0') == '1'
+    SQL_REPEAT_THRESHOLD = 10
+
+    # /admin/metrics 指标收集
+    METRICS_ENABLED = True
+
+    # 按需性能分析（管理员请求带 X-Profile: 1 或 ?_profile=1）
+    PROFILE_BUFFER_SIZE = 20
+    PROFILE_TOP_N = 40
+
+    # 预编译内容包（python build_content_bundle.py 生成），为空则直接查数据库
+    CONTENT_BUNDLE_PATH = os.environ.get('CONTENT_BUNDLE_PATH')
+    # 管理后台修改内容后，等待这么多秒（合并连续的修改）再在后台线程中重新编译；None 表示在请求中同步编译
+    CONTENT_BUNDLE_REBUILD_DELAY = float(os.environ.get('CONTENT_BUNDLE_REBUILD_DELAY', 2))
+
+def _engine_options(database_uri):
+    """生产环境连接池参数（SQLite 不使用连接池大小相关参数）"""
+    options = {'pool_pre_ping': True}
+    if not database_uri.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        })
+    return options
+
 class DevelopmentConfig(Config):
     """开发环境配置"""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///learnthai_dev.db'
     SQLALCHEMY_ECHO = True
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'
 
 class TestingConfig(Config):
     """测试环境配置"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    CONTENT_BUNDLE_PATH = None
+    CONTENT_BUNDLE_REBUILD_DELAY = None
+    SQL_INSTRUMENTATION = True
+    ACTIVITY_BACKGROUND_FLUSH = False
+    SQLALCHEMY_REPLICA_URIS = []
+    PASSWORD_POOL_WORKERS = 0
+    VOCAB_IMPORT_WORKERS = 0
+
+class ProductionConfig(Config):
+    """生产环境配置"""
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///learnthai.db'
+    SQLALCHEMY_ECHO = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+    # SQLite 连接时执行的 PRAGMA（其他数据库忽略）
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),    # 毫秒
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),      # 负数表示 KB
+        'temp_store': 'MEMORY',
+    }
 
 config = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
+    'production': ProductionConfig,
     'default': DevelopmentConfig
 }
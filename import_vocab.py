@@ -1,48 +1,17 @@
-import csv
 import sys
-from app import create_app, db
-from app.models import Vocabulary
+from app import create_app
+from app.utils.content_bundle import refresh_content_bundle
+from app.utils.vocab_import import import_vocabulary, read_vocab_rows
 
 def import_from_csv(csv_file_path):
-    """从 CSV 文件导入词汇"""
+    """从 CSV 文件导入词汇（按块批量插入，已存在的词汇跳过）"""
     app = create_app()
     with app.app_context():
         try:
-            with open(csv_file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                count = 0
-                skipped = 0
-
-                for row in reader:
-                    # 检查是否已存在
-                    existing = Vocabulary.query.filter_by(
-                        thai_word=row['thai_word']
-                    ).first()
-
-                    if existing:
-                        print(f"⊘ 跳过重复词汇: {row['thai_word']}")
-                        skipped += 1
-                        continue
-
-                    difficulty = row.get('difficulty_level', '1')
-                    vocab = Vocabulary(
-                        thai_word=row['thai_word'],
-                        chinese_meaning=row['chinese_meaning'],
-                        pronunciation=row.get('pronunciation', ''),
-                        category=row.get('category', ''),
-                        difficulty_level=int(difficulty) if difficulty else 1,
-                        audio_file=row.get('audio_file', ''),
-                        example_sentence_thai=row.get('example_thai', ''),
-                        example_sentence_chinese=row.get('example_chinese', '')
-                    )
-                    db.session.add(vocab)
-                    count += 1
-
-                db.session.commit()
-                print(f"\n✓ 成功导入 {count} 个词汇")
-                if skipped:
-                    print(f"⊘ 跳过 {skipped} 个重复词汇")
-
+            with open(csv_file_path, 'r', encoding='utf-8-sig', newline='') as f:
+                result = import_vocabulary(read_vocab_rows(f), on_chunk=lambda r: print(
+                    f"\r  已处理 {r.processed} 行，新增 {r.created} 个", end='', flush=True))
+            print()
         except FileNotFoundError:
             print(f"✗ 错误：文件 '{csv_file_path}' 未找到")
             sys.exit(1)
@@ -50,6 +19,14 @@ def import_from_csv(csv_file_path):
             print(f"✗ 导入失败: {str(e)}")
             sys.exit(1)
 
+        for line_no, word, reason in result.messages:
+            print(f"⊘ 第 {line_no} 行 {word or '(空)'}: {reason}")
+        print(f"\n✓ 成功导入 {result.created} 个词汇")
+        if result.skipped or result.errors:
+            print(f"⊘ 跳过 {result.skipped} 个重复词汇，{result.errors} 行格式错误")
+        if result.created:
+            refresh_content_bundle()
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("用法: python import_vocab.py <csv文件路径>")
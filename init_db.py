@@ -1,12 +1,15 @@
 from app import create_app, db
 from app.models import User, Vocabulary, UserVocabulary, QuizAttempt
+from app.utils.database import upgrade_schema
 
 def init_database():
-    """初始化数据库"""
+    """初始化数据库（已有数据库再次运行时补上新版本增加的列）"""
     app = create_app()
     with app.app_context():
         db.create_all()
         print("✓ 数据库表创建成功！")
+        for table, column in upgrade_schema(db.engine):
+            print(f"✓ 已为 {table} 表添加列 {column}")
 
 if __name__ == '__main__':
     init_database()
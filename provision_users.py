@@ -0,0 +1,48 @@
+"""从 CSV 批量创建学员账户（username,email[,password]，密码为空时自动生成）"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from app import create_app
+from app.utils.provisioning import provision_users, read_user_rows, write_credentials
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从 CSV 批量创建学员账户')
+    parser.add_argument('csv_file', help='包含 username,email[,password] 列的 CSV 文件')
+    parser.add_argument('-o', '--output', default='credentials.csv',
+                        help='生成的密码写入的文件（默认 credentials.csv）')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='并行计算密码哈希的进程数（默认 CPU 核数）')
+    parser.add_argument('--chunk-size', type=int, default=500, help='每批插入的行数')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+
+    def report(result):
+        print(f"\r  已创建 {result.created} 个用户，跳过 {len(result.skipped)} 行，"
+              f"{result.rate:.0f} 个/秒", end='', flush=True)
+
+    try:
+        with open(args.csv_file, 'r', encoding='utf-8') as f, app.app_context(), \
+                ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            result = provision_users(read_user_rows(f), executor=executor,
+                                     chunk_size=args.chunk_size, on_chunk=report)
+    except FileNotFoundError:
+        print(f"✗ 错误：文件 '{args.csv_file}' 未找到")
+        sys.exit(1)
+    print()
+
+    for line_no, username, reason in result.skipped:
+        print(f"⊘ 第 {line_no} 行 {username or '(空)'}: {reason}")
+
+    print(f"\n✓ 成功创建 {result.created} 个用户，用时 {result.elapsed:.1f} 秒"
+          f"（{result.rate:.0f} 个/秒）")
+    if result.generated:
+        write_credentials(args.output, result.generated)
+        print(f"✓ {len(result.generated)} 个自动生成的密码已写入 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
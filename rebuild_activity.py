@@ -0,0 +1,30 @@
+"""从答题记录精确重建每日学习活跃草图（对话草图只补充），并输出原始记录与估计值的对比"""
+import argparse
+import os
+
+from app import create_app, db
+from app.utils.activity import rebuild_sketches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='重建每日活跃用户草图（学习：按答题记录精确重建；对话：只并入最后练习记录，不覆盖）')
+    parser.add_argument('--days', type=int, default=30, help='重建最近多少天（默认 30）')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+        report = rebuild_sketches(days=args.days)
+
+    for kind, rows in report.items():
+        print(f"\n{kind}（{len(rows)} 天有活动）")
+        print(f"  {'日期':<12}{'记录':>8}{'估计':>8}{'差异':>8}")
+        for day, exact, estimate in rows:
+            error = (estimate - exact) / exact * 100 if exact else 0.0
+            print(f"  {day.isoformat():<12}{exact:>8}{estimate:>8}{error:>7.1f}%")
+    print("\n✓ 草图已重建")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""刷新列式分析快照（追加新的答题记录，重建进度表快照）"""
+import argparse
+import os
+
+from app import create_app, db
+from app.utils.analytics_store import analytics_path, refresh_snapshot
+from app.utils.attempt_archive import archive_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='刷新分析快照')
+    parser.add_argument('--include-archive', action='store_true', help='首次构建或重建时读入已归档的答题记录')
+    parser.add_argument('--rebuild', action='store_true', help='丢弃已有快照，从头构建')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+        root = analytics_path(app)
+        archive = archive_path(app) if args.include_archive else None
+        result = refresh_snapshot(root, archive=archive, rebuild=args.rebuild)
+
+    print(f"新增答题记录 {result['new_attempts']} 条，快照共 {result['attempts']} 条"
+          f"（{result['segments']} 个分段，高水位 id {result['high_water']}）")
+    print(f"✓ 快照已写入 {root}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,4 +4,4 @@ from app import create_app
 app = create_app(os.getenv('FLASK_ENV') or 'default')
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8050, debug=True)
+    app.run(host='0.0.0.0', port=8050, debug=app.config.get('DEBUG', False))
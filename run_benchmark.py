@@ -0,0 +1,56 @@
+"""学习流程压测：模拟并发学员，输出各路由的延迟分位数、吞吐量和每请求 SQL 数"""
+import argparse
+import json
+import os
+import sys
+
+from app import create_app, db
+from app.utils.benchmark import run_benchmark, compare
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习流程压测（需先运行 generate_load_data.py）')
+    parser.add_argument('--learners', type=int, default=20, help='模拟学员数')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发线程数')
+    parser.add_argument('--sessions', type=int, default=2, help='每个学员的学习会话数')
+    parser.add_argument('--submits', type=int, default=10, help='每个会话最多作答的题数')
+    parser.add_argument('--prefix', default='load_', help='合成用户名前缀')
+    parser.add_argument('--seed', type=int, default=1, help='学员行为的随机种子')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='结果 JSON 文件')
+    parser.add_argument('--baseline', help='与之前的结果文件对比 p95')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+
+    try:
+        result = run_benchmark(app, learners=args.learners, concurrency=args.concurrency,
+                               sessions=args.sessions, submits=args.submits,
+                               prefix=args.prefix, seed=args.seed)
+    except ValueError as e:
+        print(f"✗ 错误：{e}")
+        sys.exit(1)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"{'路由':<36}{'请求':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL/请求':>10}")
+    for endpoint, stats in result['endpoints'].items():
+        queries = stats['queries_mean'] if stats['queries_mean'] is not None else '-'
+        print(f"{endpoint:<36}{stats['requests']:>7}{stats['p50_ms']:>9}{stats['p95_ms']:>9}"
+              f"{stats['p99_ms']:>9}{queries:>10}")
+    print(f"\n✓ {result['requests']} 个请求，用时 {result['wall_time_s']} 秒，"
+          f"吞吐量 {result['throughput_rps']} 请求/秒，错误 {result['errors']} 个")
+    print(f"结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n与 {args.baseline} 对比（p95 毫秒）:")
+        for endpoint, (old, new, change) in compare(baseline, result).items():
+            print(f"  {endpoint:<36}{old:>9} → {new:<9}{change:+.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""SRS 调度离线模拟：估算修改复习间隔后的每日复习量、用户负担和记忆保持率"""
+import argparse
+import json
+import os
+
+from app import create_app, db
+from app.models import Vocabulary
+from app.utils.attempt_archive import archive_path
+from app.utils.srs_simulator import (SchedulingPolicy, simulate, synthetic_population,
+                                     population_from_attempts, load_attempts)
+
+
+def _build_population(args):
+    if args.source == 'synthetic':
+        return synthetic_population(args.users, args.vocab, seed=args.seed)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
+    with app.app_context():
+        db.engine.echo = False
+        vocab_size = args.vocab or Vocabulary.query.filter_by(is_active=True).count()
+        archive = archive_path(app) if args.include_archive else None
+        columns = load_attempts(since_days=args.history_days, archive=archive)
+    print(f"已读取 {len(columns[0])} 条作答记录")
+    population, _ = population_from_attempts(*columns, vocab_size=vocab_size)
+    return population
+
+
+def _run(args, policy):
+    population = _build_population(args)
+    result = simulate(population, policy, args.days, sessions_per_day=args.sessions_per_day,
+                      session_size=args.session_size, max_new_per_session=args.max_new,
+                      seed=args.seed)
+    return result.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SRS 调度离线模拟')
+    parser.add_argument('--source', choices=['synthetic', 'history'], default='synthetic',
+                        help='synthetic：合成学员；history：由 QuizAttempt 历史重建')
+    parser.add_argument('--users', type=int, default=10000, help='合成学员数')
+    parser.add_argument('--vocab', type=int, default=None,
+                        help='可学习的词汇数（synthetic 默认 2000，history 默认数据库中的词汇数）')
+    parser.add_argument('--history-days', type=int, default=None, help='只读取最近 N 天的作答记录')
+    parser.add_argument('--include-archive', action='store_true', help='同时读取已归档的作答记录')
+    parser.add_argument('--days', type=int, default=90, help='模拟天数')
+    parser.add_argument('--sessions-per-day', type=int, default=1, help='每天的学习时段数')
+    parser.add_argument('--session-size', type=int, default=20, help='每个时段的词数')
+    parser.add_argument('--max-new', type=int, default=None, help='每个时段最多新词数（默认补满）')
+    parser.add_argument('--intervals', help='候选策略：按复习次数的间隔天数，逗号分隔，如 1,3,7,15,30,60,90')
+    parser.add_argument('--relearn-minutes', type=float, default=10, help='候选策略的重学间隔（分钟）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('-o', '--output', default='srs_simulation.json', help='结果 JSON 文件')
+    args = parser.parse_args()
+    if args.source == 'synthetic' and args.vocab is None:
+        args.vocab = 2000
+
+    policies = {'current': SchedulingPolicy.current()}
+    if args.intervals:
+        days = [float(d) for d in args.intervals.split(',')]
+        policies['candidate'] = SchedulingPolicy.from_days(days, relearn_minutes=args.relearn_minutes)
+
+    report = {'parameters': {k: v for k, v in vars(args).items() if k != 'output'}, 'policies': {}}
+    for name, policy in policies.items():
+        result = _run(args, policy)
+        report['policies'][name] = {'policy': policy.to_dict(), **result}
+
+        summary = result['summary']
+        print(f"\n[{name}] 间隔（天）: {policy.to_dict()['intervals_days']}")
+        print(f"  日均作答 {summary['mean_daily_reviews']}，峰值 {summary['peak_daily_reviews']}，"
+              f"到期峰值 {summary['peak_daily_due']}")
+        print(f"  单用户每日作答 p50/p95/p99: {summary['user_daily_reviews_p50']}/"
+              f"{summary['user_daily_reviews_p95']}/{summary['user_daily_reviews_p99']}")
+        print(f"  预测保持率 {summary['final_retention']:.1%}，答对率 {summary['success_rate']:.1%}，"
+              f"新增 QuizAttempt {summary['quiz_attempt_rows_added']} 行")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✓ 结果已写入 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 import pytest
+from contextlib import contextmanager
 from app import create_app, db
+from app.utils.sql_stats import capture_sql_stats
 
 @pytest.fixture
 def app():
@@ -13,3 +15,15 @@ def app():
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+@pytest.fixture
+def query_budget(app):
+    """断言 with 块内每个请求执行的 SQL 语句数不超过预算"""
+    @contextmanager
+    def budget(max_queries):
+        with capture_sql_stats(app) as captured:
+            yield captured
+        for endpoint, stats in captured:
+            assert stats.count <= max_queries, \
+                f'{endpoint} 执行了 {stats.count} 条 SQL（预算 {max_queries}）: {dict(stats.fingerprints)}'
+    return budget
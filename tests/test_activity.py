@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+from app.models import User, Vocabulary, QuizAttempt, ActivitySketch, UserConversation
+from app.utils.activity import HyperLogLog, activity_summary, get_activity_tracker, rebuild_sketches
+from app.utils.progress import record_vocab_rating, flush_activity
+from app import db
+
+
+def test_hyperloglog_estimate():
+    """测试基数估计误差和合并"""
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(20000):
+        a.add(i)
+    for i in range(10000, 30000):
+        b.add(i)
+
+    assert HyperLogLog().count() == 0
+    assert abs(a.count() - 20000) / 20000 < 0.05
+    union = HyperLogLog.union([a, b])
+    assert abs(union.count() - 30000) / 30000 < 0.05
+    assert not union.merge(a)  # 重复合并不变
+
+    small = HyperLogLog()
+    for i in range(50):
+        small.add(i)
+    small.add(0)
+    assert small.count() == 50
+    assert HyperLogLog.from_bytes(small.to_bytes()).registers == small.registers
+
+
+def _users(count):
+    users = [User(username=f'a{i}', email=f'a{i}@test.com', password_hash='x') for i in range(count)]
+    vocab = Vocabulary(thai_word='กิน', chinese_meaning='吃')
+    db.session.add_all([*users, vocab])
+    db.session.commit()
+    return [u.id for u in users], vocab.id
+
+
+def test_answers_update_sketches(app):
+    """测试答题更新进程内草图，写入后合并到数据库"""
+    user_ids, vocab_id = _users(3)
+    today = datetime.utcnow()
+    yesterday = today - timedelta(days=1)
+
+    for user_id in user_ids:
+        record_vocab_rating(user_id, vocab_id, 3, now=today)
+    record_vocab_rating(user_ids[0], vocab_id, 3, now=yesterday)
+    db.session.commit()
+
+    # 尚未写入数据库时，统计包含本进程的草图
+    assert ActivitySketch.query.count() == 0
+    summary = activity_summary('learning')
+    assert (summary['dau'], summary['wau'], summary['mau']) == (3, 3, 3)
+    assert [d['count'] for d in summary['daily'][-2:]] == [1, 3]
+
+    flush_activity(today)
+    db.session.commit()
+    assert ActivitySketch.query.count() == 2
+    assert not get_activity_tracker().flush_due()
+
+    # 另一个进程的数据只在数据库中
+    app.extensions.pop('activity_tracker')
+    assert activity_summary('learning')['dau'] == 3
+    assert activity_summary('conversation')['dau'] == 0
+
+
+def test_rebuild_sketches(app):
+    """测试从答题记录精确重建"""
+    user_ids, vocab_id = _users(4)
+    now = datetime.utcnow()
+    for user_id in user_ids:
+        for days_ago in (0, 0, 2):
+            db.session.add(QuizAttempt(user_id=user_id, vocabulary_id=vocab_id, quiz_type='flashcard',
+                                       is_correct=True, created_at=now - timedelta(days=days_ago)))
+    db.session.commit()
+
+    report = rebuild_sketches(days=7, now=now)
+    assert [(exact, estimate) for _, exact, estimate in report['learning']] == [(4, 4), (4, 4)]
+    assert report['conversation'] == []
+    assert activity_summary('learning')['wau'] == 4
+
+
+def test_rebuild_keeps_conversation_sketches(app):
+    """测试对话草图只并入最后练习记录，之后又练习过的用户不会从之前的日期消失"""
+    user_ids, _ = _users(3)
+    now = datetime.utcnow()
+    earlier = (now - timedelta(days=2)).date()
+    sketch = HyperLogLog()
+    for user_id in user_ids:
+        sketch.add(user_id)
+    db.session.add(ActivitySketch(day=earlier, kind='conversation', registers=sketch.to_bytes()))
+    # 三个用户两天前都练习过，其中一个今天又练习了（最后练习时间变为今天）
+    db.session.add(UserConversation(user_id=user_ids[0], conversation_id=1, last_practiced=now))
+    db.session.add(UserConversation(user_id=user_ids[1], conversation_id=1,
+                                    last_practiced=now - timedelta(days=2)))
+    db.session.commit()
+
+    report = rebuild_sketches(days=7, now=now)
+    assert [(day, exact) for day, exact, _ in report['conversation']] == [(earlier, 1), (now.date(), 1)]
+    sketches = {day: HyperLogLog.from_bytes(registers) for day, registers in db.session.execute(
+        db.select(ActivitySketch.day, ActivitySketch.registers).where(ActivitySketch.kind == 'conversation'))}
+    assert sketches[earlier].count() == 3 and sketches[now.date()].count() == 1
+
+
+def test_background_flush_without_later_answers(app):
+    """测试之后没有新的答题时，后台线程和进程退出时的写入也会把草图写入数据库"""
+    import time
+    from app.utils.activity import ActivityTracker
+
+    user_ids, vocab_id = _users(2)
+    app.config['ACTIVITY_BACKGROUND_FLUSH'] = True
+    app.extensions['activity_tracker'] = ActivityTracker(flush_interval=0.05)
+    record_vocab_rating(user_ids[0], vocab_id, 3)
+    db.session.commit()
+
+    tracker = get_activity_tracker()
+    deadline = time.time() + 5
+    while tracker._dirty and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert ActivitySketch.query.count() == 1
+
+    # 进程退出时的写入（atexit 调用的同一个函数）
+    app.config['ACTIVITY_BACKGROUND_FLUSH'] = False
+    app.extensions['activity_tracker'] = tracker = ActivityTracker(flush_interval=3600)
+    record_vocab_rating(user_ids[1], vocab_id, 3)
+    db.session.commit()
+    tracker.flush_pending(app)
+    db.session.expire_all()
+    app.extensions.pop('activity_tracker')
+    assert activity_summary('learning')['dau'] == 2
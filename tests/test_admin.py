@@ -47,3 +47,36 @@ def test_admin_can_access_admin(client, app):
 
     response = client.get('/admin/')
     assert response.status_code == 200
+
+def test_admin_request_profiling(client, app):
+    """测试管理员按需分析请求并下载 pstats"""
+    import marshal
+    with app.app_context():
+        admin = User(username='profiler', email='profiler@test.com', is_admin=True)
+        admin.set_password('pass')
+        db.session.add(admin)
+        db.session.commit()
+
+    client.post('/auth/login', data={
+        'username': 'profiler',
+        'password': 'pass'
+    })
+
+    client.get('/admin/')  # 未开启分析
+    client.get('/admin/?_profile=1')
+    client.get('/learning/summary', headers={'X-Profile': '1'})
+
+    response = client.get('/admin/profiles')
+    assert response.status_code == 200
+    html = response.data.decode('utf-8')
+    assert 'learning.summary' in html
+    assert 'admin.dashboard' in html
+
+    response = client.get('/admin/profiles/1')
+    assert response.status_code == 200
+    assert 'SELECT' in response.data.decode('utf-8')
+
+    response = client.get('/admin/profiles/2/download')
+    assert response.status_code == 200
+    assert isinstance(marshal.loads(response.data), dict)
+    assert client.get('/admin/profiles/99').status_code == 404
@@ -0,0 +1,133 @@
+from datetime import datetime, date
+
+import numpy as np
+
+from app.models import User, Vocabulary, UserVocabulary, QuizAttempt, UserConversation
+from app.utils.analytics_store import load_snapshot, refresh_snapshot
+from app.utils import analytics_store
+from app.utils.analytics_reports import (accuracy_by_quiz_type, time_taken_percentiles, cohort_retention,
+                                         category_difficulty, vocabulary_rankings, conversation_engagement)
+from app.utils.attempt_archive import archive_attempts
+from app import db
+
+
+def _setup():
+    users = [User(username=f'u{i}', email=f'u{i}@test.com', password_hash='x') for i in range(3)]
+    words = [Vocabulary(thai_word='กิน', chinese_meaning='吃', category='动词'),
+             Vocabulary(thai_word='น้ำ', chinese_meaning='水', category='名词'),
+             Vocabulary(thai_word='ไป', chinese_meaning='去')]
+    db.session.add_all([*users, *words])
+    db.session.flush()
+    # 2026-03-02 是周一：u0、u1 第 0 周开始，u0 第 1 周回来；u2 第 1 周开始
+    rows = [
+        (users[0], words[0], 'flashcard', True, 2, datetime(2026, 3, 2, 9)),
+        (users[0], words[0], 'multiple_choice', False, 10, datetime(2026, 3, 3, 9)),
+        (users[1], words[1], 'multiple_choice', True, 4, datetime(2026, 3, 8, 23)),
+        (users[0], words[1], 'multiple_choice', True, None, datetime(2026, 3, 10, 9)),
+        (users[2], words[2], 'typing', False, 20, datetime(2026, 3, 11, 9)),
+    ]
+    for user, word, quiz_type, correct, taken, created in rows:
+        db.session.add(QuizAttempt(user_id=user.id, vocabulary_id=word.id, quiz_type=quiz_type,
+                                   is_correct=correct, time_taken=taken, created_at=created))
+    db.session.add(UserVocabulary(user_id=users[0].id, vocabulary_id=words[0].id, familiarity_level=4,
+                                  next_review_date=datetime(2026, 3, 20)))
+    db.session.add(UserVocabulary(user_id=users[1].id, vocabulary_id=words[0].id, familiarity_level=1,
+                                  next_review_date=datetime(2026, 3, 20)))
+    db.session.add(UserConversation(user_id=users[0].id, conversation_id=1, familiarity_level=2, practice_count=3))
+    db.session.commit()
+    return [u.id for u in users], [w.id for w in words]
+
+
+def test_refresh_is_incremental(app, tmp_path, monkeypatch):
+    """测试按高水位追加分段，分段过多时合并"""
+    user_ids, word_ids = _setup()
+    root = str(tmp_path / 'analytics')
+    result = refresh_snapshot(root)
+    assert result == {'new_attempts': 5, 'attempts': 5, 'segments': 1, 'high_water': 5}
+
+    assert refresh_snapshot(root)['new_attempts'] == 0
+    monkeypatch.setattr(analytics_store, 'MAX_SEGMENTS', 2)
+    for i in range(2):
+        db.session.add(QuizAttempt(user_id=user_ids[1], vocabulary_id=word_ids[0], quiz_type='flashcard',
+                                   is_correct=True, created_at=datetime(2026, 3, 12)))
+        db.session.commit()
+        result = refresh_snapshot(root)
+        assert result['new_attempts'] == 1
+    assert result == {'new_attempts': 1, 'attempts': 7, 'segments': 1, 'high_water': 7}
+
+    snapshot = load_snapshot(root)
+    assert snapshot.attempts['id'].tolist() == list(range(1, 8))
+    assert snapshot.attempts['day'][0] == (date(2026, 3, 2) - date(1970, 1, 1)).days
+    assert snapshot.attempts['time_taken'][3] == -1
+    assert snapshot.attempts['user_id'].dtype == np.int32
+    assert len([d for d in tmp_path.joinpath('analytics').iterdir() if d.is_dir()]) == 2  # 一个分段 + 一份进度表
+
+
+def test_reports(app, tmp_path):
+    """测试各报表的向量化聚合结果"""
+    _, word_ids = _setup()
+    root = str(tmp_path)
+    refresh_snapshot(root)
+    snapshot = load_snapshot(root)
+
+    accuracy = accuracy_by_quiz_type(snapshot)
+    assert accuracy[0] == {'quiz_type': 'multiple_choice', 'attempts': 3, 'correct': 2, 'accuracy': 0.6667}
+    assert {row['quiz_type'] for row in accuracy} == {'multiple_choice', 'flashcard', 'typing'}
+
+    timing = time_taken_percentiles(snapshot)
+    assert timing[0]['quiz_type'] == 'all' and timing[0]['count'] == 4 and timing[0]['p50'] == 7.0
+    assert {row['quiz_type']: row['p50'] for row in timing[1:]} == {
+        'flashcard': 2.0, 'multiple_choice': 7.0, 'typing': 20.0}
+
+    cohorts = cohort_retention(snapshot, weeks=2)
+    assert [row['cohort'] for row in cohorts] == [date(2026, 3, 2), date(2026, 3, 9)]
+    assert cohorts[0]['users'] == 2 and cohorts[0]['retention'] == [1.0, 0.5, None]
+    assert cohorts[1]['users'] == 1 and cohorts[1]['retention'] == [1.0, None, None]
+
+    categories = category_difficulty(snapshot)
+    assert [row['category'] for row in categories] == ['未分类', '动词', '名词']
+    verbs = categories[1]
+    assert verbs['attempts'] == 2 and verbs['accuracy'] == 0.5 and verbs['mean_time'] == 6.0
+    assert verbs['progress_rows'] == 2 and verbs['mean_familiarity'] == 2.5 and verbs['mastered_rate'] == 0.5
+
+    difficult, popular = vocabulary_rankings(snapshot, min_attempts=1)
+    assert difficult[0] == (word_ids[2], 1, 1)
+    assert popular[0][1] == 2
+
+    assert conversation_engagement(snapshot) == {'learners': 1, 'practices': 3, 'conversations': 1,
+                                                 'familiarity': [0, 0, 1, 0, 0, 0]}
+
+
+def test_snapshot_includes_archive(app, tmp_path):
+    """测试首次构建时读入答题归档"""
+    _setup()
+    archive = str(tmp_path / 'archive')
+    (tmp_path / 'archive').mkdir()
+    archive_attempts(archive, datetime(2026, 3, 8))
+    assert QuizAttempt.query.count() == 3
+
+    result = refresh_snapshot(str(tmp_path / 'analytics'), archive=archive)
+    assert result['attempts'] == 5 and result['high_water'] == 5
+    snapshot = load_snapshot(str(tmp_path / 'analytics'))
+    assert snapshot.attempts['id'].tolist() == [1, 2, 3, 4, 5]
+    assert accuracy_by_quiz_type(snapshot)[0]['attempts'] == 3
+
+
+def test_analytics_page(app, client, tmp_path):
+    """测试分析页和仪表板读取快照"""
+    _setup()
+    admin = User(username='admin', email='admin@test.com', is_admin=True)
+    admin.set_password('pass')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+    app.config['ANALYTICS_PATH'] = str(tmp_path)
+
+    response = client.get('/admin/analytics')
+    assert response.status_code == 200
+    assert 'refresh_analytics.py' in response.get_data(as_text=True)
+
+    refresh_snapshot(str(tmp_path))
+    html = client.get('/admin/analytics').get_data(as_text=True)
+    assert 'multiple_choice' in html and '2026-03-02' in html and '动词' in html
+    assert 'ไป' in client.get('/admin/').get_data(as_text=True)  # 仪表板的词汇排行来自快照
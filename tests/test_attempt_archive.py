@@ -0,0 +1,118 @@
+from datetime import datetime, date
+
+import numpy as np
+
+from app.models import User, Vocabulary, QuizAttempt
+from app.utils.attempt_archive import archive_attempts, list_partitions, open_partition, read_archived
+from app.utils.srs_simulator import load_attempts
+from app import db
+
+
+def _attempts():
+    user = User(username='learner', email='l@test.com', password_hash='x')
+    vocab = Vocabulary(thai_word='กิน', chinese_meaning='吃')
+    db.session.add_all([user, vocab])
+    db.session.flush()
+    rows = [
+        (datetime(2026, 1, 1, 8), 'flashcard', True, 3),
+        (datetime(2026, 1, 1, 20), 'dictation', False, None),
+        (datetime(2026, 1, 2, 9), 'true_false', True, 5),
+        (datetime(2026, 3, 1, 9), 'multiple_choice', True, 2),
+    ]
+    for created, quiz_type, correct, taken in rows:
+        db.session.add(QuizAttempt(user_id=user.id, vocabulary_id=vocab.id, quiz_type=quiz_type,
+                                   is_correct=correct, time_taken=taken, created_at=created))
+    db.session.commit()
+    return user.id, vocab.id
+
+
+def test_archive_and_read_back(app, tmp_path):
+    """测试按天归档、分批删除，并通过 mmap 读回"""
+    user_id, vocab_id = _attempts()
+    root = str(tmp_path)
+
+    assert archive_attempts(root, datetime(2026, 2, 1), dry_run=True) == {date(2026, 1, 1): 2, date(2026, 1, 2): 1}
+    assert QuizAttempt.query.count() == 4 and list_partitions(root) == []
+
+    archived = archive_attempts(root, datetime(2026, 2, 1), batch_size=1)
+    assert archived == {date(2026, 1, 1): 2, date(2026, 1, 2): 1}
+    assert QuizAttempt.query.count() == 1
+    assert list_partitions(root) == [date(2026, 1, 1), date(2026, 1, 2)]
+    assert list_partitions(root, start=date(2026, 1, 2)) == [date(2026, 1, 2)]
+
+    columns, quiz_types = open_partition(root, date(2026, 1, 1))
+    assert isinstance(columns['id'], np.memmap)
+    assert columns['user_id'].dtype == np.int32 and columns['user_id'].tolist() == [user_id, user_id]
+    assert columns['time_taken'].tolist() == [3, -1]
+    assert [quiz_types[c] for c in columns['quiz_type']] == ['flashcard', 'dictation']
+
+    columns, quiz_types = read_archived(root, columns=('vocabulary_id', 'quiz_type', 'is_correct', 'created_at'))
+    assert columns['vocabulary_id'].tolist() == [vocab_id] * 3
+    assert [quiz_types[c] for c in columns['quiz_type']] == ['flashcard', 'dictation', 'true_false']
+    assert columns['is_correct'].tolist() == [True, False, True]
+    assert columns['created_at'][2] == np.datetime64('2026-01-02T09:00:00')
+    assert len(read_archived(root, start=date(2026, 2, 1))[0]['user_id']) == 0
+
+
+def test_archive_rerun_merges(app, tmp_path):
+    """测试已有分区时按 id 合并（中途失败重跑不丢不重）"""
+    user_id, vocab_id = _attempts()
+    root = str(tmp_path)
+    archive_attempts(root, datetime(2026, 1, 1, 12))
+    open_partition(root, date(2026, 1, 1))  # 生成 mmap 缓存
+
+    # 已写入归档但未删除的行再次出现
+    db.session.add(QuizAttempt(id=1, user_id=user_id, vocabulary_id=vocab_id, quiz_type='flashcard',
+                               is_correct=True, time_taken=3, created_at=datetime(2026, 1, 1, 8)))
+    db.session.commit()
+    archive_attempts(root, datetime(2026, 2, 1))
+
+    columns, _ = read_archived(root, columns=('id', 'created_at'))
+    assert columns['id'].tolist() == [1, 2, 3]
+    assert QuizAttempt.query.count() == 1
+
+
+def test_load_attempts_includes_archive(app, tmp_path):
+    """测试离线模拟同时读取在线表和归档"""
+    _attempts()
+    root = str(tmp_path)
+    now = datetime(2026, 3, 2)
+    archive_attempts(root, datetime(2026, 1, 2))
+
+    users, vocabs, correct, times = load_attempts(now=now, archive=root)
+    assert len(users) == 4
+    assert sorted(correct.tolist()) == [False, True, True, True]
+    assert times.min() == (datetime(2026, 1, 1, 8) - now).total_seconds() / 86400
+
+    users, _, _, _ = load_attempts(since_days=59, now=now, archive=root)
+    assert len(users) == 2
+    assert len(load_attempts(now=now)[0]) == 2
+
+
+def test_read_partition_without_new_columns(app, tmp_path):
+    """测试旧版本分区缺少后来增加的列时按 -1 补齐"""
+    root = str(tmp_path)
+    np.savez_compressed(str(tmp_path / 'attempts-2026-01-01.npz'), quiz_types=np.array(['flashcard']),
+                        id=np.array([1], dtype=np.int64), user_id=np.array([2], dtype=np.int32),
+                        vocabulary_id=np.array([3], dtype=np.int32), quiz_type=np.array([0], dtype=np.uint8),
+                        is_correct=np.array([True]), time_taken=np.array([4], dtype=np.int32),
+                        created_at=np.array(['2026-01-01T08:00'], dtype='datetime64[s]'))
+    columns, _ = read_archived(root, columns=('vocabulary_id', 'selected_vocabulary_id'))
+    assert columns['vocabulary_id'].tolist() == [3] and columns['selected_vocabulary_id'].tolist() == [-1]
+
+
+def test_stray_files_are_not_partitions(app, tmp_path):
+    """测试中途崩溃留下的临时文件和无法解析的文件名不会当成分区"""
+    _attempts()
+    root = str(tmp_path)
+    archive_attempts(root, datetime(2026, 1, 2))
+    (tmp_path / 'tmp-123-attempts-2026-01-02.npz').write_bytes(b'partial')
+    (tmp_path / 'attempts-2026-01-02.npz.tmp.npz').write_bytes(b'partial')
+    (tmp_path / 'attempts-backup.npz').write_bytes(b'')
+
+    assert list_partitions(root) == [date(2026, 1, 1)]
+    archive_attempts(root, datetime(2026, 2, 1))
+    assert list_partitions(root) == [date(2026, 1, 1), date(2026, 1, 2)]
+    assert not any(p.name.startswith('tmp-') and p.name != 'tmp-123-attempts-2026-01-02.npz'
+                   for p in tmp_path.iterdir())
+    assert read_archived(root, columns=('id',))[0]['id'].tolist() == [1, 2, 3]
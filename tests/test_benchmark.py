@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from app.models import ThaiAlphabet, ConversationScene, Conversation
+from app.utils.benchmark import percentile, run_benchmark, compare
+from app.utils.synthetic import SyntheticSpec, generate
+from app import db
+
+
+def test_percentile_nearest_rank():
+    """测试最近秩分位数"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) == 0.0
+
+
+def _seed_content():
+    db.session.add_all([
+        ThaiAlphabet(character='ก', name_chinese='鸡', alphabet_type='consonant'),
+        ThaiAlphabet(character='ข', name_chinese='蛋', alphabet_type='consonant'),
+    ])
+    scene = ConversationScene(name_chinese='餐厅点餐')
+    db.session.add(scene)
+    db.session.flush()
+    db.session.add(Conversation(scene_id=scene.id, title_chinese='预订餐位'))
+    db.session.commit()
+    generate(SyntheticSpec(users=2, vocab=30, words_per_user=5, attempts_per_user=5,
+                           conversations_per_user=1, days=10, now=datetime(2026, 1, 1)))
+
+
+def test_run_benchmark_reports_endpoints(app):
+    """测试压测覆盖学习、字母和对话流程，并统计每请求 SQL 数"""
+    _seed_content()
+    result = run_benchmark(app, learners=2, concurrency=1, sessions=1, submits=3)
+
+    assert result['parameters']['learners'] == 2
+    assert result['errors'] == 0
+    endpoints = result['endpoints']
+    for endpoint in ('auth.login', 'learning.start', 'learning.summary', 'alphabet.practice',
+                     'alphabet.submit_alphabet', 'conversation.submit_practice'):
+        assert endpoint in endpoints
+    start = endpoints['learning.start']
+    assert start['requests'] == 2
+    assert start['p50_ms'] <= start['p95_ms'] <= start['p99_ms']
+    assert start['queries_mean'] > 0
+    assert result['throughput_rps'] > 0
+
+    diff = compare(result, result)
+    assert diff['learning.start'][2] == 0
+
+
+def test_run_benchmark_counts_queries_without_instrumentation(monkeypatch):
+    """测试关闭 SQL_INSTRUMENTATION 和指标（非开发环境默认）时压测仍报告每请求 SQL 数"""
+    from app import create_app
+    from config import config, TestingConfig
+
+    class QuietConfig(TestingConfig):
+        SQL_INSTRUMENTATION = False
+        METRICS_ENABLED = False
+
+    monkeypatch.setitem(config, 'quiet_benchmark', QuietConfig)
+    app = create_app('quiet_benchmark')
+    with app.app_context():
+        db.create_all()
+        _seed_content()
+        result = run_benchmark(app, learners=1, concurrency=1, sessions=1, submits=2)
+        assert result['endpoints']['learning.start']['queries_mean'] > 0
+        db.session.remove()
+        db.drop_all()
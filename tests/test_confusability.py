@@ -0,0 +1,160 @@
+from collections import Counter
+
+import numpy as np
+
+from app import db
+from app.models import User, Vocabulary, ThaiAlphabet, QuizAttempt, AlphabetConfusion, ConfusableNeighbor
+from app.routes.alphabet import generate_alphabet_options
+from app.routes.learning import generate_options
+from app.utils.confusability import top_k_neighbors, glyph_pairs, build_neighbors, neighbor_ids, SMOOTHING
+from app.utils.content_bundle import build_bundle, ContentBundle, init_content_bundle
+from app.utils.progress import record_alphabet_confusion
+
+
+def _login(client, username='confused'):
+    user = User(username=username, email=f'{username}@test.com')
+    user.set_password('pass')
+    db.session.add(user)
+    db.session.commit()
+    client.post('/auth/login', data={'username': username, 'password': 'pass'})
+    return user.id
+
+
+def test_top_k_neighbors():
+    """测试反向计数、归一化和每个条目的截断"""
+    items, neighbors, scores = top_k_neighbors([1, 1, 1, 2], [2, 3, 2, 3], [1, 1, 1, 4],
+                                               totals={1: 10, 2: 30}, k=2)
+    result = {(int(i), int(n)): s for i, n, s in zip(items, neighbors, scores)}
+    assert result[(1, 2)] == 2 / (10 + SMOOTHING)
+    assert result[(2, 3)] == 4 / (30 + SMOOTHING)
+    assert result[(2, 1)] == 1 / (30 + SMOOTHING)        # 反向按一半计入
+    assert result[(3, 2)] == 2 / SMOOTHING
+    assert list(items) == sorted(items)
+    assert list(neighbors[items == 1]) == [2, 3]
+
+    items, _, _ = top_k_neighbors([1, 1, 1], [2, 3, 4], [3, 2, 1], k=2)
+    assert Counter(items.tolist())[1] == 2
+    assert len(top_k_neighbors([1], [1], [5])[0]) == 0
+
+
+def test_alphabet_neighbors_and_options(app):
+    """测试形近字母、误选计数进入近邻表，并作为干扰项出现"""
+    letters = [ThaiAlphabet(character=c, name_chinese=n, alphabet_type='consonant')
+               for c, n in [('ด', '孩子'), ('ค', '水牛'), ('ต', '乌龟'), ('ก', '鸡'), ('ข', '蛋'), ('ง', '蛇')]]
+    db.session.add_all(letters)
+    db.session.commit()
+    d, k, t, g, kh, ng = (a.id for a in letters)
+    assert set(glyph_pairs()) == {(d, k), (d, t), (k, t)}
+
+    record_alphabet_confusion(g, kh)
+    record_alphabet_confusion(g, kh)
+    db.session.commit()
+    assert db.session.get(AlphabetConfusion, (g, kh)).count == 2
+
+    counts = build_neighbors()
+    db.session.commit()
+    assert counts['alphabet'] == 8
+    assert set(neighbor_ids('alphabet', d)) == {k, t}
+    assert neighbor_ids('alphabet', g) == [kh]
+
+    correct = {'id': d, 'name_chinese': '孩子', 'alphabet_type': 'consonant'}
+    for _ in range(5):
+        options = generate_alphabet_options(correct, letters)
+        assert len(options) == 4 and {o['id'] for o in options} >= {d, k, t}
+
+
+def test_vocab_confusions_from_attempts(client, app):
+    """测试答错时记录所选干扰项，近邻进入选择题选项"""
+    user_id = _login(client)
+    words = [Vocabulary(thai_word=f'w{i}', chinese_meaning=f'词{i}', category='分类') for i in range(8)]
+    db.session.add_all(words)
+    db.session.commit()
+    ids = [w.id for w in words]
+
+    words[6].is_active = False
+    db.session.commit()
+    # 有效、有效、选中正确词汇本身、释义不符、已禁用、不存在
+    for answer, selected in (('词5', ids[5]), ('词5', ids[5]), ('词5', ids[0]), ('错', ids[4]),
+                             ('词6', ids[6]), ('词5', 99999)):
+        response = client.post('/learning/check-answer', json={
+            'vocabulary_id': ids[0], 'selected_answer': answer, 'selected_id': selected, 'time_taken': 3})
+        assert response.get_json()['success']
+    client.post('/learning/check-answer', json={
+        'vocabulary_id': ids[1], 'selected_answer': '词1', 'selected_id': ids[5]})
+    selected = db.session.scalars(db.select(QuizAttempt.selected_vocabulary_id)
+                                  .where(QuizAttempt.user_id == user_id).order_by(QuizAttempt.id)).all()
+    assert selected == [ids[5], ids[5], None, None, None, None, None]
+    words[6].is_active = True
+    db.session.commit()
+
+    build_neighbors()
+    db.session.commit()
+    assert neighbor_ids('vocab', ids[0]) == [ids[5]]
+    assert neighbor_ids('vocab', ids[5]) == [ids[0]]
+    assert db.session.scalar(db.select(db.func.count()).select_from(ConfusableNeighbor)) == 2
+
+    session_vocab = [{'id': w.id, 'chinese_meaning': w.chinese_meaning, 'category': w.category} for w in words]
+    for _ in range(5):
+        options = generate_options(session_vocab[0], session_vocab)
+        assert len(options) == 4 and ids[5] in [o['id'] for o in options]
+        assert [o['text'] for o in options if o['is_correct']] == ['词0']
+
+
+def test_neighbors_in_bundle(app, tmp_path):
+    """测试内容包中的近邻列与数据库一致，并用于选择题选项"""
+    words = [Vocabulary(thai_word=f'w{i}', chinese_meaning=f'词{i}') for i in range(4)]
+    db.session.add_all(words)
+    db.session.flush()
+    db.session.add_all([
+        ConfusableNeighbor(domain='vocab', item_id=words[0].id, neighbor_id=words[2].id, score=0.1),
+        ConfusableNeighbor(domain='vocab', item_id=words[0].id, neighbor_id=words[3].id, score=0.3),
+        ConfusableNeighbor(domain='vocab', item_id=words[1].id, neighbor_id=words[0].id, score=0.2),
+    ])
+    db.session.commit()
+    expected = [neighbor_ids('vocab', w.id) for w in words]
+    assert expected[0] == [words[3].id, words[2].id]
+
+    path = str(tmp_path / 'content.bundle')
+    build_bundle(path)
+    app.config['CONTENT_BUNDLE_PATH'] = path
+    init_content_bundle(app)
+    assert [neighbor_ids('vocab', w.id) for w in words] == expected
+
+    # 内容包路径：近邻按行号映射回词汇
+    session_vocab = [{'id': w.id, 'chinese_meaning': w.chinese_meaning, 'category': w.category} for w in words]
+    options = generate_options(session_vocab[1], session_vocab)
+    assert len(options) == 4 and words[0].id in [o['id'] for o in options]
+    assert np.asarray(ContentBundle(path)['vocab_neighbors'].column('item_id')).tolist() == \
+        [words[0].id, words[0].id, words[1].id]
+
+
+def test_vocab_confusions_survive_archiving(app, tmp_path):
+    """测试答题记录归档后误选记录仍计入近邻表"""
+    from datetime import datetime
+    from app.utils.attempt_archive import archive_attempts, read_archived
+
+    user = User(username='old', email='old@test.com', password_hash='x')
+    words = [Vocabulary(thai_word=f'w{i}', chinese_meaning=f'词{i}') for i in range(3)]
+    db.session.add_all([user, *words])
+    db.session.flush()
+    for day, selected in ((1, words[2].id), (2, words[2].id), (3, None)):
+        db.session.add(QuizAttempt(user_id=user.id, vocabulary_id=words[0].id, quiz_type='multiple_choice',
+                                   is_correct=selected is None, selected_vocabulary_id=selected,
+                                   created_at=datetime(2026, 1, day)))
+    db.session.commit()
+    build_neighbors()
+    before = db.session.execute(db.select(ConfusableNeighbor.item_id, ConfusableNeighbor.neighbor_id,
+                                          ConfusableNeighbor.score).order_by(ConfusableNeighbor.item_id)).all()
+
+    root = str(tmp_path)
+    archive_attempts(root, datetime(2026, 1, 3))
+    assert read_archived(root, columns=('selected_vocabulary_id',))[0]['selected_vocabulary_id'].tolist() == \
+        [words[2].id, words[2].id]
+    assert QuizAttempt.query.count() == 1
+
+    build_neighbors()
+    assert db.session.scalar(db.select(db.func.count()).select_from(ConfusableNeighbor)) == 0
+    build_neighbors(archive=root)
+    after = db.session.execute(db.select(ConfusableNeighbor.item_id, ConfusableNeighbor.neighbor_id,
+                                         ConfusableNeighbor.score).order_by(ConfusableNeighbor.item_id)).all()
+    assert after == before and len(after) == 2
@@ -0,0 +1,164 @@
+from app.models import Vocabulary, ThaiAlphabet, ConversationScene, Conversation, ConversationLine, User
+from app.utils.content_bundle import build_bundle, ContentBundle, init_content_bundle
+from app import db
+
+
+def _seed_content():
+    db.session.add_all([
+        Vocabulary(thai_word='สวัสดี', chinese_meaning='你好', category='日常用语', difficulty_level=1),
+        Vocabulary(thai_word='น้ำ', chinese_meaning='水', category=None, difficulty_level=2),
+        Vocabulary(thai_word='ปิด', chinese_meaning='关闭', category='动词', is_active=False),
+        ThaiAlphabet(character='ข', name_chinese='蛋', alphabet_type='consonant',
+                     consonant_class='high', sort_order=2),
+        ThaiAlphabet(character='ก', name_chinese='鸡', alphabet_type='consonant',
+                     consonant_class='mid', sort_order=1),
+    ])
+    scene = ConversationScene(name_chinese='餐厅点餐')
+    db.session.add(scene)
+    db.session.flush()
+    conv = Conversation(scene_id=scene.id, title_chinese='预订餐位')
+    db.session.add(conv)
+    db.session.flush()
+    db.session.add_all([
+        ConversationLine(conversation_id=conv.id, line_order=2, speaker_role='服务员',
+                         text_thai='ได้ครับ', text_chinese='好的'),
+        ConversationLine(conversation_id=conv.id, line_order=1, speaker_role='顾客',
+                         text_thai='จองโต๊ะ', text_chinese='订桌', key_words='["จอง"]'),
+    ])
+    db.session.commit()
+    return conv.id
+
+
+def test_build_and_read_bundle(app, tmp_path):
+    """测试内容包编译与读取"""
+    path = str(tmp_path / 'content.bundle')
+    with app.app_context():
+        conv_id = _seed_content()
+        counts = build_bundle(path)
+
+    assert counts['vocabularies'] == 2  # 只包含启用的词汇
+    bundle = ContentBundle(path)
+
+    vocab = bundle['vocabularies'].get(1)
+    assert vocab.thai_word == 'สวัสดี'
+    assert vocab.chinese_meaning == '你好'
+    assert bundle['vocabularies'].get(2).category is None
+    assert bundle['vocabularies'].get(3) is None
+
+    consonants = bundle.alphabets(alphabet_type='consonant')
+    assert [a.character for a in consonants] == ['ก', 'ข']
+    assert [a.character for a in bundle.alphabets(consonant_class=['high'])] == ['ข']
+
+    lines = bundle.conversation_lines(conv_id)
+    assert [line.line_order for line in lines] == [1, 2]
+    assert lines[0].key_words == '["จอง"]'
+    assert bundle.conversation_lines(999) is None
+
+
+def test_routes_use_bundle(app, client, tmp_path):
+    """测试配置内容包后页面从内容包读取"""
+    path = str(tmp_path / 'content.bundle')
+    with app.app_context():
+        conv_id = _seed_content()
+        user = User(username='reader', email='reader@test.com')
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.commit()
+        build_bundle(path)
+
+        # 编译后数据库中的变更不影响已编译的内容包
+        ConversationLine.query.filter_by(line_order=1).update({'text_chinese': '已修改'})
+        db.session.commit()
+
+    app.config['CONTENT_BUNDLE_PATH'] = path
+    init_content_bundle(app)
+
+    client.post('/auth/login', data={'username': 'reader', 'password': 'pass'})
+    response = client.get(f'/conversation/view/{conv_id}')
+    assert response.status_code == 200
+    assert '订桌' in response.data.decode('utf-8')
+
+    response = client.get('/alphabet/consonants')
+    assert response.status_code == 200
+    assert '鸡' in response.data.decode('utf-8')
+
+
+def test_concurrent_builds_use_separate_tmp_files(app, tmp_path):
+    """测试同一进程的多个线程同时编译时各自写临时文件，结果完整且不留临时文件"""
+    import threading
+
+    _seed_content()
+    path = str(tmp_path / 'content.bundle')
+    errors = []
+
+    def build():
+        with app.app_context():
+            try:
+                build_bundle(path)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == ['content.bundle']
+    assert ContentBundle(path)['vocabularies'].get(1).thai_word == 'สวัสดี'
+
+
+def test_remap_closes_retired_bundle(app, tmp_path):
+    """测试重新编译后换下的映射保留一代，再次重新映射时关闭"""
+    import os
+    from app.utils.content_bundle import get_content_bundle
+
+    _seed_content()
+    path = str(tmp_path / 'content.bundle')
+    build_bundle(path)
+    app.config['CONTENT_BUNDLE_PATH'] = path
+    init_content_bundle(app)
+    first = get_content_bundle()
+
+    def rebuild(word):
+        db.session.add(Vocabulary(thai_word=word, chinese_meaning=word))
+        db.session.commit()
+        build_bundle(path)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))  # 确保时间戳变化
+        return get_content_bundle()
+
+    second = rebuild('หนึ่ง')
+    assert second is not first and not first._mmap.closed   # 进行中的请求还能读旧映射
+    assert first['vocabularies'].get(1).thai_word == 'สวัสดี'
+
+    third = rebuild('สอง')
+    assert first._mmap.closed and not second._mmap.closed
+    assert len(third['vocabularies']) == 4
+
+
+def test_refresh_in_request_is_debounced(app, tmp_path, monkeypatch):
+    """测试请求中的多次刷新合并为一次后台编译，请求外直接编译"""
+    import time
+    from app.utils.content_bundle import refresh_content_bundle
+
+    path = str(tmp_path / 'content.bundle')
+    build_bundle(path)
+    app.config['CONTENT_BUNDLE_PATH'] = path
+    app.config['CONTENT_BUNDLE_REBUILD_DELAY'] = 0.2
+    init_content_bundle(app)
+
+    built = []
+    monkeypatch.setattr('app.utils.content_bundle.build_bundle', built.append)
+    with app.test_request_context():
+        for _ in range(3):
+            refresh_content_bundle()
+        assert built == []            # 不在请求中编译
+    deadline = time.time() + 5
+    while not built and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.3)
+    assert built == [path]
+
+    refresh_content_bundle()          # 命令行脚本等请求外的调用
+    assert built == [path, path]
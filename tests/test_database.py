@@ -0,0 +1,55 @@
+from app import create_app, db
+from config import config, ProductionConfig
+
+
+def test_production_sqlite_pragmas(tmp_path, monkeypatch):
+    """测试生产配置在 SQLite 连接上启用 WAL 等 PRAGMA"""
+    class ProductionTestConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'prod.db'}"
+
+    monkeypatch.setitem(config, 'production_test', ProductionTestConfig)
+    app = create_app('production_test')
+
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 0   # 启动自检的连接已释放，不会被 fork 出的进程继承
+        assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(db.text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.session.execute(db.text('PRAGMA busy_timeout')).scalar() == 5000
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_production_pool_options_for_server_databases():
+    """测试非 SQLite 数据库使用连接池参数"""
+    from config import _engine_options
+    options = _engine_options('postgresql://user@db/learnthai')
+    assert options['pool_pre_ping'] is True
+    assert options['pool_size'] == 10
+    assert 'pool_size' not in _engine_options('sqlite:///learnthai.db')
+
+
+def test_upgrade_schema_adds_missing_columns(tmp_path, monkeypatch):
+    """测试旧数据库补上新增的列，重复执行不做任何事"""
+    from app.utils.database import upgrade_schema, ADDED_COLUMNS
+
+    class UpgradeTestConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'old.db'}"
+
+    monkeypatch.setitem(config, 'upgrade_test', UpgradeTestConfig)
+    app = create_app('upgrade_test')
+    with app.app_context():
+        db.create_all()
+        # 模拟旧版本的表：去掉新增的列
+        with db.engine.begin() as conn:
+            for table, column, _ in ADDED_COLUMNS:
+                conn.execute(db.text(f'ALTER TABLE {table} DROP COLUMN {column}'))
+
+        assert sorted(upgrade_schema(db.engine)) == sorted((t, c) for t, c, _ in ADDED_COLUMNS)
+        assert upgrade_schema(db.engine) == []
+        from app.models import User, Vocabulary
+        db.session.add(User(username='old', email='old@test.com', password_hash='x', ability=0.5))
+        db.session.add(Vocabulary(thai_word='ก', chinese_meaning='鸡', irt_difficulty=1.0))
+        db.session.commit()
+        assert db.session.scalar(db.select(User.ability)) == 0.5
+        db.session.remove()
+        db.engine.dispose()
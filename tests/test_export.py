@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.models import User, Vocabulary, UserVocabulary, QuizAttempt
+from app.utils import export as export_module
+from app import db
+
+
+def _setup(client):
+    admin = User(username='admin', email='admin@test.com', is_admin=True)
+    admin.set_password('pass')
+    learners = [User(username=f'cohort_{i}', email=f'c{i}@test.com', password_hash='x') for i in range(2)]
+    vocab = Vocabulary(thai_word='กิน', chinese_meaning='吃')
+    db.session.add_all([admin, *learners, vocab])
+    db.session.flush()
+    for day, quiz_type in [(1, 'flashcard'), (2, 'multiple_choice'), (3, 'true_false')]:
+        for learner in learners:
+            db.session.add(QuizAttempt(user_id=learner.id, vocabulary_id=vocab.id, quiz_type=quiz_type,
+                                       is_correct=True, time_taken=3, created_at=datetime(2026, 3, day, 12)))
+    db.session.add(UserVocabulary(user_id=learners[0].id, vocabulary_id=vocab.id, familiarity_level=4,
+                                  next_review_date=datetime(2026, 3, 10), last_reviewed=datetime(2026, 3, 3)))
+    db.session.commit()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+    return [u.id for u in learners]
+
+
+def test_export_attempts_with_filters(app, client, monkeypatch):
+    """测试按日期、题型和用户前缀过滤，并跨多个批次流式输出"""
+    _setup(client)
+    monkeypatch.setattr(export_module, 'EXPORT_BATCH_SIZE', 1)
+
+    response = client.get('/admin/export/attempts?prefix=cohort_&start=2026-03-02&end=2026-03-03'
+                          '&quiz_type=multiple_choice,true_false')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 4
+    assert {r['quiz_type'] for r in rows} == {'multiple_choice', 'true_false'}
+    assert rows[0]['username'].startswith('cohort_') and rows[0]['created_at'] == '2026-03-02T12:00:00'
+
+    response = client.get('/admin/export/attempts?format=csv&end=2026-03-01')
+    lines = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert lines[0][:3] == ['id', 'user_id', 'username']
+    assert len(lines) == 3
+
+
+def test_user_export_and_errors(app, client):
+    """测试单个用户导出和参数校验"""
+    learner_ids = _setup(client)
+
+    response = client.get(f'/admin/users/{learner_ids[0]}/export/progress?format=csv')
+    assert response.status_code == 200
+    assert 'cohort_0-progress' in response.headers['Content-Disposition']
+    lines = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert len(lines) == 2 and lines[1][4] == '4'
+
+    response = client.get(f'/admin/users/{learner_ids[1]}/export/progress?format=csv')
+    assert response.get_data(as_text=True).strip() == ','.join(lines[0])  # 只有表头
+
+    assert client.get('/admin/export/unknown').status_code == 400
+    assert client.get('/admin/export/attempts?format=xml').status_code == 400
+    assert client.get('/admin/export/attempts?start=2026-13-01').status_code == 400
+    assert client.get('/admin/export/progress?quiz_type=flashcard').status_code == 400
+    assert client.get('/admin/users/999/export/attempts').status_code == 404
+
+
+def test_user_export_non_ascii_filename(app, client):
+    """测试用户名含中文/泰文和空格时导出文件名头可以按 latin-1 编码"""
+    from urllib.parse import quote
+    _setup(client)
+    user = User(username='学员 สมชาย', email='thai@test.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.get(f'/admin/users/{user.id}/export/attempts?format=csv')
+    assert response.status_code == 200
+    header = response.headers['Content-Disposition']
+    header.encode('latin-1')
+    assert f'filename="user-{user.id}-attempts-' in header
+    assert "filename*=UTF-8''" + quote('学员 สมชาย-attempts-', safe='') in header
+    response.close()   # 流式响应，关闭后生成器在请求上下文中结束
+
+    response = client.get('/admin/export/progress?format=csv')
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="progress-')
+    response.close()
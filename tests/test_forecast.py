@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from app.models import User, Vocabulary, UserVocabulary
+from app.utils.forecast import compute_forecast, user_forecast, global_forecast
+from app.utils.sql_stats import capture_sql_stats
+from app import db
+
+
+def _setup(app, due_offsets, username='learner', is_admin=False):
+    user = User(username=username, email=f'{username}@test.com', is_admin=is_admin)
+    user.set_password('pass')
+    db.session.add(user)
+    db.session.flush()
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    for i, offset in enumerate(due_offsets):
+        vocab = Vocabulary(thai_word=f'w{username}{i}', chinese_meaning=f'词{i}')
+        db.session.add(vocab)
+        db.session.flush()
+        db.session.add(UserVocabulary(user_id=user.id, vocabulary_id=vocab.id,
+                                      next_review_date=today + timedelta(days=offset, hours=12)))
+    db.session.commit()
+    return user.id
+
+
+def test_compute_forecast_buckets(app):
+    """测试按天分桶：逾期、今天、未来和 30 天以外"""
+    user_id = _setup(app, [-3, -1, 0, 0, 1, 29, 30, 100])
+    forecast = compute_forecast(user_id)
+
+    assert forecast['overdue'] == 2
+    assert forecast['counts'][0] == 2
+    assert forecast['counts'][1] == 1
+    assert forecast['counts'][29] == 1
+    assert len(forecast['counts']) == 30
+    assert forecast['total'] == 6
+
+
+def test_user_forecast_cached_until_submit(client, app):
+    """测试预测结果缓存到下次提交"""
+    user_id = _setup(app, [1, 2])
+    vocab_id = UserVocabulary.query.filter_by(user_id=user_id).first().vocabulary_id
+    client.post('/auth/login', data={'username': 'learner', 'password': 'pass'})
+
+    response = client.get('/learning/forecast')
+    assert response.get_json()['counts'][1] == 1
+
+    with capture_sql_stats(app) as captured:
+        client.get('/learning/forecast')
+    assert not any('user_vocabularies' in fp for fp in captured[0][1].fingerprints)
+
+    client.post('/learning/submit', json={'vocabulary_id': vocab_id, 'familiarity': 1})
+    forecast = client.get('/learning/forecast').get_json()
+    assert forecast['counts'][0] == 1
+    assert forecast['counts'][1] == 0
+
+
+def test_admin_forecast_aggregates_users(client, app):
+    """测试管理员查看全体用户汇总"""
+    _setup(app, [1, 1, 5], username='a')
+    _setup(app, [1], username='boss', is_admin=True)
+    client.post('/auth/login', data={'username': 'boss', 'password': 'pass'})
+
+    forecast = client.get('/admin/forecast').get_json()
+    assert forecast['counts'][1] == 3
+    assert forecast['counts'][5] == 1
+    assert client.get('/admin/').status_code == 200
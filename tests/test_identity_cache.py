@@ -0,0 +1,43 @@
+from app.models import User
+from app.utils.sql_stats import capture_sql_stats
+from app import db
+
+
+def _create_user(app, username, is_admin=False):
+    with app.app_context():
+        user = User(username=username, email=f'{username}@test.com', is_admin=is_admin)
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_authenticated_requests_skip_user_query(client, app):
+    """测试登录后的请求使用缓存的用户快照"""
+    _create_user(app, 'cached')
+    client.post('/auth/login', data={'username': 'cached', 'password': 'pass'})
+    client.get('/learning/summary')
+
+    with capture_sql_stats(app) as captured:
+        response = client.get('/learning/summary')
+    assert response.status_code == 200
+    _, stats = captured[0]
+    assert not any('FROM users' in fp for fp in stats.fingerprints)
+
+
+def test_toggle_active_invalidates_cache(client, app):
+    """测试管理员禁用用户后缓存立即失效"""
+    from app.models import load_user
+    _create_user(app, 'boss', is_admin=True)
+    user_id = _create_user(app, 'learner')
+
+    assert load_user(str(user_id)).is_active is True
+    cache = app.extensions['identity_cache']
+    assert len(cache) == 1
+
+    client.post('/auth/login', data={'username': 'boss', 'password': 'pass'})
+    client.post(f'/admin/users/{user_id}/toggle-active')
+
+    snapshot = load_user(str(user_id))
+    assert snapshot.is_active is False
+    assert snapshot.is_authenticated is False
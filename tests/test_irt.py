@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import numpy as np
+
+from app.models import User, Vocabulary, QuizAttempt
+from app.routes.learning import select_new_words
+from app.utils.content_bundle import build_bundle, ContentBundle
+from app.utils.irt import fit_irt, calibrate, store_calibration, target_difficulty
+from app.utils.vocab_catalog import VocabCatalog
+from app import db
+
+
+def test_fit_recovers_parameters():
+    """测试在模拟数据上还原难度和能力的排序"""
+    rng = np.random.default_rng(0)
+    ability = rng.normal(0, 1, 400)
+    difficulty = rng.normal(0, 1, 60)
+    users = rng.integers(0, 400, 40000)
+    items = rng.integers(0, 60, 40000)
+    correct = rng.random(40000) < 1 / (1 + np.exp(-(ability[users] - difficulty[items])))
+
+    fit = fit_irt(users + 1, items + 100, correct)
+    assert fit.item_ids[0] == 100 and fit.user_ids[0] == 1
+    assert np.corrcoef(fit.difficulty, difficulty)[0, 1] > 0.95
+    assert np.corrcoef(fit.ability, ability)[0, 1] > 0.8
+    assert np.all((fit.discrimination >= 0.25) & (fit.discrimination <= 4))
+    assert fit.item_attempts.sum() == 40000
+
+    # 数据很少时接近先验
+    fit = fit_irt(np.array([1]), np.array([7]), np.array([True]), item_prior={7: -1.5})
+    assert -2 < fit.difficulty[0] < -1.5 and 0 < fit.ability[0] < 0.5
+
+
+def _seed():
+    """4 个词：人工难度都是 1，但第 2、3 个词大多答错"""
+    users = [User(username=f'irt{i}', email=f'irt{i}@test.com', password_hash='x') for i in range(20)]
+    words = [Vocabulary(thai_word=f'w{i}', chinese_meaning=f'词{i}', difficulty_level=1) for i in range(4)]
+    db.session.add_all([*users, *words])
+    db.session.flush()
+    rows = []
+    for k, user in enumerate(users):
+        for word in words:
+            if word is words[1]:
+                correct = k % 4 == 0
+            elif word is words[2]:
+                correct = k % 10 == 0
+            else:
+                correct = k % 10 != 0
+            rows.append({'user_id': user.id, 'vocabulary_id': word.id, 'quiz_type': 'flashcard',
+                         'is_correct': correct, 'created_at': datetime(2026, 3, 1)})
+    db.session.execute(db.insert(QuizAttempt), rows)
+    db.session.commit()
+    return [u.id for u in users], [w.id for w in words]
+
+
+def test_calibration_orders_new_words(app, tmp_path):
+    """测试校准结果写回后按用户能力选择新词（数据库和词汇目录两条路径一致）"""
+    user_ids, word_ids = _seed()
+    columns = db.session.execute(db.select(QuizAttempt.user_id, QuizAttempt.vocabulary_id,
+                                           QuizAttempt.is_correct)).all()
+    fit = calibrate(*map(np.array, zip(*columns)))
+    assert store_calibration(fit) == (4, 20)
+    db.session.commit()
+
+    words = [db.session.get(Vocabulary, i) for i in word_ids]
+    assert words[2].irt_difficulty > words[1].irt_difficulty > words[0].irt_difficulty
+    assert words[0].irt_discrimination > 0
+    assert db.session.get(User, user_ids[0]).ability is not None
+
+    # 未校准能力时从最容易的开始；能力很高时先选最难的
+    easy_first = [v['id'] for v in select_new_words(user_ids[1], 4)]
+    assert easy_first[-1] == word_ids[2]
+    hard_first = [v['id'] for v in select_new_words(user_ids[1], 2, ability=words[2].irt_difficulty + 1.1)]
+    assert hard_first == [word_ids[2], word_ids[1]]
+
+    path = str(tmp_path / 'content.bundle')
+    build_bundle(path)
+    catalog = VocabCatalog(ContentBundle(path))
+    assert [catalog.ids[r] for r in catalog.new_words(set(), 4)] == easy_first
+    target = target_difficulty(words[2].irt_difficulty + 1.1)
+    assert [catalog.ids[r] for r in catalog.new_words({word_ids[1]}, 2, target)] == [word_ids[2], word_ids[3]]
+    assert len(catalog.new_words(set(), 10, target)) == 4
+
+
+def test_login_snapshot_carries_ability(app, client):
+    """测试登录快照带有能力值，开始学习时不需要额外查询"""
+    user = User(username='able', email='able@test.com', ability=1.25)
+    user.set_password('pass')
+    db.session.add(user)
+    db.session.commit()
+    from app.utils.identity_cache import get_identity_cache
+    snapshot = get_identity_cache().get(user.id, lambda uid: db.session.get(User, uid))
+    assert snapshot.ability == 1.25
@@ -0,0 +1,97 @@
+from app.models import User, Vocabulary, UserVocabulary, ThaiAlphabet, UserBitmap
+from app.utils.learned_sets import IdBitmap, get_learned_sets, build_learned_sets
+from app.utils.progress import ensure_vocab_progress, record_vocab_rating, record_vocab_answer, \
+    record_alphabet_answer
+from app import db
+
+
+def _setup(words=3):
+    user = User(username='bits', email='bits@test.com')
+    user.set_password('pass')
+    vocabs = [Vocabulary(thai_word=f'w{i}', chinese_meaning=f'词{i}') for i in range(words)]
+    db.session.add_all([user, *vocabs])
+    db.session.commit()
+    return user.id, [v.id for v in vocabs]
+
+
+def test_id_bitmap_operations():
+    """测试位图的集合运算和序列化"""
+    a = IdBitmap([1, 5, 9, 1000])
+    b = IdBitmap([5, 1000, 2000])
+
+    assert len(a) == 4 and 9 in a and 2 not in a and -1 not in a
+    assert list(a - b) == [1, 9]
+    assert list(a & b) == [5, 1000]
+    assert len(a | b) == 5
+
+    a.discard(1000)
+    a.discard(99999)
+    assert list(a) == [1, 5, 9]
+
+    restored = IdBitmap.from_bytes(a.to_bytes())
+    assert restored == a
+    assert IdBitmap.from_bytes(IdBitmap().to_bytes()) == IdBitmap()
+    assert len(IdBitmap(range(0, 100000, 2)).to_bytes()) < 1000  # 规则分布压缩效果明显
+
+
+def test_bitmaps_follow_answers(app):
+    """测试答题后位图与进度表保持一致，内容不变时不重写"""
+    user_id, (v1, v2, v3) = _setup()
+
+    ensure_vocab_progress(user_id, [v1, v2])
+    record_vocab_rating(user_id, v3, 5)
+    db.session.commit()
+    sets = get_learned_sets(user_id, 'vocab')
+    assert list(sets.seen) == sorted([v1, v2, v3])
+    assert list(sets.mastered) == [v3]
+
+    for _ in range(4):
+        record_vocab_answer(user_id, v1, True)
+    record_vocab_answer(user_id, v3, False)
+    db.session.commit()
+    sets = get_learned_sets(user_id, 'vocab')
+    assert list(sets.mastered) == [v1]
+
+    rebuilt = build_learned_sets(user_id, 'vocab')
+    assert (rebuilt.seen, rebuilt.mastered) == (sets.seen, sets.mastered)
+
+    stamp = db.session.get(UserBitmap, (user_id, 'vocab_seen')).updated_at
+    record_vocab_answer(user_id, v2, True)  # 已学过且未达到掌握，位图不变
+    db.session.commit()
+    assert db.session.get(UserBitmap, (user_id, 'vocab_seen')).updated_at == stamp
+
+
+def test_bitmaps_built_for_existing_progress(app):
+    """测试没有位图的老用户：读取时从进度表构建，第一次答题时写入"""
+    user_id, (v1, v2, _) = _setup()
+    db.session.add(UserVocabulary(user_id=user_id, vocabulary_id=v1, familiarity_level=5,
+                                  next_review_date=db.func.now()))
+    db.session.commit()
+
+    assert list(get_learned_sets(user_id, 'vocab').mastered) == [v1]
+    assert UserBitmap.query.count() == 0
+
+    record_vocab_rating(user_id, v2, 1)
+    db.session.commit()
+    sets = get_learned_sets(user_id, 'vocab')
+    assert list(sets.seen) == sorted([v1, v2])
+    assert list(sets.mastered) == [v1]
+    assert UserBitmap.query.filter_by(user_id=user_id).count() == 2
+
+
+def test_alphabet_pages_use_bitmap(app, client):
+    """测试字母列表按位图标记已学字母"""
+    user_id, _ = _setup(0)
+    learned = ThaiAlphabet(character='ก', name_chinese='鸡', alphabet_type='consonant',
+                           consonant_class='mid', sort_order=1)
+    other = ThaiAlphabet(character='จ', name_chinese='盘', alphabet_type='consonant',
+                         consonant_class='mid', sort_order=2)
+    db.session.add_all([learned, other])
+    db.session.commit()
+    record_alphabet_answer(user_id, learned.id, True)
+    db.session.commit()
+    assert list(get_learned_sets(user_id, 'alphabet').seen) == [learned.id]
+
+    client.post('/auth/login', data={'username': 'bits', 'password': 'pass'})
+    html = client.get('/alphabet/consonants').get_data(as_text=True)
+    assert html.count('alphabet-item learned') == 1
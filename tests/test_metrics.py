@@ -0,0 +1,69 @@
+from app.models import User
+from app.utils.metrics import MetricsRegistry
+from app import db
+
+
+def test_histogram_render():
+    """测试直方图按固定桶累计输出"""
+    registry = MetricsRegistry()
+    registry.histogram('t_seconds', 'test', buckets=(0.1, 1.0))
+    registry.observe('t_seconds', 0.05, (('endpoint', 'a'),))
+    registry.observe('t_seconds', 0.5, (('endpoint', 'a'),))
+    registry.observe('t_seconds', 3, (('endpoint', 'a'),))
+    text = registry.render()
+    assert 't_seconds_bucket{endpoint="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{endpoint="a",le="1.0"} 2' in text
+    assert 't_seconds_bucket{endpoint="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{endpoint="a"} 3' in text
+
+
+def test_metrics_endpoint(client, app):
+    """测试 /admin/metrics 输出请求指标且仅管理员可访问"""
+    with app.app_context():
+        for name, is_admin in (('admin', True), ('normal', False)):
+            user = User(username=name, email=f'{name}@test.com', is_admin=is_admin)
+            user.set_password('pass')
+            db.session.add(user)
+        db.session.commit()
+
+    client.post('/auth/login', data={'username': 'normal', 'password': 'pass'})
+    assert client.get('/admin/metrics').status_code == 403
+    client.get('/auth/logout')
+
+    client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+    client.get('/learning/summary')
+    response = client.get('/admin/metrics')
+    assert response.status_code == 200
+    text = response.data.decode('utf-8')
+    assert 'learnthai_http_requests_total{endpoint="learning.summary",status="200"} 1' in text
+    assert 'learnthai_http_request_duration_seconds_bucket{endpoint="learning.summary",le="+Inf"} 1' in text
+    assert 'learnthai_db_queries_total{endpoint="learning.summary"}' in text
+
+
+def test_db_metrics_without_sql_instrumentation(monkeypatch):
+    """测试关闭 SQL_INSTRUMENTATION（生产默认）时仍记录每请求的语句数和数据库耗时"""
+    from app import create_app
+    from config import config, TestingConfig
+
+    class NoInstrumentationConfig(TestingConfig):
+        SQL_INSTRUMENTATION = False
+
+    monkeypatch.setitem(config, 'no_instrumentation_test', NoInstrumentationConfig)
+    app = create_app('no_instrumentation_test')
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@test.com', is_admin=True)
+        admin.set_password('pass')
+        db.session.add(admin)
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+        client.get('/learning/summary')
+        text = client.get('/admin/metrics').data.decode('utf-8')
+        queries = [line for line in text.splitlines()
+                   if line.startswith('learnthai_db_queries_total{endpoint="learning.summary"}')]
+        assert queries and float(queries[0].split()[-1]) > 0
+        assert 'learnthai_db_time_seconds_count{endpoint="learning.summary"} 1' in text
+        db.session.remove()
+        db.drop_all()
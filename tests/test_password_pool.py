@@ -0,0 +1,73 @@
+import pytest
+
+from app.models import User
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy, hash_password, verify_password
+from app import db
+
+
+def test_inline_pool_hashes_in_process(app):
+    """测试 PASSWORD_POOL_WORKERS=0 时在当前线程计算"""
+    pwhash = hash_password('secret')
+    assert pwhash.startswith('scrypt:')
+    assert verify_password(pwhash, 'secret')
+    assert not verify_password(pwhash, 'wrong')
+
+
+def test_process_pool_round_trip(app):
+    """测试在独立进程中哈希和校验"""
+    from werkzeug.security import generate_password_hash, check_password_hash
+    pool = PasswordPool(workers=1, queue_size=1, timeout=30)
+    try:
+        pwhash = pool.run(generate_password_hash, 'secret', 'pbkdf2:sha256:1000')
+        assert pool.run(check_password_hash, pwhash, 'secret')
+        assert pool.in_flight == 0
+    finally:
+        pool.shutdown()
+
+
+def test_full_pool_rejects_immediately(app):
+    """测试并发数达到上限时立即拒绝而不是排队等待"""
+    pool = PasswordPool(workers=1, queue_size=0, timeout=30)
+    assert pool._slots.acquire(blocking=False)  # 模拟唯一的名额被占用
+    try:
+        with pytest.raises(PasswordPoolBusy):
+            pool.run(len, 'x')
+    finally:
+        pool._slots.release()
+        pool.shutdown()
+
+
+def test_login_rehashes_outdated_hash(client, app):
+    """测试修改哈希方法后，登录时自动按新参数重新哈希"""
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    user = User(username='legacy', email='legacy@test.com')
+    user.set_password('pass')
+    db.session.add(user)
+    db.session.commit()
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    response = client.post('/auth/login', data={'username': 'legacy', 'password': 'pass'})
+    assert response.status_code == 302
+
+    db.session.expire_all()
+    user = db.session.get(User, user.id)
+    assert user.password_hash.startswith('scrypt:')
+    assert user.check_password('pass')
+
+
+def test_login_returns_503_when_pool_busy(client, app):
+    """测试进程池繁忙时登录返回 503"""
+    user = User(username='busy', email='busy@test.com')
+    user.set_password('pass')
+    db.session.add(user)
+    db.session.commit()
+
+    class BusyPool:
+        def run(self, fn, *args):
+            raise PasswordPoolBusy('full')
+
+    app.extensions['password_pool'] = BusyPool()
+    response = client.post('/auth/login', data={'username': 'busy', 'password': 'pass'})
+    assert response.status_code == 503
+    assert '服务器繁忙'.encode() in response.data
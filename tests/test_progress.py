@@ -0,0 +1,91 @@
+import json
+from datetime import datetime, timedelta
+from app.models import User, Vocabulary, UserVocabulary, ThaiAlphabet, UserAlphabet, \
+    ConversationScene, Conversation, UserConversation
+from app.utils.progress import record_vocab_rating, record_vocab_answer, ensure_vocab_progress, \
+    record_alphabet_answer, record_conversation_practice
+from app import db
+
+
+def _user_and_vocab():
+    user = User(username='p', email='p@test.com')
+    user.set_password('pass')
+    vocab = Vocabulary(thai_word='กิน', chinese_meaning='吃')
+    db.session.add_all([user, vocab])
+    db.session.commit()
+    return user.id, vocab.id
+
+
+def test_vocab_rating_upsert(app):
+    """测试闪卡自评重复提交时在数据库端累加"""
+    with app.app_context():
+        user_id, vocab_id = _user_and_vocab()
+        now = datetime(2026, 1, 1)
+
+        record_vocab_rating(user_id, vocab_id, 4, now=now)
+        record_vocab_rating(user_id, vocab_id, 4, now=now)
+        db.session.commit()
+
+        uv = UserVocabulary.query.filter_by(user_id=user_id, vocabulary_id=vocab_id).one()
+        assert uv.review_count == 2
+        assert uv.correct_count == 2
+        assert uv.next_review_date == now + timedelta(days=7)  # 第 2 次复习：7 天
+
+
+def test_vocab_answer_updates_existing(app):
+    """测试选择题作答更新熟悉度"""
+    with app.app_context():
+        user_id, vocab_id = _user_and_vocab()
+        ensure_vocab_progress(user_id, [vocab_id])
+        ensure_vocab_progress(user_id, [vocab_id])  # 重复创建不报错
+
+        record_vocab_answer(user_id, vocab_id, True)
+        record_vocab_answer(user_id, vocab_id, True)
+        db.session.commit()
+        uv = UserVocabulary.query.filter_by(user_id=user_id).one()
+        assert (uv.familiarity_level, uv.review_count, uv.correct_count) == (2, 2, 2)
+
+        record_vocab_answer(user_id, vocab_id, False)
+        db.session.commit()
+        db.session.refresh(uv)
+        assert uv.familiarity_level == 1
+        assert uv.review_count == 3
+
+
+def test_alphabet_answer_upsert(app):
+    """测试字母答题的插入和更新"""
+    with app.app_context():
+        user_id, _ = _user_and_vocab()
+        alphabet = ThaiAlphabet(character='ก', name_chinese='鸡', alphabet_type='consonant')
+        db.session.add(alphabet)
+        db.session.commit()
+
+        record_alphabet_answer(user_id, alphabet.id, True)
+        record_alphabet_answer(user_id, alphabet.id, True)
+        record_alphabet_answer(user_id, alphabet.id, False)
+        db.session.commit()
+
+        ua = UserAlphabet.query.filter_by(user_id=user_id).one()
+        assert (ua.familiarity_level, ua.review_count, ua.correct_count) == (1, 3, 2)
+
+
+def test_conversation_practice_modes(app):
+    """测试对话练习记录已完成模式且不重复"""
+    with app.app_context():
+        user_id, _ = _user_and_vocab()
+        scene = ConversationScene(name_chinese='购物')
+        db.session.add(scene)
+        db.session.flush()
+        conv = Conversation(scene_id=scene.id, title_chinese='买水果')
+        db.session.add(conv)
+        db.session.commit()
+
+        record_conversation_practice(user_id, conv.id, 'fill_blank', 1.0)
+        record_conversation_practice(user_id, conv.id, 'order', 1.0)
+        record_conversation_practice(user_id, conv.id, 'fill_blank', 0.8)
+        db.session.commit()
+
+        uc = UserConversation.query.filter_by(user_id=user_id).one()
+        assert json.loads(uc.completed_modes) == ['fill_blank', 'order']
+        assert uc.practice_count == 3
+        assert uc.familiarity_level == 3
@@ -0,0 +1,75 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models import User
+from app.utils.provisioning import provision_users, read_user_rows, write_credentials
+from app import db
+
+
+def _rows(text):
+    return read_user_rows(io.StringIO(text))
+
+
+def test_provision_creates_users_and_generates_passwords(app):
+    """测试批量创建用户，空密码自动生成"""
+    result = provision_users(_rows(
+        'username,email,password\n'
+        'alice,alice@test.com,secret1\n'
+        'bob,bob@test.com,\n'
+    ))
+
+    assert result.created == 2
+    assert [g[0] for g in result.generated] == ['bob']
+    assert User.query.filter_by(username='alice').first().check_password('secret1')
+    bob = User.query.filter_by(username='bob').first()
+    assert bob.check_password(result.generated[0][2])
+    assert bob.is_active and not bob.is_admin
+
+
+def test_provision_skips_duplicates_and_invalid_rows(app):
+    """测试跳过已存在、文件内重复和无效的行"""
+    user = User(username='taken', email='taken@test.com')
+    user.set_password('pass123')
+    db.session.add(user)
+    db.session.commit()
+
+    result = provision_users(_rows(
+        'username,email,password\n'
+        'taken,other@test.com,secret1\n'
+        'new1,taken@test.com,secret1\n'
+        'new2,new2@test.com,secret1\n'
+        'new2,dup@test.com,secret1\n'
+        'new3,,secret1\n'
+        'new4,new4@test.com,123\n'
+    ), chunk_size=2)
+
+    assert result.created == 1
+    assert [(line, name) for line, name, _ in result.skipped] == [
+        (2, 'taken'), (3, 'new1'), (5, 'new2'), (6, 'new3'), (7, 'new4')]
+    assert User.query.count() == 2
+
+
+def test_provision_uses_executor_and_batches_queries(app):
+    """测试密码哈希交给执行器，每批只用固定数量的 SQL"""
+    from app.utils.sql_stats import RequestSqlStats
+    from flask import g
+    text = 'username,email\n' + ''.join(f'u{i},u{i}@test.com\n' for i in range(20))
+
+    with app.test_request_context():
+        g.sql_stats = stats = RequestSqlStats()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = provision_users(_rows(text), executor=executor, chunk_size=10)
+
+    assert result.created == 20
+    assert len(result.generated) == 20
+    # 每批：用户名查询、邮箱查询、INSERT（executemany 算一条）
+    assert stats.count <= 2 * 3 + 2
+
+
+def test_write_credentials_is_private(tmp_path):
+    """测试凭据文件只有所有者可读"""
+    path = tmp_path / 'credentials.csv'
+    write_credentials(path, [('bob', 'bob@test.com', 'xyz')])
+    assert path.read_text(encoding='utf-8').splitlines()[1] == 'bob,bob@test.com,xyz'
+    assert os.stat(path).st_mode & 0o077 == 0
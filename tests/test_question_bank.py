@@ -0,0 +1,88 @@
+import numpy as np
+
+from app import db
+from app.models import Vocabulary, ThaiAlphabet, ConfusableNeighbor
+from app.routes.alphabet import generate_alphabet_options
+from app.routes.learning import generate_options, generate_true_false
+from app.utils.content_bundle import build_bundle, init_content_bundle, get_content_bundle
+from app.utils.question_bank import sample_distractors, build_question_bank, sample_question, QUESTION_SETS
+
+
+def test_sample_distractors():
+    """测试干扰项互不同义、不等于正确答案、优先同分类，预选的近邻保留在前面"""
+    rng = np.random.default_rng(1)
+    meanings = np.arange(40) % 30               # 第 30-39 个条目与第 0-9 个同义
+    categories = np.arange(40) // 10
+    preset = np.full((40, 2, 2), -1)
+    preset[5, :, 0] = 25                        # 不同分类的近邻
+    preset[6, :, 0] = 36                        # 与正确答案同义的近邻，需要重抽
+    chosen = sample_distractors(meanings, categories, 2, 3, preset, rng)
+
+    assert chosen.shape == (40, 2, 3) and (chosen >= 0).all()
+    for item in range(40):
+        for group in chosen[item]:
+            codes = meanings[group]
+            assert len(set(codes)) == 3 and meanings[item] not in codes
+    assert (chosen[5, :, 0] == 25).all() and (categories[chosen[5, :, 1:]] == 0).all()
+    assert (chosen[6, :, 0] != 36).all()
+
+    # 条目太少时凑不满
+    chosen = sample_distractors([0, 1, 1], [0, 0, 0], 1, 3, rng=rng)
+    assert sorted(chosen[0, 0].tolist()) == [-1, -1, 1] or sorted(chosen[0, 0].tolist()) == [-1, -1, 2]
+    assert (chosen[1, 0] >= 0).sum() == 1
+
+
+def test_build_question_bank_rows():
+    """测试题库分区的行按条目排列，近邻出现在干扰项中"""
+    sections = {
+        'vocabularies': [{'id': i, 'chinese_meaning': f'词{i}', 'category': '甲' if i < 6 else '乙'}
+                         for i in range(1, 11)],
+        'thai_alphabets': [{'id': i, 'name_chinese': f'字{i}', 'alphabet_type': 'consonant'} for i in range(1, 5)],
+        'vocab_neighbors': [{'item_id': 1, 'neighbor_id': 9}, {'item_id': 99, 'neighbor_id': 1}],
+        'alphabet_neighbors': [],
+    }
+    bank = build_question_bank(sections, seed=0)
+    questions = bank['vocab_questions']
+    assert len(questions['item_id']) == 10 * QUESTION_SETS
+    assert (np.diff(questions['item_id']) >= 0).all()
+    options = np.stack([questions[name] for name in ('option_1', 'option_2', 'option_3')], axis=1)
+    assert (options[:QUESTION_SETS] == 9).any(axis=1).all()
+    assert (options > 0).all()
+    pairings = bank['vocab_pairings']
+    assert (pairings['shown_id'] > 0).all() and (pairings['shown_id'] != pairings['item_id']).all()
+    assert len(bank['alphabet_questions']['option_3']) == 4 * QUESTION_SETS
+
+
+def test_routes_sample_from_bank(app, tmp_path):
+    """测试配置内容包后选择题、判断题和字母选择题都从题库中取题"""
+    words = [Vocabulary(thai_word=f'w{i}', chinese_meaning=f'词{i}', category='分类') for i in range(8)]
+    letters = [ThaiAlphabet(character=c, name_chinese=n, alphabet_type='consonant')
+               for c, n in [('ด', '孩子'), ('ค', '水牛'), ('ต', '乌龟'), ('ก', '鸡'), ('ข', '蛋')]]
+    db.session.add_all([*words, *letters])
+    db.session.flush()
+    db.session.add(ConfusableNeighbor(domain='vocab', item_id=words[0].id, neighbor_id=words[7].id, score=1.0))
+    db.session.commit()
+
+    path = str(tmp_path / 'content.bundle')
+    build_bundle(path)
+    app.config['CONTENT_BUNDLE_PATH'] = path
+    init_content_bundle(app)
+    bundle = get_content_bundle()
+    section = bundle['vocab_questions']
+    start, end = section.range_of('item_id', words[0].id)
+    sets = [{section.value(name, row) for name in ('option_1', 'option_2', 'option_3')}
+            for row in range(start, end)]
+    assert len(sets) == QUESTION_SETS and all(words[7].id in ids for ids in sets)
+    assert sample_question(section, 12345) is None
+
+    session_vocab = [{'id': w.id, 'chinese_meaning': w.chinese_meaning, 'category': w.category} for w in words]
+    for _ in range(10):
+        options = generate_options(session_vocab[0], session_vocab)
+        assert {o['id'] for o in options if not o['is_correct']} in sets
+        assert [o['text'] for o in options if o['is_correct']] == ['词0']
+
+        shown, is_correct = generate_true_false(session_vocab[0], session_vocab[:1])
+        assert (shown == '词0') == is_correct
+
+        options = generate_alphabet_options({'id': letters[0].id, 'name_chinese': '孩子'}, letters)
+        assert len({o['text'] for o in options}) == 4 and sum(o['is_correct'] for o in options) == 1
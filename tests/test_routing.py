@@ -0,0 +1,46 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session as OrmSession
+from app.models import User, Vocabulary
+from app.utils.routing import init_read_replicas
+from app import db
+
+
+def _setup_replica(app, tmp_path):
+    """创建一个词汇数不同于主库的副本"""
+    uri = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(uri)
+    db.metadata.create_all(engine)
+    with OrmSession(engine) as s:
+        s.add_all([Vocabulary(thai_word=f'คำ{i}', chinese_meaning=f'词{i}') for i in range(777)])
+        s.commit()
+    engine.dispose()
+
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [uri]
+    init_read_replicas(app)
+
+
+def test_read_only_view_uses_replica(app, client, tmp_path):
+    """测试只读视图读副本，用户写入后的窗口内读主库"""
+    _setup_replica(app, tmp_path)
+    with app.app_context():
+        user = User(username='reader', email='reader@test.com')
+        user.set_password('pass')
+        db.session.add(user)
+        vocab = Vocabulary(thai_word='น้ำ', chinese_meaning='水')
+        db.session.add(vocab)
+        db.session.commit()
+        vocab_id = vocab.id
+
+    client.post('/auth/login', data={'username': 'reader', 'password': 'pass'})
+
+    # 登录本身写入了 last_login，先清掉读自己写窗口
+    with client.session_transaction() as sess:
+        sess.pop('_last_write', None)
+
+    response = client.get('/learning/select')
+    assert '777' in response.data.decode('utf-8')
+
+    # 提交答案后读主库
+    client.post('/learning/submit', json={'vocabulary_id': vocab_id, 'familiarity': 4})
+    response = client.get('/learning/select')
+    assert '777' not in response.data.decode('utf-8')
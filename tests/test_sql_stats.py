@@ -0,0 +1,105 @@
+import logging
+from app.models import User, ConversationScene
+from app.utils.sql_stats import fingerprint
+from app import db
+
+
+def _login(client, app, username='sql'):
+    with app.app_context():
+        user = User(username=username, email=f'{username}@test.com', is_admin=True)
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.commit()
+    client.post('/auth/login', data={'username': username, 'password': 'pass'})
+
+
+def test_fingerprint_normalizes_literals():
+    """测试指纹合并参数与 IN 列表"""
+    a = fingerprint('SELECT * FROM users WHERE id IN (?, ?, ?) AND age > 30')
+    b = fingerprint('SELECT *  FROM users\nWHERE id IN (?, ?) AND age > 41')
+    assert a == b
+
+
+def test_query_budget(client, app, query_budget):
+    """测试按路由限制 SQL 语句数"""
+    _login(client, app)
+    with query_budget(10) as captured:
+        client.get('/learning/summary')
+    endpoint, stats = captured[0]
+    assert endpoint == 'learning.summary'
+    assert stats.count > 0 and stats.total_time > 0
+
+
+def test_repeated_statement_warning(client, app, caplog):
+    """测试循环查询触发 N+1 警告"""
+    _login(client, app)
+    with app.app_context():
+        db.session.add_all([ConversationScene(name_chinese=f'场景{i}') for i in range(12)])
+        db.session.commit()
+
+    app.config['SQL_REPEAT_THRESHOLD'] = 5
+    with caplog.at_level(logging.WARNING):
+        client.get('/admin/conversations')
+    assert any('N+1' in r.getMessage() for r in caplog.records)
+
+
+def test_timeline_is_capped():
+    """测试时间线最多保留 MAX_TIMELINE 条，计数和指纹不受影响"""
+    from app.utils.sql_stats import RequestSqlStats, MAX_TIMELINE
+    stats = RequestSqlStats()
+    for i in range(MAX_TIMELINE + 5):
+        stats.record(f'SELECT {i}', stats.started, 0.001)
+    assert len(stats.timeline) == MAX_TIMELINE
+    assert stats.count == MAX_TIMELINE + 5 and stats.fingerprints['SELECT ?'] == MAX_TIMELINE + 5
+
+
+def test_profiling_without_instrumentation(monkeypatch):
+    """测试生产配置默认关闭 SQL 统计，按需分析的请求仍记录 SQL 时间线"""
+    from app import create_app
+    from config import config, TestingConfig, ProductionConfig
+
+    assert not ProductionConfig.SQL_INSTRUMENTATION and TestingConfig.SQL_INSTRUMENTATION
+
+    class QuietConfig(TestingConfig):
+        SQL_INSTRUMENTATION = False
+
+    monkeypatch.setitem(config, 'quiet_test', QuietConfig)
+    app = create_app('quiet_test')
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        _login(client, app)
+        client.get('/learning/summary')
+        client.get('/learning/summary?_profile=1')
+        profile = app.extensions['profiles'][0]
+        assert profile.sql_count == len(profile.sql_timeline) > 0
+        db.session.remove()
+        db.drop_all()
+
+
+def test_counts_without_instrumentation():
+    """测试关闭 SQL_INSTRUMENTATION 时只统计语句数和耗时，不计算指纹"""
+    from app.utils.sql_stats import RequestSqlStats
+    stats = RequestSqlStats(detailed=False)
+    stats.record('SELECT 1', stats.started, 0.002)
+    assert (stats.count, stats.total_time) == (1, 0.002)
+    assert not stats.fingerprints and stats.timeline == [] and stats.repeated(0) == []
+
+
+def test_failed_statement_does_not_skew_timing(app):
+    """测试出错的语句不会影响同一连接上后续语句的耗时"""
+    import time
+    import pytest
+    from app.utils.sql_stats import RequestSqlStats
+
+    with app.test_request_context():
+        from flask import g
+        g.sql_stats = stats = RequestSqlStats()
+        with db.engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.exec_driver_sql('SELECT * FROM no_such_table')
+            conn.rollback()
+            time.sleep(0.2)
+            conn.exec_driver_sql('SELECT 1')
+            assert not conn.info.get('sql_stats_start')   # 连接上没有残留的开始时间
+        assert stats.count == 1 and stats.total_time < 0.1
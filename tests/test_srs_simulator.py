@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models import User, Vocabulary, QuizAttempt
+from app.utils.srs import calculate_next_review_minutes, update_familiarity
+from app.utils.srs_simulator import (SchedulingPolicy, simulate, synthetic_population,
+                                     population_from_attempts, load_attempts)
+from app import db
+
+
+def test_current_policy_matches_srs():
+    """测试 current 策略与 calculate_next_review_minutes 一致"""
+    policy = SchedulingPolicy.current()
+    for familiarity in range(6):
+        for review_count in range(10):
+            expected = calculate_next_review_minutes(familiarity, review_count) / 1440
+            actual = policy.interval_days(np.array([familiarity]), np.array([review_count]))[0]
+            assert abs(actual - expected) < 1e-9
+
+
+def test_simulation_is_deterministic_and_respects_limits():
+    """测试相同种子结果一致，新词数不超过词库，单次作答不超过时段上限"""
+    def run():
+        pop = synthetic_population(200, 50, seed=3)
+        return pop, simulate(pop, SchedulingPolicy.current(), 20, sessions_per_day=2,
+                             session_size=10, seed=3)
+
+    pop, result = run()
+    _, again = run()
+    assert np.array_equal(result.reviews, again.reviews)
+    assert np.array_equal(result.retention, again.retention)
+
+    assert result.new.sum() == pop.size <= 200 * 50
+    assert np.all(np.bincount(pop.user[:pop.size], minlength=200) <= 50)
+    assert result.to_dict()['summary']['user_daily_reviews_p99'] <= 20
+    assert 0 < result.retention[-1] < 1
+
+
+def test_longer_intervals_reduce_workload():
+    """测试间隔越长，到期复习量越少"""
+    def due(policy):
+        pop = synthetic_population(300, 30, seed=1)
+        return simulate(pop, policy, 30, max_new_per_session=3, seed=1).due.sum()
+
+    short = SchedulingPolicy.from_days([1] * 8)
+    long = SchedulingPolicy.from_days([7, 14, 30, 60, 90, 120, 180, 365])
+    assert due(long) < due(short)
+
+
+def test_population_from_attempts_replays_familiarity():
+    """测试由作答记录重建的熟悉度与逐条重放一致"""
+    rng = np.random.default_rng(0)
+    n = 500
+    users = rng.integers(100, 110, n)
+    vocabs = rng.integers(1, 20, n)
+    correct = rng.random(n) < 0.7
+    times = -rng.uniform(0, 30, n)
+
+    pop, external = population_from_attempts(users, vocabs, correct, times, vocab_size=50)
+
+    expected = {}
+    for i in np.lexsort((times, vocabs, users)):
+        key = (users[i], vocabs[i])
+        fam, count = expected.get(key, (0, 0))
+        expected[key] = (update_familiarity(fam, bool(correct[i])), count + 1)
+
+    assert pop.size == len(expected)
+    assert list(external) == sorted(set(users.tolist()))
+    actual = sorted(zip(external[pop.user[:pop.size]].tolist(),
+                        pop.familiarity[:pop.size].tolist(), pop.review_count[:pop.size].tolist()))
+    assert actual == sorted((u, f, c) for (u, _), (f, c) in expected.items())
+    assert np.all(pop.remaining >= 50 - 19)
+
+
+def test_load_attempts(app):
+    """测试从数据库读取作答记录"""
+    user = User(username='sim', email='sim@test.com')
+    user.set_password('pass')
+    vocab = Vocabulary(thai_word='น้ำ', chinese_meaning='水')
+    db.session.add_all([user, vocab])
+    db.session.flush()
+    now = datetime(2026, 1, 10)
+    db.session.add_all([
+        QuizAttempt(user_id=user.id, vocabulary_id=vocab.id, quiz_type='flashcard',
+                    is_correct=True, created_at=now - timedelta(days=2)),
+        QuizAttempt(user_id=user.id, vocabulary_id=vocab.id, quiz_type='flashcard',
+                    is_correct=False, created_at=now - timedelta(days=40)),
+    ])
+    db.session.commit()
+
+    users, vocabs, correct, times = load_attempts(now=now)
+    assert sorted(times.tolist()) == [-40.0, -2.0]
+    users, _, _, times = load_attempts(since_days=10, now=now)
+    assert users.tolist() == [user.id] and times.tolist() == [-2.0]
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from app.models import User, UserVocabulary, QuizAttempt, Vocabulary
+from app.utils.synthetic import SyntheticSpec, generate
+from app import db
+
+NOW = datetime(2026, 1, 1)
+
+
+def _spec(**kwargs):
+    options = dict(users=20, vocab=50, words_per_user=10, attempts_per_user=20,
+                   conversations_per_user=0, days=30, seed=7, now=NOW)
+    options.update(kwargs)
+    return SyntheticSpec(**options)
+
+
+def _snapshot():
+    progress = db.session.execute(db.select(
+        UserVocabulary.user_id, UserVocabulary.vocabulary_id,
+        UserVocabulary.familiarity_level, UserVocabulary.next_review_date
+    ).order_by(UserVocabulary.id)).all()
+    attempts = db.session.execute(db.select(
+        QuizAttempt.user_id, QuizAttempt.vocabulary_id, QuizAttempt.is_correct, QuizAttempt.created_at
+    ).order_by(QuizAttempt.id)).all()
+    return progress, attempts
+
+
+def test_generate_counts(app):
+    """测试生成的行数与返回的统计一致"""
+    counts = generate(_spec())
+
+    assert counts['vocabularies'] == Vocabulary.query.count() == 50
+    assert counts['users'] == User.query.count() == 20
+    assert counts['user_vocabularies'] == UserVocabulary.query.count() > 0
+    assert counts['quiz_attempts'] == QuizAttempt.query.count() > 0
+    assert counts['user_conversations'] == 0
+
+
+def test_generate_is_deterministic(app):
+    """测试相同的种子生成相同的数据，不同的种子生成不同的数据"""
+    generate(_spec())
+    first = _snapshot()
+
+    db.drop_all()
+    db.create_all()
+    generate(_spec())
+    assert _snapshot() == first
+
+    db.drop_all()
+    db.create_all()
+    generate(_spec(seed=8))
+    assert _snapshot() != first
+
+
+def test_review_dates_include_due_and_future(app):
+    """测试复习时间既有已到期的也有未来的，答题词汇都在进度表中"""
+    generate(_spec())
+
+    due = UserVocabulary.query.filter(UserVocabulary.next_review_date <= NOW).count()
+    assert 0 < due < UserVocabulary.query.count()
+
+    orphan = db.session.scalar(
+        db.select(db.func.count()).select_from(QuizAttempt)
+        .outerjoin(UserVocabulary, (UserVocabulary.user_id == QuizAttempt.user_id)
+                   & (UserVocabulary.vocabulary_id == QuizAttempt.vocabulary_id))
+        .where(UserVocabulary.id.is_(None))
+    )
+    assert orphan == 0
+
+
+def test_generate_refuses_existing_prefix(app):
+    """测试同一前缀重复生成时在写入任何数据前报错"""
+    import pytest
+
+    generate(_spec())
+    vocab = Vocabulary.query.count()
+    with pytest.raises(ValueError):
+        generate(_spec())
+    assert Vocabulary.query.count() == vocab and User.query.count() == 20
+    assert generate(_spec(prefix='more_'))['users'] == 20
+
+
+def test_generate_rebuilds_activity_sketches(app):
+    """测试合成的答题记录计入活跃用户草图"""
+    from app.utils.activity import activity_summary
+
+    counts = generate(_spec(days=3, attempts_per_user=50))
+    assert counts['activity_sketches'] > 0
+    active = db.session.scalar(db.select(db.func.count(db.distinct(QuizAttempt.user_id)))
+                               .where(QuizAttempt.created_at >= datetime(2025, 12, 26)))
+    summary = activity_summary('learning', today=NOW.date())
+    assert active > 0 and abs(summary['wau'] - active) <= 1
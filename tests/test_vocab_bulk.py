@@ -0,0 +1,52 @@
+from app.models import User, Vocabulary, UserVocabulary
+from app.utils.sql_stats import capture_sql_stats
+from app import db
+
+
+def _setup(client, count=6):
+    admin = User(username='admin', email='admin@test.com', is_admin=True)
+    admin.set_password('pass')
+    vocabs = [Vocabulary(thai_word=f'คำ{i}', chinese_meaning=f'词{i}', category='旧分类' if i < 4 else '其他',
+                         difficulty_level=1) for i in range(count)]
+    db.session.add_all([admin, *vocabs])
+    db.session.commit()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+    return admin.id, [v.id for v in vocabs]
+
+
+def test_bulk_update_by_filter_is_one_statement(app, client):
+    """测试按筛选条件批量修改只执行一条 UPDATE"""
+    _, ids = _setup(client)
+
+    with capture_sql_stats(app) as captured:
+        response = client.post('/admin/vocabulary/bulk', json={
+            'action': 'set_category', 'value': '新分类', 'filter': {'category': '旧分类'}})
+    assert response.get_json() == {'success': True, 'matched': 4, 'affected': 4}
+    statements = [sql for _, stats in captured for _, _, sql in stats.timeline]
+    assert sum(1 for sql in statements if sql.lstrip().upper().startswith('UPDATE VOCABULARIES')) == 1
+    assert Vocabulary.query.filter_by(category='新分类').count() == 4
+
+    response = client.post('/admin/vocabulary/bulk', json={'action': 'deactivate', 'ids': ids[:2]})
+    assert response.get_json()['affected'] == 2
+    response = client.post('/admin/vocabulary/bulk', json={'action': 'deactivate', 'ids': ids[:3]})
+    assert response.get_json() == {'success': True, 'matched': 3, 'affected': 1}
+    assert Vocabulary.query.filter_by(is_active=False).count() == 3
+
+
+def test_bulk_delete_unused_and_validation(app, client):
+    """测试只删除没有学习记录的词汇，以及参数校验"""
+    admin_id, ids = _setup(client)
+    db.session.add(UserVocabulary(user_id=admin_id, vocabulary_id=ids[0], next_review_date=db.func.now()))
+    db.session.commit()
+
+    response = client.post('/admin/vocabulary/bulk', data={
+        'action': 'delete_unused', 'scope': 'filtered', 'category': '旧分类'}, follow_redirects=True)
+    assert '已删除 3 个词汇' in response.get_data(as_text=True)
+    assert [v.id for v in Vocabulary.query.filter_by(category='旧分类')] == [ids[0]]
+
+    for payload in [{'action': 'activate'},
+                    {'action': 'activate', 'filter': {'search': ''}},
+                    {'action': 'explode', 'ids': ids},
+                    {'action': 'set_difficulty', 'value': 9, 'ids': ids},
+                    {'action': 'set_category', 'value': ' ', 'ids': ids}]:
+        assert client.post('/admin/vocabulary/bulk', json=payload).status_code == 400
@@ -0,0 +1,64 @@
+from app.models import User, Vocabulary, UserVocabulary
+from app.utils.content_bundle import build_bundle, ContentBundle, init_content_bundle
+from app.utils.vocab_catalog import VocabCatalog
+from app import db
+from datetime import datetime
+
+
+def _seed_vocab():
+    words = [
+        ('หนึ่ง', '一', '数字', 2), ('สอง', '二', '数字', 1), ('สาม', '三', '数字', 1),
+        ('สี่', '四', '数字', 3), ('แมว', '猫', '动物', 1), ('หมา', '狗', '动物', 2),
+    ]
+    for thai, meaning, category, difficulty in words:
+        db.session.add(Vocabulary(thai_word=thai, chinese_meaning=meaning,
+                                  category=category, difficulty_level=difficulty))
+    db.session.commit()
+
+
+def test_catalog_columns_and_queries(app, tmp_path):
+    """测试词汇目录的列数据、干扰项抽样和新词选择"""
+    path = str(tmp_path / 'content.bundle')
+    with app.app_context():
+        _seed_vocab()
+        build_bundle(path)
+
+    catalog = VocabCatalog(ContentBundle(path))
+    assert list(catalog.ids) == [1, 2, 3, 4, 5, 6]
+    assert catalog.categories == ['动物', '数字']
+    assert catalog.category_codes[0] == catalog.category_code('数字')
+
+    distractors = catalog.sample_distractors('一', '数字')
+    assert sorted(distractors) == ['三', '二', '四']
+
+    # 同分类不足时从其他分类补充
+    distractors = catalog.sample_distractors('猫', '动物')
+    assert len(distractors) == 3 and '狗' in distractors and '猫' not in distractors
+
+    rows = catalog.new_words({2}, 3)
+    assert [catalog.ids[r] for r in rows] == [3, 5, 1]
+
+
+def test_start_uses_catalog(app, client, tmp_path):
+    """测试开始学习时通过词汇目录选择新词"""
+    path = str(tmp_path / 'content.bundle')
+    with app.app_context():
+        _seed_vocab()
+        user = User(username='catalog', email='catalog@test.com')
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserVocabulary(user_id=user.id, vocabulary_id=2, familiarity_level=3,
+                                      next_review_date=datetime(2099, 1, 1)))
+        db.session.commit()
+        build_bundle(path)
+
+    app.config['CONTENT_BUNDLE_PATH'] = path
+    init_content_bundle(app)
+
+    client.post('/auth/login', data={'username': 'catalog', 'password': 'pass'})
+    response = client.get('/learning/start/multiple_choice')
+    assert response.status_code == 200
+
+    with client.session_transaction() as sess:
+        assert [v['id'] for v in sess['learning_vocab']] == [3, 5, 1, 6, 4]
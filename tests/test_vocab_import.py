@@ -0,0 +1,162 @@
+import io
+import time
+
+from app.models import User, Vocabulary, ImportJob
+from app.utils.vocab_import import import_vocabulary, read_vocab_rows, ImportWorker
+from app import db
+
+CSV = (
+    'thai_word,chinese_meaning,category,difficulty_level\n'
+    'กิน,吃,动词,1\n'
+    'นอน,睡,动词,2\n'
+    'กิน,吃（重复）,动词,1\n'
+    ',缺泰语,动词,1\n'
+    'ดื่ม,喝,动词,9\n'
+    'เก่า,旧的,形容词,\n'
+)
+
+
+def test_import_vocabulary_chunks(app):
+    """测试分块导入：跳过文件内和数据库中的重复，记录格式错误"""
+    db.session.add(Vocabulary(thai_word='นอน', chinese_meaning='睡'))
+    db.session.commit()
+
+    progress = []
+    result = import_vocabulary(read_vocab_rows(io.StringIO(CSV)), chunk_size=2,
+                               on_chunk=lambda r: progress.append(r.processed))
+    assert progress == [2, 4, 6]
+    assert (result.created, result.skipped, result.errors) == (2, 2, 2)
+    assert [m[0] for m in result.messages] == [3, 4, 5, 6]
+    assert {v.thai_word: v.difficulty_level for v in Vocabulary.query} == {'นอน': 1, 'กิน': 1, 'เก่า': 1}
+
+
+def test_upload_creates_job(app, client, tmp_path):
+    """测试上传文件后创建任务（测试环境同步执行）并可查询进度"""
+    app.config['IMPORT_FOLDER'] = str(tmp_path)
+    admin = User(username='admin', email='admin@test.com', is_admin=True)
+    admin.set_password('pass')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+
+    response = client.post('/admin/vocabulary/import', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(('﻿' + CSV).encode('utf-8')), 'words.csv')})
+    assert response.status_code == 302
+    job_id = int(response.headers['Location'].rstrip('/').split('/')[-1])
+
+    status = client.get(f'/admin/vocabulary/import/{job_id}/status').get_json()
+    assert status['status'] == 'done'
+    assert (status['processed'], status['created'], status['skipped'], status['errors']) == (6, 3, 1, 2)
+    assert len(status['messages']) == 3
+    assert list(tmp_path.iterdir()) == []  # 上传的文件已删除
+
+    assert client.get(f'/admin/vocabulary/import/{job_id}').status_code == 200
+    assert 'words.csv' in client.get('/admin/vocabulary/import').get_data(as_text=True)
+
+    response = client.post('/admin/vocabulary/import', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(b'x'), 'words.txt')})
+    assert ImportJob.query.count() == 1
+
+
+def test_worker_thread_runs_job(app, tmp_path, monkeypatch):
+    """测试后台线程执行提交的任务"""
+    ran = []
+    monkeypatch.setattr('app.utils.vocab_import.run_import_job', ran.append)
+    worker = ImportWorker(app, workers=1)
+    worker.submit(42)
+    deadline = time.time() + 5
+    while not ran and time.time() < deadline:
+        time.sleep(0.01)
+    assert ran == [42]
+
+
+def test_recover_stale_jobs(app, tmp_path, monkeypatch):
+    """测试进程重启后遗留的任务：排队的重新入队，文件丢失或运行超时的标记失败"""
+    from datetime import datetime, timedelta
+    from app.utils.vocab_import import job_path
+
+    app.config['IMPORT_FOLDER'] = str(tmp_path)
+    now = datetime.utcnow()
+    jobs = [ImportJob(filename='queued.csv', status='queued'),
+            ImportJob(filename='lost.csv', status='queued'),
+            ImportJob(filename='stale.csv', status='running', started_at=now - timedelta(hours=2)),
+            ImportJob(filename='busy.csv', status='running', started_at=now),
+            ImportJob(filename='done.csv', status='done')]
+    db.session.add_all(jobs)
+    db.session.commit()
+    for job in (jobs[0], jobs[2], jobs[3]):
+        open(job_path(app, job.id), 'w').close()
+
+    ran = []
+    monkeypatch.setattr('app.utils.vocab_import.run_import_job', ran.append)
+    worker = ImportWorker(app, workers=1)
+    worker.submit(jobs[0].id)        # 遗留任务已重新入队，不重复放入
+    deadline = time.time() + 5
+    while not ran and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert ran == [jobs[0].id]
+
+    db.session.expire_all()
+    assert [job.status for job in jobs] == ['queued', 'failed', 'failed', 'running', 'done']
+    assert '丢失' in jobs[1].error and '中断' in jobs[2].error and jobs[2].finished_at
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f'vocab-{jobs[0].id}.csv', f'vocab-{jobs[3].id}.csv']
+
+
+def test_run_import_job_claims_once(app, tmp_path):
+    """测试同一任务被重复入队时只执行一次"""
+    from app.utils.vocab_import import job_path, run_import_job
+
+    app.config['IMPORT_FOLDER'] = str(tmp_path)
+    job = ImportJob(filename='words.csv', status='queued')
+    db.session.add(job)
+    db.session.commit()
+    with open(job_path(app, job.id), 'w', encoding='utf-8') as f:
+        f.write(CSV)
+    run_import_job(job.id)
+    run_import_job(job.id)
+    db.session.expire_all()
+    assert job.status == 'done' and job.created == 3
+    assert Vocabulary.query.count() == 3
+
+
+def test_refresh_failure_keeps_job_done(app, tmp_path, monkeypatch):
+    """测试导入完成后刷新内容包失败不会把任务改为失败"""
+    from app.utils.vocab_import import job_path, run_import_job
+
+    def broken_refresh():
+        raise RuntimeError('磁盘已满')
+
+    monkeypatch.setattr('app.utils.content_bundle.refresh_content_bundle', broken_refresh)
+    app.config['IMPORT_FOLDER'] = str(tmp_path)
+    job = ImportJob(filename='words.csv', status='queued')
+    db.session.add(job)
+    db.session.commit()
+    with open(job_path(app, job.id), 'w', encoding='utf-8') as f:
+        f.write(CSV)
+    run_import_job(job.id)
+    db.session.expire_all()
+    assert (job.status, job.created, job.error) == ('done', 3, None)
+    assert job.finished_at is not None and list(tmp_path.iterdir()) == []
+
+
+def test_import_pages_recover_stale_jobs(app, client, tmp_path):
+    """测试重启后不需要新的上传，打开导入页面就会处理遗留任务"""
+    from datetime import datetime, timedelta
+    from app.utils.vocab_import import job_path
+
+    app.config['IMPORT_FOLDER'] = str(tmp_path)
+    admin = User(username='admin', email='admin@test.com', is_admin=True)
+    admin.set_password('pass')
+    queued = ImportJob(filename='words.csv', status='queued')
+    stale = ImportJob(filename='stale.csv', status='running', started_at=datetime.utcnow() - timedelta(hours=2))
+    db.session.add_all([admin, queued, stale])
+    db.session.commit()
+    with open(job_path(app, queued.id), 'w', encoding='utf-8') as f:
+        f.write(CSV)
+    client.post('/auth/login', data={'username': 'admin', 'password': 'pass'})
+
+    status = client.get(f'/admin/vocabulary/import/{stale.id}/status').get_json()
+    assert status['status'] == 'failed'
+    assert client.get(f'/admin/vocabulary/import/{queued.id}/status').get_json()['status'] == 'done'
+    assert Vocabulary.query.count() == 3 and list(tmp_path.iterdir()) == []